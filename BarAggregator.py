@@ -0,0 +1,159 @@
+import sys
+from array import array
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from MarketData import Bar
+
+# 默认聚合周期（秒）：15分钟决策、小时、日线（UTC日，同BatchRunner/WalkForward的交易日划分）
+RESOLUTIONS: Dict[str, int] = {"15m": 900, "1h": 3600, "1d": 86400}
+
+
+class BarRing:
+    """定长环形缓冲：每个槽6个float64（time, open, high, low, close, volume），写满后覆盖最旧的bar"""
+
+    __slots__ = ("capacity", "_data", "_head", "_count")
+
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError("capacity至少为1")
+        self.capacity = capacity
+        self._data = array("d", bytes(8 * 6 * capacity))
+        self._head = 0  # 下一个写入位置
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def append(self, row: List[float]):
+        i = self._head * 6
+        self._data[i:i + 6] = array("d", row)
+        self._head = (self._head + 1) % self.capacity
+        if self._count < self.capacity:
+            self._count += 1
+
+    def row(self, ago: int = 0) -> Tuple[float, ...]:
+        """ago=0为最新一条已完成bar"""
+        if not 0 <= ago < self._count:
+            raise IndexError(ago)
+        i = (self._head - 1 - ago) % self.capacity * 6
+        return tuple(self._data[i:i + 6])
+
+    def column(self, field: int, count: Optional[int] = None) -> List[float]:
+        """按时间升序取最近count条的某一列（0=time ... 5=volume）"""
+        count = self._count if count is None else min(count, self._count)
+        return [self._data[(self._head - count + k) % self.capacity * 6 + field] for k in range(count)]
+
+
+class BarAggregator:
+    """
+    分钟bar增量聚合：
+    1. 标的名intern后映射为整数id，状态按id存放在列表中
+    2. 每个周期维护一根进行中的bar，分钟bar只做O(1)的高低收量更新
+    3. 跨周期时把完成的bar写入该周期的环形缓冲，并通知on_bar回调
+    4. 信号直接读取现成的粗周期bar，不再请求history或重算窗口
+    """
+
+    def __init__(self, resolutions: Optional[Dict[str, int]] = None, capacity: int = 256):
+        self.resolutions = dict(resolutions or RESOLUTIONS)
+        self.capacity = capacity
+        self._names = list(self.resolutions)
+        self._periods = [self.resolutions[name] for name in self._names]
+        self._ids: Dict[str, int] = {}
+        self._symbols: List[str] = []
+        self._working: List[List[Optional[List[float]]]] = []  # [symbol_id][resolution] -> [start, o, h, l, c, v]
+        self._rings: List[List[BarRing]] = []
+        self._handlers: List[Callable[[str, str, Bar], None]] = []
+
+    def symbol_id(self, symbol: str) -> int:
+        """intern标的名并分配id（首次出现时创建状态）"""
+        sid = self._ids.get(symbol)
+        if sid is None:
+            symbol = sys.intern(symbol)
+            sid = self._ids[symbol] = len(self._symbols)
+            self._symbols.append(symbol)
+            self._working.append([None] * len(self._periods))
+            self._rings.append([BarRing(self.capacity) for _ in self._periods])
+        return sid
+
+    def on_bar(self, handler: Callable[[str, str, Bar], None]):
+        """注册bar完成回调 handler(symbol, resolution, bar)"""
+        self._handlers.append(handler)
+        return self
+
+    def update(self, symbol: str, time: float, open: float, high: float, low: float, close: float,
+               volume: float = 0.0):
+        """输入一根分钟bar"""
+        sid = self.symbol_id(symbol)
+        working = self._working[sid]
+        for r, period in enumerate(self._periods):
+            start = float(time - time % period)
+            current = working[r]
+            if current is not None and current[0] == start:
+                if high > current[2]:
+                    current[2] = high
+                if low < current[3]:
+                    current[3] = low
+                current[4] = close
+                current[5] += volume
+                continue
+            if current is not None:
+                self._complete(sid, r, current)
+            working[r] = [start, open, high, low, close, volume]
+        return self
+
+    def update_bars(self, bars: Dict[str, Bar]):
+        """输入一个时间点的多标的bar（BarStore.stream的产出）"""
+        for symbol, bar in bars.items():
+            self.update(symbol, bar.time, bar.open, bar.high, bar.low, bar.close, bar.volume)
+        return self
+
+    def flush(self, symbols: Optional[Iterable[str]] = None):
+        """强制完成进行中的bar（如回测结束）"""
+        for symbol in (self._symbols if symbols is None else symbols):
+            sid = self._ids.get(symbol)
+            if sid is None:
+                continue
+            working = self._working[sid]
+            for r, current in enumerate(working):
+                if current is not None:
+                    self._complete(sid, r, current)
+                    working[r] = None
+        return self
+
+    def _complete(self, sid: int, r: int, row: List[float]):
+        self._rings[sid][r].append(row)
+        if self._handlers:
+            bar = Bar(self._symbols[sid], *row)
+            for handler in self._handlers:
+                handler(bar.symbol, self._names[r], bar)
+
+    def _ring(self, symbol: str, resolution: str) -> Optional[BarRing]:
+        sid = self._ids.get(symbol)
+        if sid is None:
+            return None
+        return self._rings[sid][self._names.index(resolution)]
+
+    def last(self, symbol: str, resolution: str, ago: int = 0) -> Optional[Bar]:
+        """最近完成的bar（ago=1为再往前一根），没有时返回None"""
+        ring = self._ring(symbol, resolution)
+        if ring is None or ago >= len(ring):
+            return None
+        return Bar(symbol, *ring.row(ago))
+
+    def current(self, symbol: str, resolution: str) -> Optional[Bar]:
+        """进行中的bar"""
+        sid = self._ids.get(symbol)
+        if sid is None:
+            return None
+        row = self._working[sid][self._names.index(resolution)]
+        return Bar(symbol, *row) if row is not None else None
+
+    def closes(self, symbol: str, resolution: str, count: Optional[int] = None) -> List[float]:
+        """最近count根已完成bar的收盘价（时间升序）"""
+        ring = self._ring(symbol, resolution)
+        return ring.column(4, count) if ring is not None else []
+
+    def preclose(self, symbol: str) -> Optional[float]:
+        """昨收：最近一根已完成日线的收盘价"""
+        bar = self.last(symbol, "1d")
+        return bar.close if bar is not None else None
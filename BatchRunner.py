@@ -0,0 +1,210 @@
+from collections import ChainMap
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from BarAggregator import BarAggregator
+from ConfigLoader import ConfigLoader
+from FeatureGraph import FeatureGraph
+from LocalTradeBuilder import LocalTradeBuilder
+from Log import log
+from MarketData import Bar, BarStore
+from MemoryProfiler import MemoryProfiler
+from Pojo import Config, ProposedOrder
+from PortfolioAnalytics import PortfolioAnalytics
+from ResultCache import ResultCache
+from TradingPipeline import TradingPipeline
+
+
+class PaperPortfolio:
+    """按成交价记账的模拟账户：现金、持仓、每日做空额度、日终净值曲线、round-trip交易、增量分析"""
+
+    def __init__(self, cash: float, daily_limit_ratio: float):
+        self.cash = float(cash)
+        self.initial_cash = self.cash
+        self.daily_limit_ratio = daily_limit_ratio
+        self.positions: Dict[str, int] = {}
+        self.daily_limit = self.cash * daily_limit_ratio
+        self.daily_used = 0.0
+        self.orders: List[ProposedOrder] = []
+        self.equity: List[Tuple[float, float]] = []  # (时间, 净值)
+        self.trades = LocalTradeBuilder()
+        self.analytics = PortfolioAnalytics(self.cash)
+        self.analytics.set_daily(self.daily_limit, 0.0)
+        self.time = None  # 当前tick时间，由on_bars在execute前设置
+
+    def nav(self, prices: Dict[str, float]) -> float:
+        return self.cash + sum(qty * prices.get(sym, 0.0) for sym, qty in self.positions.items())
+
+    def new_day(self, prices: Dict[str, float]):
+        """每日重置额度（对应DailyRe），结束上一日的收益期"""
+        self.analytics.close_period()
+        self.daily_limit = max(self.nav(prices), 1e-9) * self.daily_limit_ratio
+        self.daily_used = 0.0
+        self.analytics.set_daily(self.daily_limit, 0.0)
+
+    def on_bars(self, time, bars: Dict[str, Bar]):
+        """每个tick：更新有持仓标的的价格、未平仓交易的MAE/MFE和净值回撤"""
+        self.time = time
+        self.trades.mark_bars(bars)
+        analytics = self.analytics
+        for sym, bar in bars.items():
+            analytics.price(sym, bar.close)
+        analytics.mark()
+
+    def fill(self, orders: List[ProposedOrder]):
+        for order in orders:
+            self.cash -= order.quantity * order.price
+            self.positions[order.symbol] = self.positions.get(order.symbol, 0) + order.quantity
+            if order.quantity < 0:
+                self.daily_used += order.notional
+            self.orders.append(order)
+            self.trades.fill(order.symbol, self.time, order.quantity, order.price)
+            self.analytics.fill(order.symbol, order.quantity, order.price)
+        self.analytics.set_daily(self.daily_limit, self.daily_used).mark()
+
+    def mark(self, ts: float, prices: Dict[str, float]):
+        self.equity.append((ts, self.nav(prices)))
+
+    def stats(self) -> Dict[str, float]:
+        """交易统计：订单数、完整交易数、期末净值、收益率，以及增量分析的回撤/Sharpe/敞口等"""
+        stats = self.analytics.snapshot()
+        stats['orders'] = len(self.orders)
+        stats['trades'] = len(self.trades.closed_trades)
+        stats['final_nav'] = stats['equity']
+        stats['return'] = stats['equity'] / self.initial_cash - 1.0 if self.initial_cash else 0.0
+        return stats
+
+
+class BatchRunner:
+    """
+    多组合批量运行：
+    1. N份配置各自构建独立的TradingPipeline（不使用单例）和模拟账户
+    2. 行情只读取、解码一次，按时间归并后驱动所有pipeline
+    3. 昨收、涨跌幅、VIX等共享特征每个tick只计算一次，各组合只叠加自己的账户字段；
+       所有pipeline共用一个FeatureGraph，只有依赖账户字段（nav、额度）的特征按组合重新计算
+       15分钟/小时/日线bar增量聚合后以env['bars']共享
+    4. 指定cache时，配置、数据区间和代码都未变的组合直接返回缓存的账户，不再参与回放
+    5. 指定profiler（已start的MemoryProfiler）时，每个tick按其间隔采样内存
+    """
+
+    def __init__(self, store: BarStore, vix_symbol: str = "VIX", cache: Optional[ResultCache] = None,
+                 profiler: Optional[MemoryProfiler] = None):
+        self.store = store
+        self.vix_symbol = vix_symbol
+        self.cache = cache
+        self.profiler = profiler
+        self.books: List[Tuple[str, TradingPipeline, PaperPortfolio]] = []
+        self.configs: Dict[str, Union[Config, Dict[str, Any]]] = {}
+        self.aggregator = BarAggregator()
+        self.features = FeatureGraph()
+
+    def add(self, name: str, config: Union[Config, Dict[str, Any]]):
+        """添加一个组合"""
+        environment = config.environment if isinstance(config, Config) else config.get('environment', {})
+        backtest = environment.get('backtest', {})
+        portfolio = PaperPortfolio(backtest.get('cash', 1_000_000), backtest.get('daily_limit_ratio', 0.30))
+        pipeline = TradingPipeline.create(self.features, portfolio=name).load(config).compile().on_orders(portfolio.fill)
+        self.books.append((name, pipeline, portfolio))
+        self.configs[name] = config
+        return self
+
+    def load(self, paths: Sequence[str]):
+        """从多个配置文件添加组合，组合名为文件名"""
+        loader = ConfigLoader()
+        for path in paths:
+            self.add(Path(path).stem, loader.load(path))
+        return self
+
+    def symbols(self) -> List[str]:
+        symbols = {t.target.name for _, pipeline, _ in self.books for t in pipeline.scheduler.triggers()}
+        symbols.add(self.vix_symbol)
+        return sorted(symbols)
+
+    def _key(self, name: str, symbols: List[str], start, end) -> str:
+        config = {
+            'config': self.configs[name],
+            'vix_symbol': self.vix_symbol,
+            'bars': {sym: self.store.digest(sym, start, end) for sym in symbols},
+        }
+        return ResultCache.key(config, start, end)
+
+    def run(self, start=None, end=None) -> Dict[str, PaperPortfolio]:
+        """用同一条行情流驱动所有组合，返回各组合的模拟账户"""
+        symbols = self.symbols()
+        books = self.books
+        keys: Dict[str, str] = {}
+        if self.cache is not None:
+            books = []
+            for i, (name, pipeline, portfolio) in enumerate(self.books):
+                keys[name] = self._key(name, symbols, start, end)
+                cached = self.cache.get(keys[name])
+                if cached is None:
+                    books.append((name, pipeline, portfolio))
+                else:
+                    self.books[i] = (name, pipeline, cached)
+            if not books:
+                log.info(f"批量运行全部命中缓存: {len(self.books)} 个组合")
+                return {name: portfolio for name, _, portfolio in self.books}
+
+        self.aggregator = aggregator = BarAggregator()
+        prices: Dict[str, float] = {}
+        preclose: Dict[str, float] = {}
+        move: Dict[str, float] = {}
+        current_day = None
+        ticks = 0
+
+        last_ts = None
+        for ts, bars in self.store.stream(symbols, start, end):
+            day = int(ts // 86400)
+            if day != current_day:
+                # 新交易日：上一日最后价格作为昨收，记录日终净值，重置各组合额度
+                preclose = dict(prices)
+                move = {}
+                current_day = day
+                for _, _, portfolio in books:
+                    if last_ts is not None:
+                        portfolio.mark(last_ts, prices)
+                    portfolio.new_day(prices)
+
+            # 共享特征：每个tick只算一次
+            aggregator.update_bars(bars)
+            for sym, bar in bars.items():
+                prices[sym] = bar.close
+                pre = preclose.get(sym)
+                if pre:
+                    move[sym] = (bar.close - pre) / pre * 100.0
+            shared = {
+                'time': ts,
+                'prices': prices,
+                'preclose': preclose,
+                'move': move,
+                'vix': prices.get(self.vix_symbol, float('nan')),
+                'bars': aggregator,
+            }
+
+            now = datetime.fromtimestamp(ts, timezone.utc).replace(tzinfo=None)
+            for name, pipeline, portfolio in books:
+                portfolio.on_bars(now, bars)
+                pipeline.execute(ChainMap({
+                    'portfolio': name,
+                    'nav': portfolio.analytics.equity,
+                    'daily_limit': portfolio.daily_limit,
+                    'daily_used': portfolio.daily_used,
+                }, shared))
+            ticks += 1
+            last_ts = ts
+            if self.profiler is not None:
+                self.profiler.maybe_sample()
+
+        for name, _, portfolio in books:
+            if last_ts is not None:
+                portfolio.mark(last_ts, prices)
+            if self.cache is not None:
+                self.cache.put(keys[name], portfolio)
+
+        log.info(f"批量运行完成: {len(books)}/{len(self.books)} 个组合, {ticks} 个tick")
+        if self.profiler is not None:
+            self.profiler.sample()
+            log.info(self.profiler.report())
+        return {name: portfolio for name, _, portfolio in self.books}
@@ -0,0 +1,445 @@
+import fnmatch
+import gc
+import json
+import os
+import random
+import sys
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# 默认基线文件（与机器相关，不同机器请各自保存）
+BASELINE_PATH = "./benchmarks/baseline.json"
+
+
+@dataclass
+class BenchResult:
+    name: str
+    ops: int  # 每次调用的操作数
+    loops: int  # 每轮计时的调用次数
+    ns_per_op: float  # 各轮中最快的一轮
+    ops_per_sec: float
+
+
+@dataclass
+class BenchCase:
+    name: str
+    setup: Callable[[Any], Tuple[Callable[[], Any], int]]
+    params: Tuple[Any, ...]
+    quick: Tuple[Any, ...]
+
+
+class Benchmark:
+    """
+    热路径基准测试：
+    1. 用例在类级别声明（register装饰器），setup(param)用固定种子构造合成数据，返回 (被测函数, 每次调用的操作数)
+    2. 每个用例先预热，再自动确定循环次数使每轮不少于min_time秒，重复repeat轮取最快一轮（计时期间关闭gc）
+    3. 结果保存为JSON基线；compare按ns/op对比，变慢超过threshold视为回归
+    """
+
+    _cases: Dict[str, BenchCase] = {}
+
+    @classmethod
+    def register(cls, name: Optional[str] = None, params: Sequence[Any] = (None,),
+                 quick: Optional[Sequence[Any]] = None):
+        """params为用例的规模/变体，quick为快速模式下只跑的子集（默认同params）"""
+
+        def decorator(setup: Callable[[Any], Tuple[Callable[[], Any], int]]):
+            case_name = name or setup.__name__
+            cls._cases[case_name] = BenchCase(case_name, setup, tuple(params),
+                                              tuple(params if quick is None else quick))
+            return setup
+
+        return decorator
+
+    def __init__(self, repeat: int = 5, min_time: float = 0.05):
+        self.repeat = repeat
+        self.min_time = min_time
+
+    @staticmethod
+    def _label(case: BenchCase, param: Any) -> str:
+        return case.name if param is None else f"{case.name}[{param}]"
+
+    def names(self, quick: bool = False) -> List[str]:
+        return [self._label(case, param) for case in self._cases.values()
+                for param in (case.quick if quick else case.params)]
+
+    def measure(self, func: Callable[[], Any], ops: int, name: str = "") -> BenchResult:
+        """对单个函数计时"""
+        func()  # 预热
+        loops = 1
+        while True:
+            elapsed = self._time(func, loops)
+            if elapsed >= self.min_time * 1e9 or loops >= 1 << 20:
+                break
+            loops *= 2 if elapsed * 10 >= self.min_time * 1e9 else 10
+
+        best = elapsed
+        for _ in range(self.repeat - 1):
+            best = min(best, self._time(func, loops))
+        ns_per_op = best / (loops * ops)
+        return BenchResult(name, ops, loops, ns_per_op, 1e9 / ns_per_op if ns_per_op > 0 else float("inf"))
+
+    @staticmethod
+    def _time(func: Callable[[], Any], loops: int) -> int:
+        enabled = gc.isenabled()
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter_ns()
+            for _ in range(loops):
+                func()
+            return time.perf_counter_ns() - start
+        finally:
+            if enabled:
+                gc.enable()
+
+    def run(self, pattern: Optional[str] = None, quick: bool = False,
+            progress: Optional[Callable[[BenchResult], None]] = None) -> Dict[str, BenchResult]:
+        """运行（名称匹配pattern的）所有用例"""
+        _setup_log()
+        results: Dict[str, BenchResult] = {}
+        for case in self._cases.values():
+            for param in (case.quick if quick else case.params):
+                name = self._label(case, param)
+                if pattern and not fnmatch.fnmatch(name, pattern):
+                    continue
+                func, ops = case.setup(param)
+                results[name] = self.measure(func, ops, name)
+                if progress is not None:
+                    progress(results[name])
+        return results
+
+    # ---------- 基线 ----------
+    @staticmethod
+    def save(results: Dict[str, BenchResult], path: str = BASELINE_PATH):
+        """保存基线（与已有基线合并，只覆盖本次运行的用例）"""
+        baseline = Benchmark.load(path)
+        baseline.update({name: asdict(result) for name, result in results.items()})
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "python": sys.version.split()[0],
+                "platform": sys.platform,
+                "saved_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "results": baseline,
+            }, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def load(path: str = BASELINE_PATH) -> Dict[str, Dict[str, Any]]:
+        if not os.path.exists(path):
+            return {}
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f).get("results", {})
+
+    @staticmethod
+    def compare(results: Dict[str, BenchResult], baseline: Dict[str, Dict[str, Any]],
+                threshold: float = 0.25) -> List[str]:
+        """返回所有比基线慢超过threshold（0.25即25%）的用例"""
+        errors = []
+        for name, result in results.items():
+            base = baseline.get(name)
+            if not base or base.get("ns_per_op", 0) <= 0:
+                continue
+            ratio = result.ns_per_op / base["ns_per_op"]
+            if ratio > 1.0 + threshold:
+                errors.append(f"{name}: {result.ns_per_op:,.1f}ns/op 比基线 {base['ns_per_op']:,.1f}ns/op "
+                              f"慢 {(ratio - 1.0) * 100:.1f}% (阈值 {threshold * 100:.0f}%)")
+        return errors
+
+
+def _setup_log():
+    """基准测试期间日志只输出到空设备，不写文件；日志已初始化时保持原配置"""
+    from Log import log
+    if log.initialized:
+        return
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")  # loguru在添加控制台输出时捕获当前的sys.stdout
+    try:
+        log.configure(log_level="INFO", log_to_file=False)
+        log.get()
+    finally:
+        sys.stdout = stdout
+
+
+# ============ 合成数据 ============
+# 各标的的σ分层配置（同sample.py中的layer_cfg）
+LAYER_CFG = [
+    {'sigma0': 1.83, 'sigma1': 3.72, 'sigma2': 7.50, 'volume': 0.10, 'max_short_ratio': 0.30},
+    {'sigma0': 3.18, 'sigma1': 6.51, 'sigma2': 13.20, 'volume': 0.10, 'max_short_ratio': 0.30},
+    {'sigma0': 1.59, 'sigma1': 3.24, 'sigma2': 6.54, 'volume': 0.10, 'max_short_ratio': 0.50},
+    {'sigma0': 4.10, 'sigma1': 8.16, 'sigma2': 16.28, 'volume': 0.10, 'max_short_ratio': 0.50},
+]
+STRATEGIES_PER_TARGET = 10
+
+
+def _symbol(i: int) -> str:
+    return f"S{i:05d}"
+
+
+def _target_dicts(count: int) -> List[Dict[str, Any]]:
+    return [{'name': _symbol(i), 'holding_weight': 1 + i % 7} for i in range(count)]
+
+
+def _strategy_dicts(count: int, name: str = "bench_sigma") -> List[Dict[str, Any]]:
+    dicts = []
+    for i in range(count):
+        conf = LAYER_CFG[i % len(LAYER_CFG)]
+        dicts.append({
+            'name': name,
+            'priority': i % STRATEGIES_PER_TARGET,
+            'risk': [],
+            'params': {'sigma_level': [conf['sigma0'], conf['sigma1'], conf['sigma2']],
+                       'volume': conf['volume'], 'max_short_ratio': conf['max_short_ratio']},
+        })
+    return dicts
+
+
+def _triggers(count: int, name: str = "bench_sigma"):
+    """count个触发器，每个标的STRATEGIES_PER_TARGET个不同priority的策略"""
+    from Pojo import Env, Strategy, Target
+    from TradingTrigger import TradingTrigger
+
+    env = Env(total_holding_weight=float(count))
+    targets = [Target(name=_symbol(i), holding_percentage=1.0 / max(count // STRATEGIES_PER_TARGET, 1))
+               for i in range((count + STRATEGIES_PER_TARGET - 1) // STRATEGIES_PER_TARGET)]
+    strategies = [Strategy.from_dict(d) for d in _strategy_dicts(count, name)]
+    return [TradingTrigger.bind(env, targets[i // STRATEGIES_PER_TARGET], strategies[i]) for i in range(count)]
+
+
+def _market(symbols: int, seed: int = 7) -> Tuple[Dict[str, float], Dict[str, float]]:
+    """(prices, preclose)：约三成标的高开超过sigma0"""
+    rng = random.Random(seed)
+    preclose = {_symbol(i): rng.uniform(5.0, 80.0) for i in range(symbols)}
+    prices = {sym: pre * (1.0 + rng.gauss(0.0, 0.03)) for sym, pre in preclose.items()}
+    return prices, preclose
+
+
+def _register_strategies():
+    from Pojo import ProposedOrder
+    from SigmaLayer import short_shares
+    from StrategyRegister import StrategyRegister
+
+    register = StrategyRegister()
+    if "bench_sigma" in register:
+        return
+
+    @register.register("bench_sigma")
+    def bench_sigma(trigger):
+        """合成策略：按FeatureGraph的涨跌幅与σ分层决定做空股数"""
+        env = register.env
+        features = env['features']
+        symbol = trigger.target.name
+        diff = features['move'].get(symbol)
+        if diff is None:
+            return None
+        params = trigger.strategy.params
+        sigma = params['sigma_level']
+        price = env['prices'][symbol]
+        shares, layer = short_shares(
+            diff,
+            {'sigma0': sigma[0], 'sigma1': sigma[1], 'sigma2': sigma[2],
+             'max_short_ratio': params['max_short_ratio']},
+            features['nav'], price, 0.0, features['remaining_cap'],
+            features.effective_volume(params['volume']))
+        if shares <= 0:
+            return None
+        return ProposedOrder(target=symbol, strategy=trigger.strategy.name, symbol=symbol, quantity=-shares,
+                             price=price, priority=trigger.strategy.priority, tag=f"L{layer}")
+
+
+# ============ 用例 ============
+@Benchmark.register(params=(10, 100, 1000, 10000, 100000), quick=(10, 1000, 10000))
+def pipeline_add(count: int):
+    """TradingPipeline.add：每次调用新建pipeline并加入count个触发器"""
+    from TradingPipeline import TradingPipeline
+
+    triggers = _triggers(count)
+
+    def run():
+        pipeline = TradingPipeline.create()
+        for trigger in triggers:
+            pipeline.add(trigger)
+
+    return run, count
+
+
+@Benchmark.register(params=(10, 100, 1000, 10000), quick=(10, 1000))
+def pipeline_execute(count: int):
+    """TradingPipeline.execute：count个触发器、每次调用10个tick，ops为执行的触发器数"""
+    from TradingPipeline import TradingPipeline
+
+    _register_strategies()
+    pipeline = TradingPipeline.create()
+    for trigger in _triggers(count):
+        pipeline.add(trigger)
+    pipeline.compile()
+
+    prices, preclose = _market(max(count // STRATEGIES_PER_TARGET, 1))
+    ticks = 10
+
+    def run():
+        for t in range(ticks):
+            pipeline.execute({
+                'time': t,
+                'vix': 25.0 + t,
+                'vix_threshold': 30.0,
+                'nav': 1e7,
+                'daily_limit': 4e6,
+                'daily_used': 0.0,
+                'prices': prices,
+                'preclose': preclose,
+            })
+
+    return run, count * ticks
+
+
+@Benchmark.register(params=(1000,))
+def trigger_chain(count: int):
+    """TradingTrigger.create(env).on(target).when(strategy)（pipeline.load的dict配置路径）"""
+    from TradingTrigger import TradingTrigger
+
+    env = {'total_holding_weight': float(count)}
+    targets = _target_dicts(count)
+    strategies = _strategy_dicts(count)
+
+    def run():
+        for target, strategy in zip(targets, strategies):
+            TradingTrigger.create(env).on(target).when(strategy)
+
+    return run, count
+
+
+@Benchmark.register(params=(10000,))
+def trigger_stream(count: int):
+    """TradingTrigger的filter -> transform -> batch算子链"""
+    from TradingTrigger import TradingTrigger
+
+    source = list(range(count))
+
+    def run():
+        trigger = TradingTrigger()
+        trigger.source = source
+        trigger.operations = []
+        for _ in trigger.filter(lambda x: x % 3).transform(lambda x: x * 2).batch(64).execute():
+            pass
+
+    return run, count
+
+
+@Benchmark.register(params=("Env", "Target", "Strategy", "ProposedOrder"))
+def pojo_from_dict(kind: str):
+    """Pojo.from_dict：1000个带多余字段的dict"""
+    import Pojo
+
+    cls = getattr(Pojo, kind)
+    count = 1000
+    if kind == "Env":
+        data = [{'total_holding_weight': float(i), 'unused': i} for i in range(count)]
+    elif kind == "Target":
+        data = [dict(d, strategies=[]) for d in _target_dicts(count)]
+    elif kind == "Strategy":
+        data = _strategy_dicts(count)
+    else:
+        data = [{'target': _symbol(i), 'strategy': 'bench_sigma', 'symbol': _symbol(i), 'quantity': -i,
+                 'price': 10.0 + i, 'priority': i % 3, 'tag': 'L1', 'unused': None} for i in range(count)]
+    from_dict = cls.from_dict
+
+    def run():
+        for d in data:
+            from_dict(d)
+
+    return run, count
+
+
+@Benchmark.register(params=("str", "dict"))
+def log_enabled(kind: str):
+    """已启用级别（INFO）的日志，每次调用1000条"""
+    from Log import log
+
+    count = 1000
+    message = "tick完成" if kind == "str" else {'symbol': 'SQQQ', 'layer': 2, 'shares': -1200}
+    info = log.get().info
+
+    def run():
+        for _ in range(count):
+            info(message)
+
+    return run, count
+
+
+@Benchmark.register(params=("str", "dict"))
+def log_disabled(kind: str):
+    """被级别过滤掉的日志（INFO级别下的DEBUG），每次调用1000条"""
+    from Log import log
+
+    count = 1000
+    message = "tick完成" if kind == "str" else {'symbol': 'SQQQ', 'layer': 2, 'shares': -1200}
+    debug = log.get().debug
+
+    def run():
+        for _ in range(count):
+            debug(message)
+
+    return run, count
+
+
+@Benchmark.register(params=(100, 1000, 10000, 100000), quick=(100, 10000))
+def sigma_layer(symbols: int):
+    """σ分层做空决策：对symbols个标的各执行一次effective_volume + short_shares"""
+    from SigmaLayer import effective_volume, short_shares
+
+    prices, preclose = _market(symbols)
+    rows = []
+    for i, sym in enumerate(prices):
+        rows.append(((prices[sym] - preclose[sym]) / preclose[sym] * 100.0, LAYER_CFG[i % len(LAYER_CFG)],
+                     prices[sym]))
+    nav = 1e7
+
+    def run():
+        remaining = 4e6
+        for diff, conf, price in rows:
+            volume = effective_volume(conf['volume'], 28.0, 30.0, 0.40)
+            shares, _ = short_shares(diff, conf, nav, price, 0.0, remaining, volume)
+            remaining -= shares * price
+
+    return run, symbols
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="热路径基准测试")
+    parser.add_argument("pattern", nargs="?", default=None, help="只运行名称匹配的用例，如 'pipeline_*'")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=0.25, help="回归阈值，0.25表示慢25%%")
+    parser.add_argument("--save", action="store_true", help="把本次结果保存为基线")
+    parser.add_argument("--quick", action="store_true", help="只运行较小规模")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--imports", action="store_true", help="同时检查模块导入时加载的依赖")
+    args = parser.parse_args()
+
+    baseline = Benchmark.load(args.baseline)
+
+    def report(result: BenchResult):
+        base = baseline.get(result.name)
+        delta = f"{(result.ns_per_op / base['ns_per_op'] - 1.0) * 100:+.1f}%" if base else "   -"
+        print(f"{result.name:<32} {result.ns_per_op:>14,.1f} ns/op {result.ops_per_sec:>14,.0f} ops/s  {delta}")
+
+    results = Benchmark(repeat=args.repeat).run(args.pattern, args.quick, progress=report)
+    errors = Benchmark.compare(results, baseline, args.threshold)
+    if args.imports:
+        from ImportBudget import check
+        errors.extend(check())
+
+    if args.save:
+        Benchmark.save(results, args.baseline)
+        print(f"基线已保存: {args.baseline}")
+    for error in errors:
+        print(f"✗ {error}")
+    if errors:
+        sys.exit(1)
+    print(f"✓ {len(results)} 个用例均未超出回归阈值 {args.threshold * 100:.0f}%")
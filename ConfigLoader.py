@@ -0,0 +1,220 @@
+import inspect
+import json
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from Pojo import Config, Env, Strategy, Target
+
+# 兼容config.json的写法：参数直接写在标的上
+TARGET_LEVEL_PARAMS = ("sigma_level", "volume", "max_short_ratio")
+
+
+def _log_params():
+    from Log import Log
+    return [Log.__init__], ()
+
+
+def _scheduler_params():
+    from TradingPipeline import TradingPipeline
+    return [TradingPipeline.schedule], ()
+
+
+def _memory_params():
+    from MemoryProfiler import MemoryProfiler
+    return [MemoryProfiler.__init__], ("enabled",)
+
+
+def _metrics_params():
+    from Metrics import Metrics
+    return [Metrics.serve], ("dump_path", "dump_interval")  # dump_every(path, interval)
+
+
+# environment下以**kwargs传给构造函数/方法的配置段 -> (接收这些参数的函数, 额外允许的键)
+ENVIRONMENT_SECTIONS: Dict[str, Callable[[], tuple]] = {
+    "log": _log_params,
+    "scheduler": _scheduler_params,
+    "memory": _memory_params,
+    "metrics": _metrics_params,
+}
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class ConfigLoader:
+    """
+    统一配置加载：
+    1. yaml使用C加速的CSafeLoader（不可用时退回SafeLoader），json使用标准库（自带C加速）
+    2. 一次遍历同时完成校验与规范化，所有错误收集后一次性报出
+    3. 兼容config.yaml与config.json两种写法：
+       - params / param
+       - 参数写在策略上 / 直接写在标的上（此时生成default_strategy策略）
+    4. 规范化：持仓权重归一化为holding_percentage，sigma_level升序，缺省priority按出现顺序
+    5. environment下的log/scheduler/memory/metrics按接收它们的函数签名校验键名
+    """
+
+    def __init__(self, default_strategy: str = "default"):
+        self.default_strategy = default_strategy
+        self.errors: List[str] = []
+
+    def load(self, path: str) -> Config:
+        """读取并解析配置文件（.yaml/.yml/.json）"""
+        path = Path(path)
+        with open(path, 'r', encoding='utf-8') as file:
+            if path.suffix.lower() == ".json":
+                data = json.load(file)
+            else:
+                import yaml
+                loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+                data = yaml.load(file, Loader=loader)
+        return self.parse(data, source=str(path))
+
+    def parse(self, data: Any, source: str = "<config>") -> Config:
+        """校验并规范化已解析的配置，有错误时抛出ValueError（包含全部错误）"""
+        self.errors = []
+        config = Config()
+
+        if not isinstance(data, dict):
+            self._error("", "配置根节点应为映射")
+            self._raise(source)
+
+        environment = data.get('environment', {})
+        if not isinstance(environment, dict):
+            self._error("environment", "应为映射")
+            environment = {}
+        config.environment = environment
+        for section, params in ENVIRONMENT_SECTIONS.items():
+            if section in environment:
+                self._section(environment[section], f"environment.{section}", *params())
+
+        targets = data.get('targets')
+        if not isinstance(targets, list) or not targets:
+            self._error("targets", "应为非空列表")
+            targets = []
+
+        seen = set()
+        total_weight = 0.0
+        for i, raw in enumerate(targets):
+            path = f"targets[{i}]"
+            target = self._target(raw, path, seen)
+            if target is None:
+                continue
+            total_weight += target.holding_weight
+            config.targets.append(target)
+            config.strategies[target.name] = self._strategies(raw, path)
+
+        if config.targets and total_weight <= 0:
+            self._error("targets", "holding_weight之和应大于0")
+        self._raise(source)
+
+        config.env = Env(total_holding_weight=total_weight)
+        for target in config.targets:
+            target.holding_percentage = target.holding_weight / total_weight
+        return config
+
+    def _section(self, raw: Any, path: str, funcs: Iterable[Callable], extra: Iterable[str] = ()):
+        """校验以**kwargs传入funcs的配置段，未知的键在这里报出而不是运行时TypeError"""
+        if not isinstance(raw, dict):
+            self._error(path, "应为映射")
+            return
+        allowed = set(extra)
+        for func in funcs:
+            for name, param in inspect.signature(func).parameters.items():
+                if param.kind == param.VAR_KEYWORD:
+                    return
+                if name != "self" and param.kind != param.VAR_POSITIONAL:
+                    allowed.add(name)
+        for key in raw:
+            if key not in allowed:
+                self._error(f"{path}.{key}", f"未知的参数，可选: {', '.join(sorted(allowed))}")
+
+    def _target(self, raw: Any, path: str, seen: set) -> Optional[Target]:
+        if not isinstance(raw, dict):
+            self._error(path, "应为映射")
+            return None
+
+        name = raw.get('name')
+        if not isinstance(name, str) or not name:
+            self._error(f"{path}.name", "应为非空字符串")
+            return None
+        if name in seen:
+            self._error(f"{path}.name", f"标的 {name} 重复")
+        seen.add(name)
+
+        weight = raw.get('holding_weight', 1.0)
+        if not _is_number(weight) or weight < 0:
+            self._error(f"{path}.holding_weight", "应为非负数")
+            weight = 0.0
+        return Target(name=name, holding_weight=float(weight))
+
+    def _strategies(self, raw: Dict[str, Any], path: str) -> List[Strategy]:
+        items = raw.get('strategies')
+        if items is None:
+            # config.json写法：参数直接写在标的上
+            params = {k: raw[k] for k in TARGET_LEVEL_PARAMS if k in raw}
+            items = [{'name': self.default_strategy, 'params': params}] if params else []
+        if not isinstance(items, list):
+            self._error(f"{path}.strategies", "应为列表")
+            return []
+
+        strategies = []
+        priorities = set()
+        for j, item in enumerate(items):
+            spath = f"{path}.strategies[{j}]"
+            if not isinstance(item, dict):
+                self._error(spath, "应为映射")
+                continue
+
+            name = item.get('name')
+            if not isinstance(name, str) or not name:
+                self._error(f"{spath}.name", "应为非空字符串")
+
+            priority = item.get('priority', j + 1)
+            if not isinstance(priority, int) or isinstance(priority, bool):
+                self._error(f"{spath}.priority", "应为整数")
+            elif priority in priorities:
+                self._error(f"{spath}.priority", f"同一标的下优先级 {priority} 重复")
+            priorities.add(priority)
+
+            risk = item.get('risk', [])
+            if not isinstance(risk, list) or not all(isinstance(r, str) for r in risk):
+                self._error(f"{spath}.risk", "应为字符串列表")
+                risk = []
+
+            params = item.get('params', item.get('param', {}))
+            params = self._params(params, f"{spath}.params")
+
+            strategies.append(Strategy(name=name, priority=priority, params=params, risk=list(risk)))
+
+        strategies.sort(key=lambda s: s.priority if isinstance(s.priority, int) else 0)
+        return strategies
+
+    def _params(self, params: Any, path: str) -> Dict[str, Any]:
+        if not isinstance(params, dict):
+            self._error(path, "应为映射")
+            return {}
+        params = dict(params)
+
+        if 'sigma_level' in params:
+            levels = params['sigma_level']
+            if not isinstance(levels, list) or not levels or not all(_is_number(x) and x > 0 for x in levels):
+                self._error(f"{path}.sigma_level", "应为正数列表")
+            else:
+                params['sigma_level'] = sorted(float(x) for x in levels)
+
+        for key in ('volume', 'max_short_ratio'):
+            if key in params:
+                value = params[key]
+                if not _is_number(value) or not 0 < value <= 1:
+                    self._error(f"{path}.{key}", "应在(0, 1]之间")
+                else:
+                    params[key] = float(value)
+        return params
+
+    def _error(self, path: str, message: str):
+        self.errors.append(f"{path}: {message}" if path else message)
+
+    def _raise(self, source: str):
+        if self.errors:
+            raise ValueError(f"配置 {source} 有 {len(self.errors)} 处错误:\n" + "\n".join(self.errors))
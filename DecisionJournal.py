@@ -0,0 +1,227 @@
+import mmap
+import os
+import pickle
+import struct
+import time
+from dataclasses import astuple
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from FeatureGraph import FEATURES_KEY
+from Metrics import metrics
+from Pojo import ProposedOrder
+
+# 文件布局：
+#   header: magic(4s) version(I) committed(Q)       -> 16字节，committed为已完整写入的字节数（含header）
+#   record: length(I) type(B) payload(length字节)    -> payload为pickle编码
+#   第一条记录为START：pipeline的起始状态、记录时是否设置了订单出口
+MAGIC = b"DJNL"
+VERSION = 1
+HEADER = struct.Struct("<4sIQ")
+RECORD = struct.Struct("<IB")
+TICK = 1
+START = 2
+
+_PICKLE_PROTOCOL = pickle.HIGHEST_PROTOCOL
+
+
+class DecisionJournal:
+    """
+    决策日志（只追加的二进制文件，mmap写入）：
+    1. 每个tick一条记录：env快照、执行了哪些触发器、策略提出的订单、风控后发出的订单
+    2. 文件按块预分配并mmap，写入只是内存拷贝；按时间间隔flush+fsync
+    3. replay从日志记录的起始状态重新驱动pipeline（不等待真实时间），逐tick比对决策
+    4. env中有无法pickle的对象时跳过该条记录并计数，不影响交易热路径
+    """
+
+    def __init__(self,
+                 path: str,
+                 chunk_size: int = 16 * 1024 * 1024,  # 每次扩容的字节数
+                 fsync_interval: float = 1.0):  # fsync间隔（秒），0表示每条记录都fsync
+        self.path = Path(path)
+        self.chunk_size = chunk_size
+        self.fsync_interval = fsync_interval
+        self.seq = 0
+        self.started = False  # 是否已写入START记录
+        self.skipped = 0
+        self._m_skipped = metrics.counter("journal_records_skipped_total", "无法序列化而跳过的决策记录数")
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        exists = self.path.exists() and self.path.stat().st_size >= HEADER.size
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if not exists:
+            os.ftruncate(self._fd, chunk_size)
+        self._capacity = os.fstat(self._fd).st_size
+        self._mm = mmap.mmap(self._fd, self._capacity)
+
+        if exists:
+            magic, version, committed = HEADER.unpack_from(self._mm, 0)
+            if magic != MAGIC or version != VERSION:
+                self._mm.close()
+                os.close(self._fd)
+                raise ValueError(f"{path} 不是版本 {VERSION} 的决策日志")
+            self._offset = committed
+            for rtype, _ in _iter_records(self._mm, committed):
+                if rtype == TICK:
+                    self.seq += 1
+                elif rtype == START:
+                    self.started = True
+        else:
+            self._offset = HEADER.size
+            HEADER.pack_into(self._mm, 0, MAGIC, VERSION, self._offset)
+        self._last_sync = time.monotonic()
+
+    def _ensure(self, size: int):
+        if self._offset + size <= self._capacity:
+            return
+        self._mm.flush()
+        self._mm.close()
+        self._capacity += max(self.chunk_size, size)
+        os.ftruncate(self._fd, self._capacity)
+        self._mm = mmap.mmap(self._fd, self._capacity)
+
+    def append(self,
+               env: Dict[str, Any],
+               triggers: List[Tuple[str, str]],
+               proposed: List[ProposedOrder],
+               sent: List[ProposedOrder]) -> int:
+        """写入一个tick的决策，返回记录序号；无法序列化时跳过并返回-1"""
+        try:
+            payload = pickle.dumps((
+                self.seq + 1,
+                time.time(),
+                {k: v for k, v in env.items() if k != FEATURES_KEY},  # 特征图可由env重建
+                triggers,
+                [astuple(o) for o in proposed],
+                [astuple(o) for o in sent],
+            ), protocol=_PICKLE_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            self.skipped += 1
+            self._m_skipped.inc()
+            return -1
+        self.seq += 1
+        self._write(TICK, payload)
+
+        now = time.monotonic()
+        if now - self._last_sync >= self.fsync_interval:
+            self.sync()
+            self._last_sync = now
+        return self.seq
+
+    def start(self, state: Dict[str, Any], sink: bool):
+        """写入START记录：pipeline.snapshot()的起始状态，以及是否有订单出口（决定风控敞口是否随订单更新）"""
+        self._write(START, pickle.dumps((state, sink), protocol=_PICKLE_PROTOCOL))
+        self.started = True
+        return self
+
+    def _write(self, rtype: int, payload: bytes):
+        size = RECORD.size + len(payload)
+        self._ensure(size)
+        offset = self._offset
+        RECORD.pack_into(self._mm, offset, len(payload), rtype)
+        self._mm[offset + RECORD.size:offset + size] = payload
+        # 记录写完后再推进committed，崩溃时最多丢失最后一条未完成的记录
+        self._offset = offset + size
+        struct.pack_into("<Q", self._mm, 8, self._offset)
+
+    def sync(self):
+        """flush映射并fsync"""
+        self._mm.flush()
+        os.fsync(self._fd)
+        return self
+
+    def close(self):
+        """同步并把文件截断到实际长度"""
+        self.sync()
+        self._mm.close()
+        os.ftruncate(self._fd, self._offset)
+        os.close(self._fd)
+
+    @staticmethod
+    def _records(path: str) -> Iterator[Tuple[int, bytes]]:
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                magic, version, committed = HEADER.unpack_from(mm, 0)
+                if magic != MAGIC or version != VERSION:
+                    raise ValueError(f"{path} 不是版本 {VERSION} 的决策日志")
+                yield from _iter_records(mm, committed)
+            finally:
+                mm.close()
+
+    @staticmethod
+    def read(path: str) -> Iterator[Dict[str, Any]]:
+        """按顺序读取日志中的所有tick记录"""
+        for rtype, payload in DecisionJournal._records(path):
+            if rtype != TICK:
+                continue
+            seq, wall_time, env, triggers, proposed, sent = pickle.loads(payload)
+            yield {
+                "seq": seq,
+                "time": wall_time,
+                "env": env,
+                "triggers": triggers,
+                "proposed": [ProposedOrder(*o) for o in proposed],
+                "sent": [ProposedOrder(*o) for o in sent],
+            }
+
+    @staticmethod
+    def initial_state(path: str) -> Optional[Tuple[Dict[str, Any], bool]]:
+        """START记录中的 (pipeline起始状态, 是否有订单出口)，没有START记录时返回None"""
+        for rtype, payload in DecisionJournal._records(path):
+            if rtype == START:
+                return pickle.loads(payload)
+        return None
+
+    @staticmethod
+    def replay(path: str, pipeline, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        用日志中的env重新驱动pipeline并比对决策，返回差异列表
+        1. 先恢复日志记录的起始状态（调度器、风控敞口），清空特征缓存
+        2. 记录时有订单出口才更新风控敞口；重放期间不写日志，订单只收集不提交
+        3. 结束后恢复pipeline原来的运行状态
+        """
+        journal, sink = pipeline.journal, pipeline._order_sink
+        live, features = pipeline.snapshot(), pipeline.features.snapshot()
+        initial = DecisionJournal.initial_state(path)
+        if initial is not None:
+            state, recorded_sink = initial
+            pipeline.restore(state)
+        else:
+            recorded_sink = sink is not None
+        pipeline.features.reset()
+        pipeline.journal = None
+        pipeline._order_sink = (lambda orders: None) if recorded_sink else None
+
+        diffs = []
+        try:
+            for i, record in enumerate(DecisionJournal.read(path)):
+                if limit is not None and i >= limit:
+                    break
+                pipeline.execute(record["env"])
+                replayed = {
+                    "triggers": pipeline.last_triggers,
+                    "proposed": pipeline.last_proposed,
+                    "sent": pipeline.last_orders,
+                }
+                for field, value in replayed.items():
+                    if value != record[field]:
+                        diffs.append({"seq": record["seq"], "field": field,
+                                      "recorded": record[field], "replayed": value})
+        finally:
+            pipeline.restore(live)
+            pipeline.features.restore(features)
+            pipeline.journal = journal
+            pipeline._order_sink = sink
+        return diffs
+
+
+def _iter_records(mm, end: int) -> Iterator[Tuple[int, bytes]]:
+    offset = HEADER.size
+    while offset + RECORD.size <= end:
+        length, rtype = RECORD.unpack_from(mm, offset)
+        start = offset + RECORD.size
+        if start + length > end:
+            break
+        yield rtype, mm[start:start + length]
+        offset = start + length
@@ -0,0 +1,177 @@
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+# execute时挂在env上的键
+FEATURES_KEY = "features"
+
+_MISSING = object()
+
+
+class Feature:
+    """声明的特征：依赖的env输入、依赖的其他特征、计算函数 func(env, *依赖特征值)"""
+
+    __slots__ = ("name", "inputs", "deps", "func")
+
+    def __init__(self, name: str, inputs: Tuple[str, ...], deps: Tuple[str, ...], func: Callable[..., Any]):
+        self.name = name
+        self.inputs = inputs
+        self.deps = deps
+        self.func = func
+
+
+def _same(old: Any, new: Any) -> bool:
+    if old is new:
+        return True
+    if type(old) is not type(new):
+        return False
+    if isinstance(new, (int, float, str, bool)):
+        return old == new or (old != old and new != new)  # NaN
+    if hasattr(new, "shape") and hasattr(new, "dtype"):
+        # numpy数组：逐元素比较，NaN视为相等（非数值类型不支持equal_nan）
+        import numpy
+        try:
+            return numpy.array_equal(old, new, equal_nan=True)
+        except TypeError:
+            return numpy.array_equal(old, new)
+    return False
+
+
+class FeatureGraph:
+    """
+    每个tick共享的特征DAG（挂在env['features']上）：
+    1. 特征在类级别声明一次（register装饰器），只能依赖已声明的特征，因此不会成环
+    2. 首次访问时才计算，本tick内缓存，所有触发器共享同一份结果
+    3. bind(env)时逐个比较声明的输入，只让变化的输入的下游特征失效
+       注意：可变容器（如原地更新的prices字典）按对象身份比较，需同时依赖time等每tick变化的输入
+    """
+
+    _features: Dict[str, Feature] = {}
+
+    @classmethod
+    def register(cls, name: Optional[str] = None, inputs: Tuple[str, ...] = (), deps: Tuple[str, ...] = ()):
+        def decorator(func: Callable[..., Any]):
+            feature_name = name or func.__name__
+            unknown = [d for d in deps if d not in cls._features]
+            if unknown:
+                raise ValueError(f"特征 {feature_name} 依赖未声明的特征: {unknown}")
+            cls._features[feature_name] = Feature(feature_name, tuple(inputs), tuple(deps), func)
+            return func
+
+        return decorator
+
+    def __init__(self):
+        self.env: Mapping[str, Any] = {}
+        self.computed = 0  # 累计计算次数
+        self._values: Dict[str, Any] = {}
+        self._seen: Dict[str, Any] = {}
+        # 输入与特征可以同名（如nav），下游分开记录
+        self._input_dependents: Dict[str, List[str]] = {}
+        self._dependents: Dict[str, List[str]] = {}
+        for feature in self._features.values():
+            for key in feature.inputs:
+                self._input_dependents.setdefault(key, []).append(feature.name)
+            for key in feature.deps:
+                self._dependents.setdefault(key, []).append(feature.name)
+
+    def bind(self, env: Mapping[str, Any]) -> "FeatureGraph":
+        """绑定本tick的env，使输入有变化的特征失效"""
+        self.env = env
+        seen = self._seen
+        for key, dependents in self._input_dependents.items():
+            value = env.get(key, _MISSING)
+            if key not in seen or not _same(seen[key], value):
+                seen[key] = value
+                self._invalidate(dependents)
+        return self
+
+    def snapshot(self) -> Dict[str, Any]:
+        """保存已绑定的env与缓存的特征值，用于重放后restore"""
+        return {"env": self.env, "values": dict(self._values), "seen": dict(self._seen)}
+
+    def restore(self, state: Dict[str, Any]):
+        self.env = state["env"]
+        self._values = dict(state["values"])
+        self._seen = dict(state["seen"])
+        return self
+
+    def reset(self):
+        """清空缓存，下一次bind时所有特征重新计算"""
+        self.env = {}
+        self._values = {}
+        self._seen = {}
+        return self
+
+    def invalidate(self, key: str):
+        """使某个输入（如原地修改过的容器）的所有下游特征失效"""
+        self._seen.pop(key, None)
+        self._invalidate(self._input_dependents.get(key, ()))
+        return self
+
+    def _invalidate(self, names):
+        stack = list(names)
+        while stack:
+            name = stack.pop()
+            self._values.pop(name, None)
+            stack.extend(self._dependents.get(name, ()))
+
+    def get(self, name: str) -> Any:
+        value = self._values.get(name, _MISSING)
+        if value is not _MISSING:
+            return value
+        feature = self._features.get(name)
+        if feature is None:
+            raise KeyError(f"未声明的特征: {name}")
+        value = feature.func(self.env, *(self.get(d) for d in feature.deps))
+        self._values[name] = value
+        self.computed += 1
+        return value
+
+    __getitem__ = get
+
+    def effective_volume(self, base_volume: float) -> float:
+        """VIX调整后的单标的target volume（同sample.py中的_effective_volume）"""
+        override = self.get('volume_override')
+        return float(base_volume) if override is None else override
+
+
+@FeatureGraph.register(inputs=('vix',))
+def vix_level(env) -> float:
+    try:
+        return float(env.get('vix', float('nan')))
+    except (TypeError, ValueError):
+        return float('nan')
+
+
+@FeatureGraph.register(inputs=('vix_threshold',), deps=('vix_level',))
+def vix_high(env, level: float) -> bool:
+    return level == level and level > float(env.get('vix_threshold', 30.0))
+
+
+@FeatureGraph.register(inputs=('vix_high_volume',), deps=('vix_high',))
+def volume_override(env, high: bool) -> Optional[float]:
+    """VIX高于阈值时的统一仓位，否则None（使用各标的的基础仓位）"""
+    return float(env.get('vix_high_volume', 0.40)) if high else None
+
+
+@FeatureGraph.register(inputs=('time', 'prices', 'preclose', 'move'))
+def move(env) -> Dict[str, float]:
+    """相对昨收涨跌幅(%)；env已提供move时直接使用"""
+    provided = env.get('move')
+    if provided is not None:
+        return provided
+    preclose = env.get('preclose') or {}
+    result = {}
+    for sym, price in (env.get('prices') or {}).items():
+        pre = preclose.get(sym)
+        if pre and price:
+            result[sym] = (price - pre) / pre * 100.0
+    return result
+
+
+@FeatureGraph.register(inputs=('nav',))
+def nav(env) -> float:
+    return max(float(env.get('nav', 0.0)), 1e-9)
+
+
+@FeatureGraph.register(inputs=('daily_limit', 'daily_used'))
+def remaining_cap(env) -> float:
+    return max(float(env.get('daily_limit', 0.0)) - float(env.get('daily_used', 0.0)), 0.0)
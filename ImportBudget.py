@@ -0,0 +1,83 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# 本仓库的模块：根目录下的源码文件
+LOCAL_MODULES = frozenset(p.stem for p in Path(ROOT).glob("*.py"))
+
+# 需要控制导入开销的模块 -> 导入时允许连带加载的本仓库模块
+MODULES: Dict[str, List[str]] = {
+    "Pojo": [],
+    "Metrics": ["LatencyStats"],
+    "Log": [],
+    "TradingTrigger": ["Log", "Pojo"],
+    "StrategyRegister": ["LatencyStats", "Log", "Metrics", "Pojo", "TradingTrigger"],
+    "TradingScheduler": ["Log", "Pojo", "TradingTrigger"],
+    "TradingPipeline": ["FeatureGraph", "LatencyStats", "Log", "Metrics", "OrderNetting", "Pojo", "RiskEngine",
+                        "StrategyRegister", "TradingScheduler", "TradingTrigger"],
+}
+
+# 这些依赖只能在真正使用时导入（含其子模块）
+LAZY_DEPENDENCIES = [
+    "loguru", "yaml", "numpy",
+    "http.server", "socketserver", "concurrent.futures", "multiprocessing",
+    "mmap", "pickle", "tracemalloc",
+    "gzip", "bz2", "lzma", "zipfile", "shutil",
+    "fcntl", "termios", "ctypes",
+]
+
+_PROBE = """
+import sys, time
+before = set(sys.modules)
+t = time.perf_counter()
+import {module}
+print(time.perf_counter() - t)
+print(",".join(sorted(set(sys.modules) - before)))
+"""
+
+
+def measure(module: str) -> Dict:
+    """在全新的解释器中导入模块，返回导入耗时（毫秒）与导入时新加载的模块集合"""
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(module=module)],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout.splitlines()
+    loaded = [m for m in out[1].split(",") if m] if len(out) > 1 else []
+    return {"module": module, "ms": float(out[0]) * 1000.0, "loaded": loaded}
+
+
+def check(modules: Dict[str, Sequence[str]] = None, budget_ms: Optional[float] = None) -> List[str]:
+    """
+    检查各模块导入时加载的模块集合，返回所有错误：
+    1. 提前加载了LAZY_DEPENDENCIES中的依赖
+    2. 连带加载了未声明的本仓库模块
+    3. 指定budget_ms时，导入耗时超出预算（耗时受机器负载影响，预算应留足余量）
+    """
+    errors = []
+    for module, allowed in (modules or MODULES).items():
+        result = measure(module)
+        loaded = result["loaded"]
+        eager = [m for m in LAZY_DEPENDENCIES
+                 if any(name == m or name.startswith(m + ".") for name in loaded)]
+        if eager:
+            errors.append(f"{module}: 导入时提前加载了 {', '.join(eager)}")
+        extra = [m for m in loaded if m in LOCAL_MODULES and m != module and m not in allowed]
+        if extra:
+            errors.append(f"{module}: 导入时连带加载了未声明的模块 {', '.join(extra)}")
+        if budget_ms is not None and result["ms"] > budget_ms:
+            errors.append(f"{module}: 导入耗时 {result['ms']:.1f}ms 超出预算 {budget_ms:.1f}ms")
+    return errors
+
+
+if __name__ == '__main__':
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else None
+    errors = check(budget_ms=budget)
+    for error in errors:
+        print(f"✗ {error}")
+    if errors:
+        sys.exit(1)
+    print(f"✓ {len(MODULES)} 个模块导入时均未加载重依赖或未声明的模块")
@@ -0,0 +1,106 @@
+import threading
+from typing import Any, Dict, Hashable, Optional
+
+
+class LatencyHistogram:
+    """
+    对数分桶的延迟直方图（单位：纳秒）：
+    每个2的幂区间分8个子桶，相对误差约12.5%，记录为O(1)
+    """
+
+    __slots__ = ("count", "total", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.max = 0
+        self.buckets: Dict[int, int] = {}
+
+    @staticmethod
+    def _index(ns: int) -> int:
+        if ns < 16:
+            return ns
+        shift = ns.bit_length() - 4
+        return (shift << 3) + (ns >> shift)
+
+    @staticmethod
+    def _lower_bound(index: int) -> int:
+        if index < 16:
+            return index
+        shift = (index >> 3) - 1
+        return ((index & 7) + 8) << shift
+
+    def record(self, ns: int):
+        self.count += 1
+        self.total += ns
+        if ns > self.max:
+            self.max = ns
+        index = self._index(ns) if ns > 0 else 0
+        buckets = self.buckets
+        buckets[index] = buckets.get(index, 0) + 1
+
+    def percentile(self, q: float) -> int:
+        """返回分位数q（0~1）对应的延迟（纳秒）"""
+        if self.count == 0:
+            return 0
+        if q >= 1.0:
+            return self.max
+        rank = max(1, int(q * self.count + 0.5))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(self._lower_bound(index), self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, Any]:
+        """微秒为单位的统计摘要"""
+        return {
+            "count": self.count,
+            "total_us": self.total / 1000.0,
+            "p50_us": self.percentile(0.50) / 1000.0,
+            "p99_us": self.percentile(0.99) / 1000.0,
+            "max_us": self.max / 1000.0,
+        }
+
+
+class LatencyStats:
+    """
+    按函数名和(标的, 策略)两个维度聚合延迟直方图
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.functions: Dict[Hashable, LatencyHistogram] = {}
+        self.strategies: Dict[Hashable, LatencyHistogram] = {}
+
+    def record(self, name: Hashable, ns: int, key: Optional[Hashable] = None):
+        hist = self.functions.get(name)
+        if hist is None:
+            with self._lock:
+                hist = self.functions.setdefault(name, LatencyHistogram())
+        hist.record(ns)
+
+        if key is not None:
+            hist = self.strategies.get(key)
+            if hist is None:
+                with self._lock:
+                    hist = self.strategies.setdefault(key, LatencyHistogram())
+            hist.record(ns)
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """获取当前统计快照"""
+        with self._lock:
+            functions = dict(self.functions)
+            strategies = dict(self.strategies)
+        return {
+            "functions": {str(k): h.summary() for k, h in functions.items()},
+            "strategies": {"/".join(k) if isinstance(k, tuple) else str(k): h.summary()
+                           for k, h in strategies.items()},
+        }
+
+    def reset(self):
+        """清空统计"""
+        with self._lock:
+            self.functions = {}
+            self.strategies = {}
@@ -0,0 +1,193 @@
+from collections import deque
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Deque, Dict, List, Optional
+
+TRADE_LOG_HEADER = (
+    "TRADE_LOG,symbol,direction,quantity,entry_time,entry_price,"
+    "exit_time,exit_price,profit_loss,total_fees,mae,mfe,end_drawdown,duration"
+)
+
+
+@dataclass
+class Trade:
+    """完整的round-trip交易（字段同sample.py中TRADE_LOG的列）"""
+    symbol: str
+    direction: str  # Long / Short
+    quantity: int
+    entry_time: Any
+    entry_price: float
+    exit_time: Any
+    exit_price: float
+    profit_loss: float
+    total_fees: float
+    mae: float
+    mfe: float
+    end_drawdown: float
+    duration: Any
+
+    def to_log(self) -> str:
+        """格式化为一行TRADE_LOG（格式同sample.py的on_end_of_algorithm）"""
+        return (
+            "TRADE_LOG," +
+            f"{self.symbol},{self.direction},{self.quantity},"
+            f"{self.entry_time},{self.entry_price:.4f},"
+            f"{self.exit_time},{self.exit_price:.4f},"
+            f"{self.profit_loss:.2f},{self.total_fees:.2f},"
+            f"{self.mae:.2f},{self.mfe:.2f},{self.end_drawdown:.2f},{self.duration}"
+        )
+
+
+class _OpenTrade:
+    """
+    未平仓交易的增量状态：
+    lots为FIFO队列 [数量, 价格]，open_qty/open_cost随成交维护，
+    因此每个bar更新浮动盈亏、MAE、MFE都是O(1)
+    """
+
+    __slots__ = ("symbol", "sign", "lots", "open_qty", "open_cost", "realized", "fees",
+                 "entry_time", "entry_qty", "entry_value", "exit_qty", "exit_value", "mae", "mfe")
+
+    def __init__(self, symbol: str, sign: int, time):
+        self.symbol = symbol
+        self.sign = sign  # 1多头 / -1空头
+        self.lots: Deque[List[float]] = deque()
+        self.open_qty = 0  # 带符号
+        self.open_cost = 0.0  # 带符号，sum(数量 * 价格)
+        self.realized = 0.0
+        self.fees = 0.0
+        self.entry_time = time
+        self.entry_qty = 0
+        self.entry_value = 0.0
+        self.exit_qty = 0
+        self.exit_value = 0.0
+        self.mae = 0.0
+        self.mfe = 0.0
+
+    def open(self, quantity: int, price: float):
+        self.lots.append([quantity, price])
+        self.open_qty += quantity
+        self.open_cost += quantity * price
+        self.entry_qty += abs(quantity)
+        self.entry_value += abs(quantity) * price
+
+    def close(self, quantity: int, price: float):
+        """按FIFO平掉abs(quantity)股（quantity与持仓方向相反）"""
+        remaining = abs(quantity)
+        self.exit_qty += remaining
+        self.exit_value += remaining * price
+        while remaining and self.lots:
+            lot = self.lots[0]
+            matched = min(remaining, abs(lot[0]))
+            self.realized += self.sign * matched * (price - lot[1])
+            self.open_qty -= self.sign * matched
+            self.open_cost -= self.sign * matched * lot[1]
+            lot[0] -= self.sign * matched
+            remaining -= matched
+            if lot[0] == 0:
+                self.lots.popleft()
+
+    def mark(self, favorable: float, adverse: float):
+        """用bar内最有利/最不利价格更新MAE/MFE"""
+        base = self.realized - self.open_cost
+        self.mfe = max(self.mfe, base + self.open_qty * favorable)
+        self.mae = min(self.mae, base + self.open_qty * adverse)
+
+
+class LocalTradeBuilder:
+    """
+    本地round-trip交易统计（对应QC的TradeBuilder(FLAT_TO_FLAT, FIFO)）：
+    1. 每个标的一个FIFO批次队列，仓位从0到0为一笔交易，反手时拆成平仓+新开仓
+    2. 价格流逐bar更新未平仓交易的MAE/MFE，每笔未平仓交易O(1)
+    3. 输出字段同TRADE_LOG：end_drawdown = profit_loss - mfe
+    """
+
+    def __init__(self):
+        self._open: Dict[str, _OpenTrade] = {}
+        self.closed_trades: List[Trade] = []
+
+    @property
+    def open_trades(self) -> Dict[str, _OpenTrade]:
+        return self._open
+
+    def has_open_position(self, symbol: str) -> bool:
+        return symbol in self._open
+
+    def fill(self, symbol: str, time, quantity: int, price: float, fee: float = 0.0):
+        """处理一笔成交（quantity带符号：正为买入，负为卖出）"""
+        if quantity == 0:
+            return self
+        trade = self._open.get(symbol)
+        if trade is None:
+            trade = self._open[symbol] = _OpenTrade(symbol, 1 if quantity > 0 else -1, time)
+            trade.fees += fee
+            trade.open(quantity, price)
+            trade.mark(price, price)
+            return self
+
+        trade.fees += fee
+        if (quantity > 0) == (trade.sign > 0):
+            trade.open(quantity, price)
+            trade.mark(price, price)
+            return self
+
+        # 减仓/平仓/反手
+        closing = min(abs(quantity), abs(trade.open_qty))
+        trade.close(-trade.sign * closing, price)
+        trade.mark(price, price)
+        if trade.open_qty == 0:
+            self._finish(trade, time)
+            rest = abs(quantity) - closing
+            if rest:
+                # 反手：剩余部分开新交易，手续费已计入上一笔
+                self.fill(symbol, time, (1 if quantity > 0 else -1) * rest, price)
+        return self
+
+    def mark(self, symbol: str, close: float, high: Optional[float] = None, low: Optional[float] = None):
+        """用一根bar更新该标的未平仓交易的MAE/MFE"""
+        trade = self._open.get(symbol)
+        if trade is None:
+            return self
+        high = close if high is None else high
+        low = close if low is None else low
+        if trade.sign > 0:
+            trade.mark(high, low)
+        else:
+            trade.mark(low, high)
+        return self
+
+    def mark_bars(self, bars: Dict[str, Any]):
+        """用一组bar（含high/low/close属性）更新所有未平仓交易"""
+        for symbol, trade in self._open.items():
+            bar = bars.get(symbol)
+            if bar is not None:
+                if trade.sign > 0:
+                    trade.mark(bar.high, bar.low)
+                else:
+                    trade.mark(bar.low, bar.high)
+        return self
+
+    def _finish(self, trade: _OpenTrade, time):
+        del self._open[trade.symbol]
+        duration = time - trade.entry_time
+        if isinstance(duration, (int, float)):
+            duration = timedelta(seconds=duration)
+        self.closed_trades.append(Trade(
+            symbol=trade.symbol,
+            direction="Long" if trade.sign > 0 else "Short",
+            quantity=trade.entry_qty,
+            entry_time=trade.entry_time,
+            entry_price=trade.entry_value / trade.entry_qty,
+            exit_time=time,
+            exit_price=trade.exit_value / trade.exit_qty,
+            profit_loss=trade.realized,
+            total_fees=trade.fees,
+            mae=trade.mae,
+            mfe=trade.mfe,
+            end_drawdown=trade.realized - trade.mfe,
+            duration=duration,
+        ))
+
+    def trade_log(self) -> List[str]:
+        """TRADE_LOG标题行 + 每笔交易一行"""
+        return [TRADE_LOG_HEADER] + [trade.to_log() for trade in self.closed_trades]
@@ -1,13 +1,202 @@
 import json
+import re
 from dataclasses import is_dataclass, asdict
 
-from loguru import logger
 import sys
-import os
+import threading
+import time
 from datetime import datetime, timedelta
-from typing import Any, Optional, Dict
+from typing import TYPE_CHECKING, Any, Callable, Hashable, List, Optional, Dict, Tuple
 from pathlib import Path
-import shutil
+
+if TYPE_CHECKING:
+    from LogMaintenance import LogMaintenance
+
+# 日志文件（含轮转压缩后的文件）
+LOG_PATTERNS = ['*.log', '*.json', '*.gz', '*.zip', '*.bz2', '*.xz']
+
+# 各日志方法对应的loguru级别序号
+LEVEL_NO = {"debug": 10, "info": 20, "success": 25, "warning": 30, "error": 40, "critical": 50}
+
+# loguru的大小写法：B为字节、b为比特，KiB等为1024进制
+_SIZE = re.compile(r"^\s*(\d+(?:\.\d*)?)\s*([kmgtKMGT]?)(i?)([bB])\s*$")
+
+
+def _parse_size(value: Any) -> Optional[float]:
+    """rotation的大小写法（如"10 MB"）转为字节数，按时间轮转等其他写法返回None"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if not isinstance(value, str):
+        return None
+    match = _SIZE.match(value)
+    if match is None:
+        return None
+    number, prefix, binary, unit = match.groups()
+    size = float(number) * (1024 if binary else 1000) ** " kmgt".index(prefix.lower() or " ")
+    return size if unit == "B" else size / 8
+
+
+class QueueDepth:
+    """
+    enqueue文件处理器写入队列的积压条数（入队数 - 写出数），只使用loguru公开的参数：
+    1. filter在写日志的线程中、入队前调用，计为入队
+    2. rotation回调在写线程中、每条记录写入文件前调用，计为写出，同时按大小判断是否轮转
+    只有按大小轮转的处理器可以包装，其余处理器不计入
+    """
+
+    __slots__ = ("enqueued", "written")
+
+    def __init__(self):
+        self.enqueued = 0
+        self.written = 0
+
+    @property
+    def depth(self) -> int:
+        return max(self.enqueued - self.written, 0)
+
+    def filter(self, inner: Optional[Callable[[Dict], bool]] = None) -> Callable[[Dict], bool]:
+        def on_enqueue(record) -> bool:
+            if inner is not None and not inner(record):
+                return False
+            self.enqueued += 1
+            return True
+
+        return on_enqueue
+
+    def rotation(self, size_limit: float) -> Callable[[str, Any], bool]:
+        def on_write(message, file) -> bool:
+            self.written += 1
+            file.seek(0, 2)
+            return file.tell() + len(message) > size_limit
+
+        return on_write
+
+
+class RateLimiter:
+    """
+    按key限流 + 采样：
+    1. 每个key每per秒最多放行rate条（固定窗口）
+    2. every>1时每every条只考虑第1条（确定性采样）
+    3. 被抑制的条数累积，下一次放行时返回，由调用方附在消息后面
+    clock可替换为回测时间（如 lambda: algo.time.timestamp()）
+    """
+
+    __slots__ = ("rate", "per", "every", "clock", "total_suppressed", "_state")
+
+    def __init__(self, rate: int = 10, per: float = 1.0, every: int = 1,
+                 clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.per = per
+        self.every = max(1, every)
+        self.clock = clock
+        self.total_suppressed = 0
+        # key -> [窗口开始时间, 窗口内已放行数, 待汇报的抑制数, 累计调用数]
+        self._state: Dict[Hashable, List[float]] = {}
+
+    def allow(self, key: Hashable = None) -> int:
+        """放行时返回此前被抑制的条数（>=0），抑制时返回-1"""
+        state = self._state.get(key)
+        now = self.clock()
+        if state is None:
+            state = self._state[key] = [now, 0, 0, 0]
+        state[3] += 1
+        if self.every > 1 and (state[3] - 1) % self.every:
+            state[2] += 1
+            self.total_suppressed += 1
+            return -1
+        if now - state[0] >= self.per:
+            state[0] = now
+            state[1] = 0
+        if state[1] >= self.rate:
+            state[2] += 1
+            self.total_suppressed += 1
+            return -1
+        state[1] += 1
+        suppressed = state[2]
+        state[2] = 0
+        return suppressed
+
+    def pending(self) -> List[Tuple[Hashable, int]]:
+        """取出尚未汇报的抑制数（并清零）"""
+        result = []
+        for key, state in self._state.items():
+            if state[2]:
+                result.append((key, int(state[2])))
+                state[2] = 0
+        return result
+
+
+class LogContext:
+    """
+    预绑定上下文的日志句柄：
+    1. bind只在创建时做一次，之后每条日志直接调用绑定好的logger
+    2. 可选限流/采样（limit），默认按调用位置(文件, 行号)区分key
+    3. obj可以是无参函数（如 lambda: f"..."），只有放行时才格式化
+    4. 创建时缓存最低启用级别，低于该级别的日志在限流和格式化之前直接返回
+    """
+
+    __slots__ = ("_owner", "_logger", "_limiter", "_key", "_min_level")
+
+    def __init__(self, owner: "Log", logger, limiter: Optional[RateLimiter] = None, key: Hashable = None):
+        self._owner = owner
+        self._logger = logger
+        self._limiter = limiter
+        self._key = key
+        self._min_level = owner.min_level
+
+    def limit(self, rate: int = 10, per: float = 1.0, every: int = 1, key: Hashable = None,
+              clock: Callable[[], float] = time.monotonic) -> "LogContext":
+        """返回共享同一上下文、带限流/采样的句柄"""
+        return LogContext(self._owner, self._logger, RateLimiter(rate, per, every, clock), key)
+
+    def bind(self, **kwargs) -> "LogContext":
+        return LogContext(self._owner, self._logger.bind(**kwargs), self._limiter, self._key)
+
+    def _emit(self, level: str, obj: Any, title: Optional[str]):
+        if LEVEL_NO[level] < self._min_level:
+            return
+        suppressed = 0
+        if self._limiter is not None:
+            key = self._key
+            if key is None:
+                frame = sys._getframe(2)
+                key = (frame.f_code.co_filename, frame.f_lineno)
+            suppressed = self._limiter.allow(key)
+            if suppressed < 0:
+                self._owner._count(level, suppressed=True)
+                return
+        if callable(obj):
+            obj = obj()
+        message = self._owner._format_message(obj, title)
+        if suppressed:
+            message = f"{message} [此前抑制 {suppressed} 条]"
+        self._owner._count(level)
+        getattr(self._logger, level)(message)
+
+    def debug(self, obj: Any, title: Optional[str] = None):
+        self._emit("debug", obj, title)
+
+    def info(self, obj: Any, title: Optional[str] = None):
+        self._emit("info", obj, title)
+
+    def success(self, obj: Any, title: Optional[str] = None):
+        self._emit("success", obj, title)
+
+    def warning(self, obj: Any, title: Optional[str] = None):
+        self._emit("warning", obj, title)
+
+    def error(self, obj: Any, title: Optional[str] = None):
+        self._emit("error", obj, title)
+
+    def critical(self, obj: Any, title: Optional[str] = None):
+        self._emit("critical", obj, title)
+
+    def flush(self):
+        """汇报尚未随下一条日志带出的抑制数"""
+        if self._limiter is not None:
+            for key, count in self._limiter.pending():
+                self._logger.info(f"[限流] {key} 抑制 {count} 条日志")
+        return self
 
 
 class Log:
@@ -34,7 +223,9 @@ class Log:
                  retention: str = "30 days",  # 日志保留时间
                  compression: str = "zip",  # 压缩格式
                  log_to_file: bool = True,  # 是否写入文件
-                 max_log_files: int = 30):  # 最大日志文件数
+                 max_log_files: int = 30,  # 最大日志文件数
+                 compression_level: Optional[int] = None,  # 压缩级别，None使用各格式默认值
+                 background_maintenance: bool = True):  # 压缩与过期清理是否放到后台线程
         """
         初始化日志配置
 
@@ -44,11 +235,17 @@ class Log:
             log_level: 日志级别 DEBUG/INFO/WARNING/ERROR
             rotation: 日志轮转条件 "10 MB", "1 day", "00:00"
             retention: 日志保留时间 "10 days", "1 month"
-            compression: 压缩格式 "zip", "gz", None
+            compression: 压缩格式 "zip", "gz", "bz2", "xz", None
             log_to_file: 是否写入文件
             max_log_files: 最大日志文件数（超过时自动清理）
+            compression_level: 压缩级别
+            background_maintenance: 轮转后的压缩与过期清理交给后台线程，写日志不等待压缩
         """
         if not hasattr(self, '_initialized'):  # 防止重复初始化
+            # loguru在真正创建日志对象时才导入
+            from loguru import logger
+            self._loguru = logger
+
             self.env = env
             self.log_dir = Path(log_dir)
             self.log_level = log_level
@@ -61,22 +258,41 @@ class Log:
             self._ensure_log_dir()
 
             # 移除默认配置
-            logger.remove()
+            self._loguru.remove()
+
+            # 所有处理器中最低的级别序号，低于它的日志不格式化
+            self.min_level = LEVEL_NO["critical"] + 1
 
             # 配置控制台输出
             self._setup_console()
 
+            # 文件处理器写入队列的积压
+            self._queue_depth = QueueDepth()
+
+            # 后台维护线程：轮转压缩与过期清理（不支持的压缩格式仍交给loguru同步处理）
+            self._maintenance: Optional["LogMaintenance"] = None
+            if log_to_file and background_maintenance:
+                from LogMaintenance import CODECS, LogMaintenance
+                if compression is None or compression in CODECS:
+                    self._maintenance = LogMaintenance(compression, compression_level).recover(self.log_dir)
+
             # 配置文件输出
             if log_to_file:
                 self._setup_file_output(rotation, retention, compression)
 
             # 绑定logger上下文
-            self._logger = logger.bind(
+            self._logger = self._loguru.bind(
                 name=self.__class__.__name__,
                 env=self.env,
                 timestamp=datetime.now().isoformat()
             )
 
+            # 指标：各级别日志数量、被限流抑制的数量、写入队列积压
+            self._record_counters = {}
+            self._suppressed_counters = {}
+            from Metrics import metrics
+            metrics.gauge("log_queue_pending_records", "日志写入队列中尚未落盘的记录数").set_function(self.queue_depth)
+
             self._initialized = True
             # 记录初始化日志
             self._logger.info(f"日志系统初始化完成 - 环境: {env}, 级别: {log_level}")
@@ -124,7 +340,8 @@ class Log:
             "<level>{message}</level>"
         )
 
-        logger.add(
+        self._enable(self.log_level)
+        self._loguru.add(
             sys.stdout,
             format=console_format,
             level=self.log_level,
@@ -200,8 +417,13 @@ class Log:
 
     def _add_file_handler(self, filepath: Path, **kwargs):
         """添加文件处理器"""
+        if self._maintenance is not None:
+            kwargs['compression'] = self._maintenance.compression()
+            kwargs['retention'] = self._maintenance.retention(self._parse_retention(kwargs['retention']))
+        self._count_queue(kwargs)
+        self._enable(kwargs.get('level', "DEBUG"))
         try:
-            logger.add(
+            self._loguru.add(
                 str(filepath),
                 encoding="utf-8",
                 enqueue=True,  # 线程安全
@@ -215,12 +437,15 @@ class Log:
 
     def _add_file_handler_fallback(self, filepath: Path):
         """备用的文件处理器配置（简化版）"""
+        kwargs = {"rotation": "10 MB"}
+        self._count_queue(kwargs)
+        self._enable("DEBUG")
         try:
-            logger.add(
+            self._loguru.add(
                 str(filepath),
                 encoding="utf-8",
                 enqueue=True,
-                rotation="10 MB",
+                **kwargs,
                 retention="30 days",
                 format="{time:YYYY-MM-DD HH:mm:ss} | {level} | {message}"
             )
@@ -228,6 +453,17 @@ class Log:
         except Exception as e:
             print(f"✗ 备用配置也失败 {filepath.name}: {e}")
 
+    def _enable(self, level: str):
+        """记录新增处理器的级别，更新最低启用级别"""
+        self.min_level = min(self.min_level, self._loguru.level(level).no)
+
+    def _count_queue(self, kwargs: Dict[str, Any]):
+        """按大小轮转的处理器：包装filter与rotation以统计写入队列积压"""
+        size = _parse_size(kwargs.get('rotation'))
+        if size is not None:
+            kwargs['rotation'] = self._queue_depth.rotation(size)
+            kwargs['filter'] = self._queue_depth.filter(kwargs.get('filter'))
+
     def _get_file_format(self, include_extra: bool = True) -> str:
         """获取文件日志格式"""
         base_format = (
@@ -313,43 +549,56 @@ class Log:
 
     def debug(self, obj: Any, title: Optional[str] = None, **kwargs):
         """调试日志"""
-        message = self._format_message(obj, title)
-        self._log_with_context("debug", message, **kwargs)
+        self._log("debug", obj, title, **kwargs)
 
     def info(self, obj: Any, title: Optional[str] = None, **kwargs):
         """信息日志"""
-        message = self._format_message(obj, title)
-        self._log_with_context("info", message, **kwargs)
+        self._log("info", obj, title, **kwargs)
 
     def success(self, obj: Any, title: Optional[str] = None, **kwargs):
         """成功日志"""
-        message = self._format_message(obj, title)
-        self._log_with_context("success", message, **kwargs)
+        self._log("success", obj, title, **kwargs)
 
     def warning(self, obj: Any, title: Optional[str] = None, **kwargs):
         """警告日志"""
-        message = self._format_message(obj, title)
-        self._log_with_context("warning", message, **kwargs)
+        self._log("warning", obj, title, **kwargs)
 
     def error(self, obj: Any, title: Optional[str] = None, **kwargs):
         """错误日志"""
-        message = self._format_message(obj, title)
-        self._log_with_context("error", message, **kwargs)
+        self._log("error", obj, title, **kwargs)
 
     def critical(self, obj: Any, title: Optional[str] = None, **kwargs):
         """严重错误日志"""
-        message = self._format_message(obj, title)
-        self._log_with_context("critical", message, **kwargs)
+        self._log("critical", obj, title, **kwargs)
 
     def exception(self, obj: Any, title: Optional[str] = None, **kwargs):
         """异常日志（自动包含堆栈跟踪）"""
-        message = self._format_message(obj, title)
-        self._log_with_context("error", message, exc_info=True, **kwargs)
+        self._log("error", obj, title, exc_info=True, **kwargs)
+
+    def _log(self, level: str, obj: Any, title: Optional[str], **kwargs):
+        # 没有处理器接收该级别时直接返回，不格式化
+        if LEVEL_NO[level] < self.min_level:
+            return
+        self._log_with_context(level, self._format_message(obj, title), **kwargs)
+
+    def _count(self, level: str, suppressed: bool = False):
+        counters = self._suppressed_counters if suppressed else self._record_counters
+        counter = counters.get(level)
+        if counter is None:
+            from Metrics import metrics
+            if suppressed:
+                counter = metrics.counter("log_records_suppressed_total", "被限流/采样抑制的日志数", level=level)
+            else:
+                counter = metrics.counter("log_records_total", "日志记录数", level=level)
+            counters[level] = counter
+        counter.inc()
 
     def _log_with_context(self, level: str, message: str, **kwargs):
         """带上下文的日志记录"""
-        # 创建带上下文的logger
-        context_logger = self._logger.bind(**kwargs)
+        self._count(level)
+
+        # 有额外上下文时才创建新的logger（热路径请使用context/limited预绑定）
+        context_logger = self._logger.bind(**kwargs) if kwargs else self._logger
 
         # 调用对应级别的方法
         log_method = getattr(context_logger, level)
@@ -360,15 +609,28 @@ class Log:
         self._logger = self._logger.bind(**kwargs)
         return self
 
+    def context(self, **kwargs) -> LogContext:
+        """预绑定上下文的日志句柄，热路径上复用，避免每次调用都bind"""
+        return LogContext(self, self._logger.bind(**kwargs) if kwargs else self._logger)
+
+    def limited(self, rate: int = 10, per: float = 1.0, every: int = 1, key: Hashable = None,
+                **kwargs) -> LogContext:
+        """带限流/采样的预绑定句柄：每个调用位置每per秒最多rate条，每every条采样1条"""
+        return self.context(**kwargs).limit(rate, per, every, key)
+
     def patch(self, **kwargs):
         """临时修改上下文"""
         return self._logger.patch(lambda record: record["extra"].update(kwargs))
 
+    def queue_depth(self) -> int:
+        """enqueue模式下各文件处理器队列中尚未写入文件的记录数"""
+        return self._queue_depth.depth
+
     def get_log_files_fixed(self) -> list[Dict[str, Any]]:
 
         log_files: list[Dict[str, Any]] = []
 
-        for ext in ['*.log', '*.json', '*.gz', '*.zip']:
+        for ext in LOG_PATTERNS:
             for file in self.log_dir.glob(ext):
                 try:
                     stat = file.stat()
@@ -413,7 +675,7 @@ class Log:
         deleted_count = 0
         total_freed = 0
 
-        for ext in ['*.log', '*.json', '*.gz', '*.zip']:
+        for ext in LOG_PATTERNS:
             for file in self.log_dir.glob(ext):
                 try:
                     stat = file.stat()
@@ -438,7 +700,7 @@ class Log:
 
         # 获取所有日志文件
         all_files = []
-        for ext in ['*.log', '*.json', '*.gz', '*.zip']:
+        for ext in LOG_PATTERNS:
             for file in self.log_dir.glob(ext):
                 try:
                     stat = file.stat()
@@ -468,6 +730,16 @@ class Log:
 
         return deleted_count
 
+    def cleanup_async(self, days: Optional[int] = None, keep_count: Optional[int] = None):
+        """在后台维护线程中执行cleanup_old_logs与cleanup_by_count，调用方不等待"""
+        if self._maintenance is None:
+            self.cleanup_old_logs(days)
+            self.cleanup_by_count(keep_count)
+            return self
+        self._maintenance.submit(self.cleanup_old_logs, days)
+        self._maintenance.submit(self.cleanup_by_count, keep_count)
+        return self
+
     def get_log_summary(self) -> Dict:
         """获取日志统计信息"""
         total_size = 0
@@ -502,7 +774,48 @@ class Log:
         }
 
 
-log = Log()
+class LazyLog:
+    """
+    模块级log代理：
+    1. 导入Log模块时不创建目录、不添加文件处理器、不导入loguru
+    2. 第一次真正写日志时才按configure传入的配置创建Log
+    """
+
+    _lock = threading.Lock()
+
+    def __init__(self):
+        self._config: Dict[str, Any] = {}
+        self._log: Optional[Log] = None
+
+    def configure(self, **kwargs):
+        """设置Log的构造参数（需在第一次写日志前调用）"""
+        if self._log is not None:
+            self._log.warning(f"日志系统已初始化, 忽略配置: {kwargs}")
+            return self
+        self._config.update(kwargs)
+        return self
+
+    @property
+    def initialized(self) -> bool:
+        return self._log is not None
+
+    def get(self) -> Log:
+        """获取（必要时创建）真正的Log对象"""
+        if self._log is None:
+            with self._lock:
+                if self._log is None:
+                    self._log = Log(**self._config)
+        return self._log
+
+    def __getattr__(self, name: str):
+        value = getattr(self.get(), name)
+        # 缓存方法，之后的调用不再经过__getattr__
+        if callable(value):
+            setattr(self, name, value)
+        return value
+
+
+log = LazyLog()
 # ============ 使用示例 ============
 # if __name__ == "__main__":
 #     print("=== 测试修复后的日志系统 ===")
@@ -0,0 +1,308 @@
+import io
+import json
+import os
+import re
+import struct
+import zlib
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, TextIO, Tuple
+
+# 文本日志（Log._get_file_format）每条记录：
+# time | level | name | env | pid | tid | module.function:line | message | {extra}
+# message可能跨多行（JSON格式化的对象），新记录以时间戳开头
+# 回退格式（Log._add_file_handler_fallback）只有 time | level | message，时间不带毫秒
+RECORD_START = re.compile(r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}(\.\d{3})? \| ")
+SEP = " | "
+
+# 列名 -> 类型：f8浮点、i8整数、dict低基数字符串（字典编码）、str字符串
+SCHEMA: Tuple[Tuple[str, str], ...] = (
+    ("time", "f8"),  # 本地时间的UTC秒
+    ("level", "dict"),
+    ("name", "dict"),
+    ("env", "dict"),
+    ("pid", "i8"),
+    ("tid", "i8"),
+    ("module", "dict"),
+    ("function", "dict"),
+    ("line", "i8"),
+    ("message", "str"),
+    ("extra", "str"),
+)
+COLUMNS = tuple(name for name, _ in SCHEMA)
+
+# 列式文件：MAGIC，之后若干行组，每个行组为 [u32 头长度][JSON头][各列zlib压缩块]
+MAGIC = b"LCOL1\n"
+GROUP_HEADER = struct.Struct("<I")
+SUFFIX = ".lcol"
+
+
+def open_log(path: str) -> TextIO:
+    """按扩展名打开文本或压缩后的轮转日志"""
+    suffix = Path(path).suffix.lower()
+    if suffix == ".gz":
+        import gzip
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace")
+    if suffix == ".bz2":
+        import bz2
+        return bz2.open(path, "rt", encoding="utf-8", errors="replace")
+    if suffix == ".xz":
+        import lzma
+        return lzma.open(path, "rt", encoding="utf-8", errors="replace")
+    if suffix == ".zip":
+        import zipfile
+        archive = zipfile.ZipFile(path)
+        return io.TextIOWrapper(archive.open(archive.namelist()[0]), encoding="utf-8", errors="replace")
+    return open(path, "r", encoding="utf-8", errors="replace")
+
+
+def _timestamp(ts: str) -> float:
+    fmt = "%Y-%m-%d %H:%M:%S.%f" if "." in ts else "%Y-%m-%d %H:%M:%S"
+    return datetime.strptime(ts, fmt).timestamp()
+
+
+def _parse_fallback(text: str) -> Optional[tuple]:
+    parts = text.split(SEP, 2)
+    if len(parts) < 3:
+        return None
+    ts, level, message = parts
+    try:
+        time = _timestamp(ts)
+    except ValueError:
+        return None
+    return time, level.strip(), "", "", 0, 0, "", "", 0, message, ""
+
+
+def _parse(text: str) -> Optional[tuple]:
+    parts = text.split(SEP, 7)
+    if len(parts) < 8:
+        return _parse_fallback(text)
+    ts, level, name, env, pid, tid, location, rest = parts
+    try:
+        time = _timestamp(ts)
+        pid = int(pid)
+        tid = int(tid)
+    except ValueError:
+        # 回退格式的message中也可能含有" | "
+        return _parse_fallback(text)
+
+    module_func, _, line = location.rpartition(":")
+    module, _, function = module_func.rpartition(".")
+    try:
+        line = int(line)
+    except ValueError:
+        line = 0
+
+    message, extra = rest, ""
+    i = rest.rfind(SEP + "{")
+    if i >= 0 and rest.endswith("}"):
+        message, extra = rest[:i], rest[i + len(SEP):]
+    return time, level.strip(), name, env, pid, tid, module, function, line, message, extra
+
+
+def parse(lines: Iterable[str]) -> Iterator[tuple]:
+    """逐行流式解析，多行消息拼回同一条记录；无法解析的记录跳过"""
+    buf: List[str] = []
+    for line in lines:
+        if RECORD_START.match(line):
+            if buf:
+                record = _parse("".join(buf).rstrip("\n"))
+                if record is not None:
+                    yield record
+            buf = [line]
+        elif buf:
+            buf.append(line)
+    if buf:
+        record = _parse("".join(buf).rstrip("\n"))
+        if record is not None:
+            yield record
+
+
+class ColumnWriter:
+    """按行组写列式文件：每chunk_rows条记录编码一次，内存只保留一个行组"""
+
+    def __init__(self, path: str, chunk_rows: int = 65536, level: int = 1):
+        self.path = path
+        self.chunk_rows = chunk_rows
+        self.level = level
+        self.rows = 0
+        self._tmp = f"{path}.tmp-{os.getpid()}"
+        self._file = open(self._tmp, "wb")
+        self._file.write(MAGIC)
+        self._columns: List[list] = [[] for _ in SCHEMA]
+
+    def append(self, record: tuple):
+        for column, value in zip(self._columns, record):
+            column.append(value)
+        if len(self._columns[0]) >= self.chunk_rows:
+            self._flush()
+
+    def _flush(self):
+        n = len(self._columns[0])
+        if not n:
+            return
+        header: Dict[str, Any] = {"rows": n, "columns": []}
+        blobs = []
+        for (name, kind), values in zip(SCHEMA, self._columns):
+            meta: Dict[str, Any] = {"name": name}
+            if kind == "f8":
+                raw = array("d", values).tobytes()
+            elif kind == "i8":
+                raw = array("q", values).tobytes()
+            elif kind == "dict":
+                codes: Dict[str, int] = {}
+                raw = array("i", (codes.setdefault(v, len(codes)) for v in values)).tobytes()
+                meta["dictionary"] = list(codes)
+            else:
+                encoded = [v.encode("utf-8") for v in values]
+                offsets = array("q", [0])
+                total = 0
+                for item in encoded:
+                    total += len(item)
+                    offsets.append(total)
+                meta["offsets_size"] = len(offsets) * 8
+                raw = offsets.tobytes() + b"".join(encoded)
+            blob = zlib.compress(raw, self.level)
+            meta["size"] = len(blob)
+            header["columns"].append(meta)
+            blobs.append(blob)
+
+        head = json.dumps(header, ensure_ascii=False).encode("utf-8")
+        self._file.write(GROUP_HEADER.pack(len(head)))
+        self._file.write(head)
+        for blob in blobs:
+            self._file.write(blob)
+        self.rows += n
+        self._columns = [[] for _ in SCHEMA]
+
+    def close(self):
+        self._flush()
+        self._file.close()
+        os.replace(self._tmp, self.path)
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._file.close()
+            os.unlink(self._tmp)
+
+
+def _decode(kind: str, meta: Dict[str, Any], raw: bytes) -> list:
+    if kind == "f8":
+        return array("d", raw).tolist()
+    if kind == "i8":
+        return array("q", raw).tolist()
+    if kind == "dict":
+        dictionary = meta["dictionary"]
+        return [dictionary[code] for code in array("i", raw)]
+    split = meta["offsets_size"]
+    offsets = array("q", raw[:split])
+    data = raw[split:]
+    return [data[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+
+
+def read(path: str, columns: Optional[Sequence[str]] = None) -> Dict[str, list]:
+    """读取列式文件，只解压、解码需要的列"""
+    wanted = list(columns or COLUMNS)
+    unknown = [c for c in wanted if c not in COLUMNS]
+    if unknown:
+        raise KeyError(f"未知的列: {unknown}")
+    kinds = dict(SCHEMA)
+    result: Dict[str, list] = {name: [] for name in wanted}
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"不是列式日志文件: {path}")
+        while True:
+            size = f.read(GROUP_HEADER.size)
+            if not size:
+                break
+            header = json.loads(f.read(GROUP_HEADER.unpack(size)[0]))
+            for meta in header["columns"]:
+                name = meta["name"]
+                if name not in result:
+                    f.seek(meta["size"], os.SEEK_CUR)
+                    continue
+                raw = zlib.decompress(f.read(meta["size"]))
+                result[name].extend(_decode(kinds[name], meta, raw))
+    return result
+
+
+def output_path(path: str, out_dir: str, base: Optional[str] = None) -> str:
+    """输出路径：在out_dir下保留相对base的目录结构，避免不同子目录的同名日志互相覆盖"""
+    path = Path(path)
+    relative = Path(os.path.relpath(path, base)) if base is not None else Path(path.name)
+    return str(Path(out_dir) / relative.parent / f"{relative.name}{SUFFIX}")
+
+
+def convert(path: str, out_dir: str, chunk_rows: int = 65536, base: Optional[str] = None) -> Tuple[str, int]:
+    """把一个文本日志（可为压缩的轮转文件）流式转换为列式文件，返回 (输出路径, 记录数)"""
+    out = output_path(path, out_dir, base)
+    Path(out).parent.mkdir(parents=True, exist_ok=True)
+    with open_log(path) as lines, ColumnWriter(out, chunk_rows) as writer:
+        for record in parse(lines):
+            writer.append(record)
+    return out, writer.rows
+
+
+def _convert_task(task) -> Tuple[str, str, int]:
+    path, out_dir, chunk_rows, base = task
+    out, rows = convert(path, out_dir, chunk_rows, base)
+    return path, out, rows
+
+
+def log_files(log_dir: str, pattern: str = "*_all.*") -> List[str]:
+    """目录及子目录（各env的日志目录）下的文本日志及其轮转、压缩文件"""
+    suffixes = (".log", ".gz", ".bz2", ".xz", ".zip")
+    return sorted(str(p) for p in Path(log_dir).rglob(pattern) if p.suffix.lower() in suffixes)
+
+
+def convert_all(paths: Sequence[str], out_dir: str, max_workers: Optional[int] = None,
+                chunk_rows: int = 65536, skip_existing: bool = True,
+                base: Optional[str] = None) -> List[Tuple[str, str, int]]:
+    """
+    多进程并行转换多个日志文件，返回 [(输入, 输出, 记录数)]
+    输出在out_dir下保留相对base（默认为各输入的公共目录）的目录结构
+    skip_existing时跳过输出比输入新的文件（轮转后的文件不会再变化）
+    """
+    if base is None and paths:
+        base = os.path.commonpath([os.path.dirname(os.path.abspath(p)) for p in paths])
+    tasks = []
+    results = []
+    for path in paths:
+        out = output_path(path, out_dir, base)
+        if skip_existing and os.path.exists(out) and os.path.getmtime(out) >= os.path.getmtime(path):
+            results.append((path, out, -1))  # -1表示未重新转换
+            continue
+        tasks.append((path, out_dir, chunk_rows, base))
+
+    if max_workers == 1 or len(tasks) <= 1:
+        results.extend(_convert_task(task) for task in tasks)
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            results.extend(pool.map(_convert_task, tasks))
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="文本日志转列式文件")
+    parser.add_argument("log_dir", nargs="?", default="./logs")
+    parser.add_argument("out_dir", nargs="?", default="./logs/columnar")
+    parser.add_argument("--pattern", default="*_all.*")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    converted = convert_all(log_files(args.log_dir, args.pattern), args.out_dir, args.workers, base=args.log_dir)
+    for src, dst, rows in converted:
+        print(f"{src} -> {dst}: {'未变化' if rows < 0 else f'{rows} 条'}")
+    print(f"完成: {len(converted)} 个文件, 耗时 {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,187 @@
+import atexit
+import os
+import queue
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Callable, List, Optional
+
+# 支持的压缩格式（扩展名），对应模块在worker线程中才导入
+CODECS = ("gz", "bz2", "xz", "zip")
+
+
+def _open_codec(codec: str, path: str, level: Optional[int]):
+    if codec == "gz":
+        import gzip
+        return gzip.open(path, "wb", compresslevel=9 if level is None else level)
+    if codec == "bz2":
+        import bz2
+        return bz2.open(path, "wb", compresslevel=9 if level is None else level)
+    if codec == "xz":
+        import lzma
+        return lzma.open(path, "wb", preset=6 if level is None else level)
+    raise ValueError(f"不支持的压缩格式: {codec}")
+
+
+def _pid_alive(pid: int) -> bool:
+    """进程是否仍在运行；Windows上os.kill(pid, 0)会终止该进程，改用OpenProcess查询退出码"""
+    if os.name == "nt":
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            # 无权限打开说明进程存在；其余错误（如ERROR_INVALID_PARAMETER）视为已退出
+            return kernel32.GetLastError() == 5  # ERROR_ACCESS_DENIED
+        try:
+            code = ctypes.c_ulong()
+            if not kernel32.GetExitCodeProcess(handle, ctypes.byref(code)):
+                return True
+            return code.value == 259  # STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # 进程存在但属于其他用户
+    return True
+
+
+class LogMaintenance:
+    """
+    日志后台维护线程：
+    1. 作为loguru的compression回调，轮转时只把文件路径放入队列，写日志的线程不等待压缩
+    2. 作为loguru的retention回调，过期清理同样放到后台执行
+    3. 多个env/进程共享日志目录时，先把待压缩文件rename为带pid的临时名来认领，
+       rename失败说明已被其他进程处理，直接跳过；压缩结果先写临时文件再替换
+    """
+
+    def __init__(self, codec: Optional[str] = "gz", level: Optional[int] = None):
+        if codec is not None and codec not in CODECS:
+            raise ValueError(f"compression应为 {CODECS} 之一或None: {codec}")
+        self.codec = codec
+        self.level = level
+        self.compressed = 0
+        self.deleted = 0
+        self.errors: List[str] = []
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    # ---------- loguru回调 ----------
+    def compression(self) -> Optional[Callable[[str], None]]:
+        """loguru的compression参数：None表示不压缩"""
+        if self.codec is None:
+            return None
+        return self._on_rotated
+
+    def retention(self, days: int) -> Callable[[List[str]], None]:
+        """loguru的retention参数：删除修改时间早于days天的轮转文件"""
+
+        def on_retention(files: List[str]):
+            self.submit(self._expire, list(files), days)
+
+        return on_retention
+
+    def _on_rotated(self, path: str):
+        self.submit(self._compress, path)
+
+    # ---------- 队列 ----------
+    def submit(self, func: Callable, *args):
+        """放入后台执行"""
+        self._start()
+        self._queue.put((func, args))
+        return self
+
+    def _start(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._worker, name="log-maintenance", daemon=True)
+                self._thread.start()
+                atexit.register(self.stop)
+
+    def _worker(self):
+        while True:
+            func, args = self._queue.get()
+            try:
+                if func is None:
+                    return
+                func(*args)
+            except Exception as e:
+                self.errors.append(f"{getattr(func, '__name__', func)}{args}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def join(self):
+        """等待队列中已提交的任务完成"""
+        if self._thread is not None:
+            self._queue.join()
+        return self
+
+    def stop(self, timeout: float = 10.0):
+        """处理完已提交的任务后停止"""
+        thread = self._thread
+        if thread is None:
+            return
+        self._queue.put((None, ()))
+        thread.join(timeout)
+        self._thread = None
+
+    # ---------- 任务 ----------
+    def _compress(self, path: str):
+        claimed = f"{path}.compressing-{os.getpid()}"
+        try:
+            os.rename(path, claimed)
+        except FileNotFoundError:
+            return  # 已被其他进程认领
+        target = f"{path}.{self.codec}"
+        tmp = f"{target}.tmp-{os.getpid()}"
+        try:
+            if self.codec == "zip":
+                import zipfile
+                with zipfile.ZipFile(tmp, "w", zipfile.ZIP_DEFLATED, compresslevel=self.level) as archive:
+                    archive.write(claimed, arcname=os.path.basename(path))
+            else:
+                with open(claimed, "rb") as src, _open_codec(self.codec, tmp, self.level) as dst:
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
+            os.replace(tmp, target)
+            os.unlink(claimed)
+            self.compressed += 1
+        except Exception:
+            # 压缩失败时恢复原文件，避免丢日志
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            os.replace(claimed, path)
+            raise
+
+    def _expire(self, files: List[str], days: int):
+        cutoff = time.time() - days * 86400
+        for file in files:
+            try:
+                if os.stat(file).st_mtime < cutoff:
+                    os.unlink(file)
+                    self.deleted += 1
+            except FileNotFoundError:
+                continue  # 已被其他进程删除
+
+    def recover(self, log_dir: Path):
+        """重新压缩崩溃进程遗留的认领文件（*.compressing-<pid>，且该pid已不存在）"""
+        for claimed in log_dir.glob("*.compressing-*"):
+            original, _, pid = str(claimed).rpartition(".compressing-")
+            try:
+                if _pid_alive(int(pid)):
+                    continue  # 进程仍在运行，可能正在压缩
+            except ValueError:
+                continue
+            try:
+                os.rename(claimed, original)
+            except FileNotFoundError:
+                continue
+            self.submit(self._compress, original)
+        return self
@@ -0,0 +1,153 @@
+import hashlib
+import heapq
+import os
+import struct
+from array import array
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# 本地bar存储格式：每个标的一个 {SYMBOL}.bars 文件，只追加
+# 每条记录6个小端float64: 时间戳(UTC秒), open, high, low, close, volume，按时间升序
+FIELDS = ("time", "open", "high", "low", "close", "volume")
+RECORD = struct.Struct("<6d")
+SUFFIX = ".bars"
+
+
+@dataclass
+class Bar:
+    symbol: str = ""
+    time: float = 0.0  # UTC时间戳（秒）
+    open: float = 0.0
+    high: float = 0.0
+    low: float = 0.0
+    close: float = 0.0
+    volume: float = 0.0
+
+    @property
+    def datetime(self) -> datetime:
+        return datetime.fromtimestamp(self.time, tz=timezone.utc)
+
+
+def to_timestamp(value) -> Optional[float]:
+    """datetime/date/时间戳统一转为UTC秒"""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class BarStore:
+    """
+    本地分钟bar存储：
+    1. 定长二进制记录，读取时整块解码为array，不逐行解析
+    2. 多个标的按时间归并成一条行情流
+    """
+
+    def __init__(self, root: str = "./data/bars"):
+        self.root = Path(root)
+        # (symbol, start, end) -> ((文件大小, mtime_ns), 摘要)
+        self._digests: Dict[Tuple[str, str, str], Tuple[Tuple[int, int], str]] = {}
+
+    def path(self, symbol: str) -> Path:
+        return self.root / f"{symbol}{SUFFIX}"
+
+    def symbols(self) -> List[str]:
+        if not self.root.exists():
+            return []
+        return sorted(p.name[:-len(SUFFIX)] for p in self.root.glob(f"*{SUFFIX}"))
+
+    def write(self, symbol: str, rows: Iterable[Sequence[float]]):
+        """追加bar，每行为 (时间戳, open, high, low, close, volume)"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        data = array("d")
+        for row in rows:
+            data.extend(row)
+        self.write_array(symbol, data)
+        return self
+
+    def write_array(self, symbol: str, data) -> int:
+        """追加已按记录格式排列好的float64数据（array/bytes/numpy数组），返回写入的记录数"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        raw = data.tobytes() if hasattr(data, "tobytes") else bytes(data)
+        if len(raw) % RECORD.size:
+            raise ValueError(f"{symbol}: 数据长度不是 {RECORD.size} 字节记录的整数倍")
+        with open(self.path(symbol), "ab") as f:
+            f.write(raw)
+        return len(raw) // RECORD.size
+
+    def read_array(self, symbol: str, start=None, end=None) -> array:
+        """整块读取一个标的的bar，返回扁平的float64 array（每6个值一条记录）"""
+        data = array("d")
+        path = self.path(symbol)
+        if not path.exists():
+            return data
+        with open(path, "rb") as f:
+            data.frombytes(f.read())
+
+        lo, hi = to_timestamp(start), to_timestamp(end)
+        if lo is None and hi is None:
+            return data
+        n = len(data) // 6
+        i = self._bisect(data, n, lo) if lo is not None else 0
+        j = self._bisect(data, n, hi, right=True) if hi is not None else n
+        return data[i * 6:j * 6]
+
+    @staticmethod
+    def _bisect(data: array, n: int, ts: float, right: bool = False) -> int:
+        lo, hi = 0, n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            t = data[mid * 6]
+            if t < ts or (right and t == ts):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def read(self, symbol: str, start=None, end=None) -> Iterator[Bar]:
+        data = self.read_array(symbol, start, end)
+        for i in range(0, len(data), 6):
+            yield Bar(symbol, *data[i:i + 6])
+
+    def stream(self, symbols: Sequence[str], start=None, end=None) -> Iterator[Tuple[float, Dict[str, Bar]]]:
+        """按时间归并多个标的，每个时间点产出 (时间戳, {symbol: Bar})"""
+        merged = heapq.merge(*(self.read(s, start, end) for s in symbols), key=lambda b: b.time)
+        current_time = None
+        bars: Dict[str, Bar] = {}
+        for bar in merged:
+            if bar.time != current_time:
+                if bars:
+                    yield current_time, bars
+                current_time = bar.time
+                bars = {}
+            bars[bar.symbol] = bar
+        if bars:
+            yield current_time, bars
+
+    def digest(self, symbol: str, start=None, end=None) -> str:
+        """区间内bar数据的哈希：只随区间内的数据变化，文件未变化时不重新读取"""
+        path = self.path(symbol)
+        try:
+            stat = path.stat()
+            version = (stat.st_size, stat.st_mtime_ns)
+        except FileNotFoundError:
+            version = (0, 0)
+        key = (symbol, str(start), str(end))
+        cached = self._digests.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        value = hashlib.sha256(self.read_array(symbol, start, end).tobytes()).hexdigest()[:16]
+        self._digests[key] = (version, value)
+        return value
+
+    def size(self, symbol: str) -> int:
+        """记录条数"""
+        path = self.path(symbol)
+        return os.path.getsize(path) // RECORD.size if path.exists() else 0
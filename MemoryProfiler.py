@@ -0,0 +1,299 @@
+import ast
+import fnmatch
+import os
+import time
+import tracemalloc
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, List, Optional, Tuple, Union
+
+from Log import log
+from Metrics import metrics
+
+# 子系统 -> 归属规则：文件名（如 "Log.py"）、路径通配（如 "*/loguru/*"）或 "文件名:函数名"
+# 按分配调用栈从最内层向外找第一个匹配的帧，都不匹配时归为other
+SUBSYSTEMS: Dict[str, Tuple[str, ...]] = {
+    "pipeline": ("TradingPipeline.py", "TradingScheduler.py", "TradingTrigger.py", "FeatureGraph.py",
+                 "OrderNetting.py", "RiskEngine.py", "BatchRunner.py"),
+    "registry": ("StrategyRegister.py", "LatencyStats.py", "Metrics.py"),
+    "log": ("Log.py", "LogMaintenance.py", "*/loguru/*"),
+    "order_journal": ("DecisionJournal.py", "LocalTradeBuilder.py", "PortfolioAnalytics.py",
+                      "sample.py:on_order_event"),
+    "market_data": ("MarketData.py", "BarAggregator.py", "OptionChainIndex.py", "SharedSnapshot.py",
+                    "sample.py:on_data", "sample.py:record_pool_pre_close"),
+}
+OTHER = "other"
+_IGNORE = "<ignore>"  # tracemalloc与本模块自身的分配
+
+_UNITS = {"B": 1, "KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3}
+
+
+def parse_size(value: Union[int, float, str]) -> int:
+    """字节数或 "64 MB" 这样的字符串"""
+    if isinstance(value, (int, float)):
+        return int(value)
+    number, _, unit = value.strip().partition(" ")
+    unit = unit.strip().upper() or "B"
+    if unit not in _UNITS:
+        raise ValueError(f"无法解析的大小: {value}")
+    return int(float(number) * _UNITS[unit])
+
+
+def _human(size: float) -> str:
+    for unit in ("B", "KB", "MB"):
+        if abs(size) < 1024:
+            return f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}GB"
+
+
+@dataclass
+class MemorySample:
+    time: float
+    total: int  # 已追踪的字节数
+    sizes: Dict[str, int]  # 子系统 -> 字节数
+    counts: Dict[str, int]  # 子系统 -> 分配块数
+    top: Dict[str, List[Tuple[str, int, int]]] = field(default_factory=dict)  # 子系统 -> [(位置, 字节, 块数)]
+    growing: List[Tuple[str, str, int]] = field(default_factory=list)  # 较上一次增长最多的 [(子系统, 位置, 增量字节)]
+
+
+class MemoryProfiler:
+    """
+    按子系统归属的内存分析（tracemalloc，需显式start，不开启时没有任何开销）：
+    1. 每隔interval（秒，按clock计）拍一次分配快照，按调用栈归属到pipeline/registry/log/order_journal/market_data
+    2. 记录各子系统大小的历史，用最小二乘估计增长速度（字节/小时），并列出占用和增长最多的分配位置
+    3. budgets（大小上限）和growth_budgets（每小时增长上限）超出时告警（每次超出只告警一次），同时导出为指标
+    注意：QC的图表点等在C#侧分配，不在tracemalloc统计范围内
+    """
+
+    def __init__(self,
+                 interval: float = 60.0,
+                 nframes: int = 8,
+                 budgets: Optional[Dict[str, Union[int, str]]] = None,
+                 growth_budgets: Optional[Dict[str, Union[int, str]]] = None,
+                 rules: Optional[Dict[str, Tuple[str, ...]]] = None,
+                 history: int = 240,
+                 top: int = 10,
+                 clock: Callable[[], float] = time.monotonic):
+        self.interval = interval
+        self.nframes = nframes
+        self.budgets = {k: parse_size(v) for k, v in (budgets or {}).items()}
+        self.growth_budgets = {k: parse_size(v) for k, v in (growth_budgets or {}).items()}
+        self.rules = dict(SUBSYSTEMS if rules is None else rules)
+        self.top = top
+        self.clock = clock
+        self.samples: Deque[MemorySample] = deque(maxlen=history)
+        self.exceeded: set = set()
+        self._last: Optional[float] = None
+        self._started = False
+        self._locations: Dict[str, int] = {}
+        self._file_rules: Dict[str, object] = {}
+        self._tracebacks: Dict[tracemalloc.Traceback, Tuple[Optional[str], str]] = {}
+        self._functions: Dict[str, Dict[str, List[Tuple[int, int]]]] = {}
+
+        self._m_bytes: Dict[str, object] = {}
+        self._m_growth: Dict[str, object] = {}
+        self._m_exceeded: Dict[str, object] = {}
+
+    # ---------- 开关 ----------
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.nframes)
+            self._started = True
+        return self
+
+    def stop(self):
+        """只停止由本对象开启的追踪"""
+        if self._started:
+            tracemalloc.stop()
+            self._started = False
+        return self
+
+    # ---------- 采样 ----------
+    def maybe_sample(self, now: Optional[float] = None) -> Optional[MemorySample]:
+        """距上次采样超过interval时采样，热路径上每个tick调用"""
+        now = self.clock() if now is None else now
+        if self._last is not None and now - self._last < self.interval:
+            return None
+        return self.sample(now)
+
+    def sample(self, now: Optional[float] = None) -> MemorySample:
+        if not tracemalloc.is_tracing():
+            raise ValueError("tracemalloc未开启, 请先调用start()")
+        now = self.clock() if now is None else now
+        self._last = now
+        snapshot = tracemalloc.take_snapshot()
+
+        sizes: Dict[str, int] = {}
+        counts: Dict[str, int] = {}
+        locations: Dict[str, int] = {}
+        by_location: Dict[Tuple[str, str], List[int]] = {}
+        total = 0
+        cache = self._tracebacks
+        if len(cache) > 200_000:
+            cache.clear()
+        for stat in snapshot.statistics("traceback"):
+            # 同一调用栈在之后的快照中大多仍存在，归属结果按调用栈缓存
+            attributed = cache.get(stat.traceback)
+            if attributed is None:
+                attributed = cache[stat.traceback] = self._attribute(stat.traceback)
+            subsystem, location = attributed
+            if subsystem is None:
+                continue  # 分析器自身的分配
+            sizes[subsystem] = sizes.get(subsystem, 0) + stat.size
+            counts[subsystem] = counts.get(subsystem, 0) + stat.count
+            entry = by_location.setdefault((subsystem, location), [0, 0])
+            entry[0] += stat.size
+            entry[1] += stat.count
+            locations[f"{subsystem}|{location}"] = entry[0]
+            total += stat.size
+
+        top: Dict[str, List[Tuple[str, int, int]]] = {}
+        for (subsystem, location), (size, count) in sorted(by_location.items(), key=lambda item: -item[1][0]):
+            entries = top.setdefault(subsystem, [])
+            if len(entries) < self.top:
+                entries.append((location, size, count))
+
+        previous = self._locations
+        deltas = [(key, size - previous.get(key, 0)) for key, size in locations.items()] if previous else []
+        deltas.sort(key=lambda item: -item[1])
+        growing = [(*key.split("|", 1), delta) for key, delta in deltas[:self.top] if delta > 0]
+        self._locations = locations
+
+        result = MemorySample(now, total, sizes, counts, top, growing)
+        self.samples.append(result)
+        self._check(result)
+        return result
+
+    def _attribute(self, traceback: tracemalloc.Traceback) -> Tuple[Optional[str], str]:
+        # traceback按从外到内排列，从最内层开始找
+        frames = list(traceback)
+        for frame in reversed(frames):
+            subsystem = self._match(frame.filename, frame.lineno)
+            if subsystem is _IGNORE:
+                return None, ""
+            if subsystem is not None:
+                return subsystem, f"{os.path.basename(frame.filename)}:{frame.lineno}"
+        frame = frames[-1]
+        return OTHER, f"{frame.filename}:{frame.lineno}"
+
+    def _match(self, filename: str, lineno: int) -> Optional[str]:
+        rules = self._file_rules.get(filename)
+        if rules is None:
+            rules = self._file_rules[filename] = self._rules_for(filename)
+        if isinstance(rules, str) or not rules:
+            return rules or None
+        for subsystem, ranges in rules:
+            if ranges is None or any(lo <= lineno <= hi for lo, hi in ranges):
+                return subsystem
+        return None
+
+    def _rules_for(self, filename: str):
+        """文件对应的规则：整个文件属于某个子系统时直接返回子系统名，否则返回 [(子系统, 函数行号范围或None)]"""
+        if filename in (tracemalloc.__file__, __file__):
+            return _IGNORE
+        base = os.path.basename(filename)
+        rules = []
+        for subsystem, patterns in self.rules.items():
+            for pattern in patterns:
+                file_pattern, _, function = pattern.partition(":")
+                if not (base == file_pattern or fnmatch.fnmatch(filename, file_pattern)):
+                    continue
+                if not function:
+                    if not rules:
+                        return subsystem
+                    rules.append((subsystem, None))
+                else:
+                    rules.append((subsystem, self._ranges(filename).get(function, [])))
+        return rules
+
+    def _ranges(self, filename: str) -> Dict[str, List[Tuple[int, int]]]:
+        """文件中各函数的行号范围（解析一次）"""
+        ranges = self._functions.get(filename)
+        if ranges is None:
+            ranges = {}
+            try:
+                with open(filename, "r", encoding="utf-8") as f:
+                    tree = ast.parse(f.read())
+                for node in ast.walk(tree):
+                    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                        ranges.setdefault(node.name, []).append((node.lineno, node.end_lineno or node.lineno))
+            except (OSError, SyntaxError, ValueError):
+                pass
+            self._functions[filename] = ranges
+        return ranges
+
+    # ---------- 增长与预算 ----------
+    def growth(self, window: Optional[int] = None) -> Dict[str, float]:
+        """各子系统最近window次采样的增长速度（字节/小时，最小二乘斜率）"""
+        samples = list(self.samples)[-window:] if window else list(self.samples)
+        if len(samples) < 2:
+            return {}
+        times = [(s.time - samples[0].time) / 3600.0 for s in samples]
+        mean_t = sum(times) / len(times)
+        var_t = sum((t - mean_t) ** 2 for t in times)
+        if var_t <= 0:
+            return {}
+        subsystems = {name for s in samples for name in s.sizes}
+        rates = {}
+        for name in subsystems:
+            values = [s.sizes.get(name, 0) for s in samples]
+            mean_v = sum(values) / len(values)
+            rates[name] = sum((t - mean_t) * (v - mean_v) for t, v in zip(times, values)) / var_t
+        return rates
+
+    def _check(self, result: MemorySample):
+        rates = self.growth()
+        for name in set(result.sizes) | set(self.budgets) | set(self.growth_budgets):
+            size = result.sizes.get(name, 0)
+            rate = rates.get(name, 0.0)
+            self._gauge(self._m_bytes, "memory_subsystem_bytes", "子系统已追踪的内存（字节）", name).set(size)
+            self._gauge(self._m_growth, "memory_subsystem_growth_bytes_per_hour", "子系统内存增长速度",
+                        name).set(rate)
+
+            reasons = []
+            budget = self.budgets.get(name)
+            if budget is not None and size > budget:
+                reasons.append(f"占用 {_human(size)} > 预算 {_human(budget)}")
+            growth_budget = self.growth_budgets.get(name)
+            if growth_budget is not None and rate > growth_budget:
+                reasons.append(f"增长 {_human(rate)}/h > 预算 {_human(growth_budget)}/h")
+
+            if reasons and name not in self.exceeded:
+                self.exceeded.add(name)
+                counter = self._m_exceeded.get(name)
+                if counter is None:
+                    counter = self._m_exceeded[name] = metrics.counter(
+                        "memory_budget_exceeded_total", "子系统内存超出预算的次数", subsystem=name)
+                counter.inc()
+                top = ", ".join(f"{loc} {_human(size)}" for loc, size, _ in result.top.get(name, [])[:3])
+                log.warning(f"内存预算超出: {name} {'; '.join(reasons)}; 主要分配: {top}")
+            elif not reasons:
+                self.exceeded.discard(name)
+
+    @staticmethod
+    def _gauge(cache: Dict[str, object], name: str, help: str, subsystem: str):
+        gauge = cache.get(subsystem)
+        if gauge is None:
+            gauge = cache[subsystem] = metrics.gauge(name, help, subsystem=subsystem)
+        return gauge
+
+    # ---------- 报告 ----------
+    def report(self, top: int = 5) -> str:
+        """最近一次采样的子系统占用、增长速度、主要分配位置与增长最多的位置"""
+        if not self.samples:
+            return "尚无内存采样"
+        last = self.samples[-1]
+        rates = self.growth()
+        lines = [f"内存采样 {len(self.samples)} 次, 已追踪 {_human(last.total)}"]
+        for name, size in sorted(last.sizes.items(), key=lambda item: -item[1]):
+            flag = " [超出预算]" if name in self.exceeded else ""
+            lines.append(f"  {name:<14} {_human(size):>10} {last.counts.get(name, 0):>9} 块 "
+                         f"{_human(rates.get(name, 0.0)):>10}/h{flag}")
+            for location, loc_size, count in last.top.get(name, [])[:top]:
+                lines.append(f"      {location:<48} {_human(loc_size):>10} {count:>9} 块")
+        if last.growing:
+            lines.append("  较上次增长最多:")
+            for name, location, delta in last.growing[:top]:
+                lines.append(f"      [{name}] {location:<40} +{_human(delta)}")
+        return "\n".join(lines)
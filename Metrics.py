@@ -0,0 +1,233 @@
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from LatencyStats import LatencyHistogram
+
+
+class Counter:
+    """单调递增计数器"""
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+
+class Gauge:
+    """瞬时值，可直接设置，也可以在抓取时通过回调计算"""
+
+    __slots__ = ("value", "func")
+
+    def __init__(self):
+        self.value = 0.0
+        self.func: Optional[Callable[[], float]] = None
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def set_function(self, func: Callable[[], float]):
+        self.func = func
+        return self
+
+    def get(self) -> float:
+        if self.func is not None:
+            try:
+                return float(self.func())
+            except Exception:
+                return float("nan")
+        return self.value
+
+
+class Latency:
+    """延迟摘要（秒），以Prometheus summary格式导出"""
+
+    __slots__ = ("hist",)
+
+    def __init__(self):
+        self.hist = LatencyHistogram()
+
+    def observe_ns(self, ns: int):
+        self.hist.record(ns)
+
+    def time(self):
+        return _Timer(self)
+
+
+class _Timer:
+    __slots__ = ("latency", "start")
+
+    def __init__(self, latency: Latency):
+        self.latency = latency
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.latency.observe_ns(time.perf_counter_ns() - self.start)
+        return False
+
+
+class Metrics:
+    """
+    进程内指标注册表，支持：
+    1. 计数器/仪表/延迟摘要，更新只是一次属性加法
+    2. Prometheus文本格式导出
+    3. 本地HTTP端点（后台线程）
+    4. 定期写入文件（后台线程，原子替换）
+    """
+
+    _instance = None
+    _lock = threading.Lock()
+    _initialized = False
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            with cls._lock:
+                if not cls._instance:
+                    cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self, namespace: str = "quant"):
+        if not Metrics._initialized:
+            self.namespace = namespace
+            # name -> (type, help, {labels: metric})
+            self._families: Dict[str, Tuple[str, str, Dict[Tuple, Any]]] = {}
+            self._server = None
+            self._dump_thread: Optional[threading.Thread] = None
+            self._stop = threading.Event()
+            Metrics._initialized = True
+
+    def _get(self, kind: str, factory: Callable, name: str, help: str, labels: Dict[str, Any]):
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        family = self._families.get(name)
+        if family is None:
+            with self._lock:
+                family = self._families.setdefault(name, (kind, help, {}))
+        if family[0] != kind:
+            raise ValueError(f"指标 '{name}' 已注册为 {family[0]}")
+        series = family[2]
+        metric = series.get(key)
+        if metric is None:
+            with self._lock:
+                metric = series.setdefault(key, factory())
+        return metric
+
+    def counter(self, name: str, help: str = "", **labels) -> Counter:
+        """获取/创建计数器（调用方应缓存返回值，避免热路径查表）"""
+        return self._get("counter", Counter, name, help, labels)
+
+    def gauge(self, name: str, help: str = "", **labels) -> Gauge:
+        """获取/创建仪表"""
+        return self._get("gauge", Gauge, name, help, labels)
+
+    def latency(self, name: str, help: str = "", **labels) -> Latency:
+        """获取/创建延迟摘要"""
+        return self._get("summary", Latency, name, help, labels)
+
+    @staticmethod
+    def _labels(key: Tuple, extra: str = "") -> str:
+        parts = [f'{k}="{v}"' for k, v in key]
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+    def render(self) -> str:
+        """导出Prometheus文本格式"""
+        with self._lock:
+            families = [(name, kind, help, dict(series)) for name, (kind, help, series) in self._families.items()]
+
+        lines = []
+        for name, kind, help, series in sorted(families, key=lambda x: x[0]):
+            full_name = f"{self.namespace}_{name}"
+            if help:
+                lines.append(f"# HELP {full_name} {help}")
+            lines.append(f"# TYPE {full_name} {kind}")
+            for key, metric in series.items():
+                if kind == "counter":
+                    lines.append(f"{full_name}{self._labels(key)} {metric.value}")
+                elif kind == "gauge":
+                    lines.append(f"{full_name}{self._labels(key)} {metric.get()}")
+                else:
+                    hist = metric.hist
+                    for q in (0.5, 0.99, 1.0):
+                        quantile = 'quantile="%s"' % q
+                        lines.append(f"{full_name}{self._labels(key, quantile)} {hist.percentile(q) / 1e9}")
+                    lines.append(f"{full_name}_sum{self._labels(key)} {hist.total / 1e9}")
+                    lines.append(f"{full_name}_count{self._labels(key)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, host: str = "127.0.0.1", port: int = 9108):
+        """在后台线程启动本地HTTP端点，GET /metrics"""
+        if self._server is not None:
+            return self
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+        return self
+
+    def dump_every(self, path: str, interval: float = 15.0):
+        """在后台线程定期把指标写入文件"""
+        if self._dump_thread is not None:
+            return self
+
+        def loop():
+            while not self._stop.wait(interval):
+                self.dump(path)
+
+        self._dump_thread = threading.Thread(target=loop, name="metrics-dump", daemon=True)
+        self._dump_thread.start()
+        return self
+
+    def dump(self, path: str):
+        """写入一次指标文件（先写临时文件再替换，读取方不会看到半截内容）"""
+        tmp = f"{path}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(self.render())
+            os.replace(tmp, path)
+        except OSError:
+            pass
+        return self
+
+    def stop(self):
+        """停止HTTP端点和定期写入"""
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        self._dump_thread = None
+        self._stop = threading.Event()
+        return self
+
+
+metrics = Metrics()
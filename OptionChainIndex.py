@@ -0,0 +1,167 @@
+from bisect import bisect_left, bisect_right, insort
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+
+class _StrikeLadder:
+    """单个(方向, 到期日)下按执行价排序的合约"""
+
+    __slots__ = ("strikes", "contracts", "deltas", "known")
+
+    def __init__(self):
+        self.strikes: List[float] = []
+        self.contracts: List[Any] = []
+        self.deltas: List[Optional[float]] = []
+        self.known = 0  # 已知delta的合约数
+
+    def insert(self, strike: float, contract: Any):
+        i = bisect_left(self.strikes, strike)
+        if i < len(self.strikes) and self.strikes[i] == strike:
+            self.contracts[i] = contract
+            return
+        self.strikes.insert(i, strike)
+        self.contracts.insert(i, contract)
+        self.deltas.insert(i, None)
+
+    def remove(self, strike: float) -> bool:
+        i = bisect_left(self.strikes, strike)
+        if i < len(self.strikes) and self.strikes[i] == strike:
+            if self.deltas[i] is not None:
+                self.known -= 1
+            del self.strikes[i]
+            del self.contracts[i]
+            del self.deltas[i]
+            return True
+        return False
+
+
+class OptionChainIndex:
+    """
+    期权链索引：到期日 -> 有序执行价
+    1. 合约出现/到期时增量更新（对应on_securities_changed），不需要每个slice扫描整条链
+    2. 最近到期日、最近执行价都是二分查找
+    3. delta随执行价单调递减，按目标delta选腿同样是二分查找
+    """
+
+    def __init__(self):
+        self._expiries: List[Any] = []  # 有序到期日
+        self._ladders: Dict[Tuple[Hashable, Any], _StrikeLadder] = {}
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def add(self, contract: Any, expiry: Any, strike: float, right: Hashable):
+        """加入合约"""
+        key = (right, expiry)
+        ladder = self._ladders.get(key)
+        if ladder is None:
+            ladder = self._ladders[key] = _StrikeLadder()
+            i = bisect_left(self._expiries, expiry)
+            if i == len(self._expiries) or self._expiries[i] != expiry:
+                insort(self._expiries, expiry)
+        before = len(ladder.strikes)
+        ladder.insert(float(strike), contract)
+        self._count += len(ladder.strikes) - before
+        return self
+
+    def remove(self, expiry: Any, strike: float, right: Hashable):
+        """移除合约"""
+        ladder = self._ladders.get((right, expiry))
+        if ladder is not None and ladder.remove(float(strike)):
+            self._count -= 1
+            if not ladder.strikes:
+                del self._ladders[(right, expiry)]
+                self._drop_expiry_if_empty(expiry)
+        return self
+
+    def expire(self, now: Any) -> int:
+        """移除所有到期日早于now的合约，返回移除数量"""
+        cut = bisect_left(self._expiries, now)
+        if cut == 0:
+            return 0
+        expired = set(self._expiries[:cut])
+        removed = 0
+        for key in [k for k in self._ladders if k[1] in expired]:
+            removed += len(self._ladders.pop(key).strikes)
+        del self._expiries[:cut]
+        self._count -= removed
+        return removed
+
+    def _drop_expiry_if_empty(self, expiry: Any):
+        if any(k[1] == expiry for k in self._ladders):
+            return
+        i = bisect_left(self._expiries, expiry)
+        if i < len(self._expiries) and self._expiries[i] == expiry:
+            del self._expiries[i]
+
+    def expiries_between(self, start: Any, end: Any) -> List[Any]:
+        """到期日在[start, end]之间的所有到期日"""
+        return self._expiries[bisect_left(self._expiries, start):bisect_right(self._expiries, end)]
+
+    def nearest_expiry(self, target: Any, start: Any = None, end: Any = None) -> Optional[Any]:
+        """[start, end]内最接近target的到期日"""
+        lo = bisect_left(self._expiries, start) if start is not None else 0
+        hi = bisect_right(self._expiries, end) if end is not None else len(self._expiries)
+        if lo >= hi:
+            return None
+        i = min(max(bisect_left(self._expiries, target, lo, hi), lo), hi - 1)
+        best = self._expiries[i]
+        if i > lo and abs(self._expiries[i - 1] - target) <= abs(best - target):
+            best = self._expiries[i - 1]
+        return best
+
+    def nearest_strike(self, right: Hashable, expiry: Any, strike: float, side: int = 0) -> Optional[Any]:
+        """
+        按执行价选合约
+        side: 0 最近, 1 不低于strike的最近一档, -1 不高于strike的最近一档
+        """
+        ladder = self._ladders.get((right, expiry))
+        if ladder is None:
+            return None
+        strikes = ladder.strikes
+        i = bisect_left(strikes, strike)
+        if side > 0:
+            return ladder.contracts[i] if i < len(strikes) else None
+        if side < 0:
+            if i < len(strikes) and strikes[i] == strike:
+                return ladder.contracts[i]
+            return ladder.contracts[i - 1] if i > 0 else None
+        if i == len(strikes):
+            return ladder.contracts[-1]
+        if i > 0 and strike - strikes[i - 1] <= strikes[i] - strike:
+            return ladder.contracts[i - 1]
+        return ladder.contracts[i]
+
+    def set_delta(self, right: Hashable, expiry: Any, strike: float, delta: float):
+        """更新合约的delta（通常在选腿前从当前slice的期权链读取）"""
+        ladder = self._ladders.get((right, expiry))
+        if ladder is None:
+            return self
+        strike = float(strike)
+        i = bisect_left(ladder.strikes, strike)
+        if i < len(ladder.strikes) and ladder.strikes[i] == strike:
+            if ladder.deltas[i] is None:
+                ladder.known += 1
+            ladder.deltas[i] = float(delta)
+        return self
+
+    def by_delta(self, right: Hashable, expiry: Any, target: float) -> Optional[Any]:
+        """选delta最接近target的合约（只在已知delta的合约中查找）"""
+        ladder = self._ladders.get((right, expiry))
+        if ladder is None:
+            return None
+        if ladder.known == len(ladder.strikes):
+            deltas, contracts = ladder.deltas, ladder.contracts
+        else:
+            known = [(d, c) for d, c in zip(ladder.deltas, ladder.contracts) if d is not None]
+            if not known:
+                return None
+            deltas, contracts = [d for d, _ in known], [c for _, c in known]
+
+        # delta随执行价递减，取负后递增即可二分
+        i = bisect_left(deltas, -target, key=lambda d: -d)
+        if i == len(deltas):
+            return contracts[-1]
+        if i > 0 and abs(deltas[i - 1] - target) <= abs(deltas[i] - target):
+            return contracts[i - 1]
+        return contracts[i]
@@ -0,0 +1,44 @@
+from dataclasses import replace
+from typing import Dict, List
+
+from Pojo import ProposedOrder
+
+
+class OrderNetting:
+    """
+    订单轧差：同一tick内多个策略对同一标的的订单合并为一笔净订单
+    1. 按标的汇总数量，买卖相抵，净数量为0则不下单
+    2. 净订单继承优先级最高（priority最小）的那笔订单的标的/策略/tag，
+       之后的风控按该策略的风控计划检查
+    3. 输出按优先级排序
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.last_input = 0
+        self.last_output = 0
+
+    def net(self, orders: List[ProposedOrder]) -> List[ProposedOrder]:
+        self.last_input = len(orders)
+        if not self.enabled or len(orders) < 2:
+            self.last_output = len(orders)
+            return orders
+
+        leaders: Dict[str, ProposedOrder] = {}
+        totals: Dict[str, int] = {}
+        for order in sorted(orders, key=lambda o: o.priority):
+            sym = order.symbol
+            if sym not in leaders:
+                leaders[sym] = order
+                totals[sym] = 0
+            totals[sym] += order.quantity
+
+        netted = []
+        for sym, leader in leaders.items():
+            qty = totals[sym]
+            if qty == 0:
+                continue
+            netted.append(leader if qty == leader.quantity else replace(leader, quantity=qty))
+
+        self.last_output = len(netted)
+        return netted
@@ -1,5 +1,5 @@
 from dataclasses import dataclass, fields, field, asdict
-from typing import Generator, Any, Callable, Dict, Optional
+from typing import Generator, Any, Callable, Dict, Optional, List
 
 
 @dataclass
@@ -17,6 +17,7 @@ class Env:
 class Target:
     name: str = ""
     holding_percentage: float = 0.0
+    holding_weight: float = 0.0
 
     @classmethod
     def from_dict(cls, data: dict) -> 'Target':
@@ -30,9 +31,39 @@ class Strategy:
     name: str = ""
     priority: int = -1
     params: Dict[str, Any] = field(default_factory=dict)
+    risk: List[str] = field(default_factory=list)
 
     @classmethod
     def from_dict(cls, data: dict) -> 'Strategy':
         valid_fields = {f.name for f in fields(cls)}
         filtered_data = {k: v for k, v in data.items() if k in valid_fields}
         return cls(**filtered_data)
+
+
+@dataclass
+class Config:
+    environment: Dict[str, Any] = field(default_factory=dict)
+    env: Env = field(default_factory=Env)
+    targets: List[Target] = field(default_factory=list)
+    strategies: Dict[str, List[Strategy]] = field(default_factory=dict)  # 标的 -> 按priority排序的策略
+
+
+@dataclass
+class ProposedOrder:
+    target: str = ""
+    strategy: str = ""
+    symbol: str = ""
+    quantity: int = 0  # 正数买入（平空），负数卖出（做空）
+    price: float = 0.0
+    priority: int = -1
+    tag: str = ""
+
+    @property
+    def notional(self) -> float:
+        return abs(self.quantity) * self.price
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'ProposedOrder':
+        valid_fields = {f.name for f in fields(cls)}
+        filtered_data = {k: v for k, v in data.items() if k in valid_fields}
+        return cls(**filtered_data)
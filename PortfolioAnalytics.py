@@ -0,0 +1,160 @@
+import math
+from typing import Any, Dict, Hashable, List, Optional
+
+
+class RollingRatio:
+    """
+    定长窗口收益率的滚动Sharpe/Sortino：
+    环形缓冲 + 累计和 / 平方和 / 下行平方和，每次写入O(1)
+    """
+
+    __slots__ = ("window", "periods_per_year", "_buf", "_pos", "_count", "_sum", "_sum2", "_down2")
+
+    def __init__(self, window: int = 63, periods_per_year: int = 252):
+        if window < 2:
+            raise ValueError("window至少为2")
+        self.window = window
+        self.periods_per_year = periods_per_year
+        self._buf: List[float] = [0.0] * window
+        self._pos = 0
+        self._count = 0
+        self._sum = 0.0
+        self._sum2 = 0.0
+        self._down2 = 0.0
+
+    def __len__(self):
+        return self._count
+
+    def push(self, r: float):
+        if self._count == self.window:
+            old = self._buf[self._pos]
+            self._sum -= old
+            self._sum2 -= old * old
+            if old < 0:
+                self._down2 -= old * old
+        else:
+            self._count += 1
+        self._buf[self._pos] = r
+        self._pos = (self._pos + 1) % self.window
+        self._sum += r
+        self._sum2 += r * r
+        if r < 0:
+            self._down2 += r * r
+
+    def mean(self) -> float:
+        return self._sum / self._count if self._count else 0.0
+
+    def sharpe(self) -> float:
+        n = self._count
+        if n < 2:
+            return 0.0
+        mean = self._sum / n
+        var = max(self._sum2 - n * mean * mean, 0.0) / (n - 1)
+        return mean / math.sqrt(var) * math.sqrt(self.periods_per_year) if var > 1e-18 else 0.0
+
+    def sortino(self) -> float:
+        n = self._count
+        if n < 2:
+            return 0.0
+        down = math.sqrt(max(self._down2, 0.0) / n)
+        return self._sum / n / down * math.sqrt(self.periods_per_year) if down > 1e-9 else 0.0
+
+
+class PortfolioAnalytics:
+    """
+    增量组合分析：
+    1. 成交/价格更新时只调整该标的的多头、空头市值贡献，每次O(1)
+    2. mark时更新净值、峰值、当前回撤和最大回撤
+    3. close_period（通常每日一次）写入一期收益，滚动计算Sharpe/Sortino
+    4. snapshot随时可读，不需要回看全部历史
+    """
+
+    def __init__(self, cash: float = 0.0, window: int = 63, periods_per_year: int = 252):
+        self.cash = float(cash)
+        self.positions: Dict[Hashable, float] = {}  # 带符号数量（已乘合约乘数）
+        self.prices: Dict[Hashable, float] = {}
+        self.long_value = 0.0
+        self.short_value = 0.0  # 空头名义（正数）
+        self.equity = self.cash
+        self.peak = self.cash
+        self.drawdown = 0.0
+        self.max_drawdown = 0.0
+        self.daily_limit = 0.0
+        self.daily_used = 0.0
+        self.bars = 0
+        self.ratio = RollingRatio(window, periods_per_year)
+        self._period_start: Optional[float] = None
+
+    def _apply(self, symbol: Hashable, sign: float):
+        """加上/减去该标的当前市值贡献"""
+        value = self.positions.get(symbol, 0.0) * self.prices.get(symbol, 0.0)
+        if value > 0:
+            self.long_value += sign * value
+        else:
+            self.short_value -= sign * value
+
+    def fill(self, symbol: Hashable, quantity: float, price: float, fee: float = 0.0, multiplier: float = 1.0):
+        """记录一笔成交（quantity带符号）"""
+        units = quantity * multiplier
+        self._apply(symbol, -1.0)
+        self.cash -= units * price + fee
+        position = self.positions.get(symbol, 0.0) + units
+        if position:
+            self.positions[symbol] = position
+        else:
+            self.positions.pop(symbol, None)
+        self.prices[symbol] = price
+        self._apply(symbol, 1.0)
+        return self
+
+    def price(self, symbol: Hashable, price: float):
+        """更新价格（只对有持仓的标的调整市值）"""
+        if symbol in self.positions:
+            self._apply(symbol, -1.0)
+            self.prices[symbol] = price
+            self._apply(symbol, 1.0)
+        return self
+
+    def set_daily(self, limit: float, used: float):
+        self.daily_limit = limit
+        self.daily_used = used
+        return self
+
+    def mark(self, nav: Optional[float] = None):
+        """每个bar调用一次：以给定净值（如QC的total_portfolio_value）或内部记账更新回撤"""
+        self.equity = self.cash + self.long_value - self.short_value if nav is None else float(nav)
+        if self._period_start is None:
+            self._period_start = self.equity
+        if self.equity > self.peak:
+            self.peak = self.equity
+        self.drawdown = (self.peak - self.equity) / self.peak if self.peak > 0 else 0.0
+        if self.drawdown > self.max_drawdown:
+            self.max_drawdown = self.drawdown
+        self.bars += 1
+        return self
+
+    def close_period(self):
+        """结束一期（通常为一个交易日），写入该期收益率"""
+        if self._period_start:
+            self.ratio.push(self.equity / self._period_start - 1.0)
+        self._period_start = self.equity
+        return self
+
+    def snapshot(self) -> Dict[str, Any]:
+        equity = self.equity
+        base = equity if equity > 0 else 1e-9
+        return {
+            'equity': equity,
+            'peak': self.peak,
+            'drawdown': self.drawdown,
+            'max_drawdown': self.max_drawdown,
+            'sharpe': self.ratio.sharpe(),
+            'sortino': self.ratio.sortino(),
+            'periods': len(self.ratio),
+            'gross_short': self.short_value,
+            'net_short': self.short_value - self.long_value,
+            'gross_short_ratio': self.short_value / base,
+            'net_short_ratio': (self.short_value - self.long_value) / base,
+            'daily_cap_utilization': self.daily_used / self.daily_limit if self.daily_limit > 0 else 0.0,
+            'bars': self.bars,
+        }
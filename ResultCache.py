@@ -0,0 +1,164 @@
+import hashlib
+import json
+import os
+import pickle
+import threading
+from dataclasses import asdict, is_dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Sequence
+
+_CODE_VERSION: Dict[str, str] = {}
+
+
+def code_version(root: Optional[str] = None, patterns: Sequence[str] = ("*.py",)) -> str:
+    """代码版本戳：项目内源码文件内容的哈希（同一进程内只计算一次）"""
+    root = str(Path(root or os.path.dirname(os.path.abspath(__file__))).absolute())
+    key = f"{root}|{','.join(patterns)}"
+    if key not in _CODE_VERSION:
+        digest = hashlib.sha256()
+        files = sorted({p for pattern in patterns for p in Path(root).glob(pattern)})
+        for path in files:
+            digest.update(path.name.encode("utf-8"))
+            digest.update(path.read_bytes())
+        _CODE_VERSION[key] = digest.hexdigest()[:16]
+    return _CODE_VERSION[key]
+
+
+def _canonical(obj: Any) -> Any:
+    if is_dataclass(obj) and not isinstance(obj, type):
+        return _canonical(asdict(obj))
+    if isinstance(obj, dict):
+        return {str(k): _canonical(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_canonical(v) for v in obj]
+    if isinstance(obj, float):
+        return repr(obj)
+    return obj
+
+
+class ResultCache:
+    """
+    内容寻址的回测结果缓存：
+    1. 键为 策略配置(标的、layer_cfg、VIX设置) + 数据区间 + 代码版本戳 的哈希
+    2. 结果（净值曲线、订单日志、交易统计等）pickle后存盘，写入先写临时文件再替换
+    3. 超过容量上限时按最近访问时间（LRU，命中时更新mtime）淘汰
+    """
+
+    def __init__(self, root: str = "./cache/backtests", max_bytes: int = 2 * 1024 ** 3):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(config: Any, start=None, end=None, version: Optional[str] = None) -> str:
+        """计算结果键"""
+        payload = {
+            "config": _canonical(config),
+            "start": str(start),
+            "end": str(end),
+            "version": version or code_version(),
+        }
+        raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.pkl"
+
+    def get(self, key: str) -> Optional[Any]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                result = pickle.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception:
+            # 文件损坏，或引用的类已被移动/改名（AttributeError/ImportError等）：视为未命中并删除
+            self.misses += 1
+            self._discard(path)
+            return None
+        try:
+            os.utime(path)  # 更新访问时间，用于LRU
+        except OSError:
+            pass
+        self.hits += 1
+        return result
+
+    def put(self, key: str, result: Any):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        raw = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(raw)
+
+        with self._lock:
+            try:
+                replaced = path.stat().st_size  # 覆盖已有的键时先扣除旧文件大小
+            except OSError:
+                replaced = 0
+            os.replace(tmp, path)
+            if self._total is None:
+                self._total = self._scan_size()
+            else:
+                self._total += len(raw) - replaced
+            if self._total > self.max_bytes:
+                self._evict()
+        return self
+
+    def _discard(self, path: Path):
+        try:
+            size = path.stat().st_size
+            path.unlink()
+        except OSError:
+            return
+        with self._lock:
+            if self._total is not None:
+                self._total -= size
+
+    def get_or_run(self, config: Any, start, end, run: Callable[[], Any], version: Optional[str] = None) -> Any:
+        """命中直接返回，否则运行并写入缓存"""
+        key = self.key(config, start, end, version)
+        result = self.get(key)
+        if result is None:
+            result = run()
+            self.put(key, result)
+        return result
+
+    def _entries(self):
+        for path in self.root.glob("*/*.pkl"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            yield path, stat.st_mtime, stat.st_size
+
+    def _scan_size(self) -> int:
+        return sum(size for _, _, size in self._entries())
+
+    def _evict(self):
+        # 淘汰到容量上限的90%，避免每次写入都触发扫描
+        entries = sorted(self._entries(), key=lambda e: e[1])
+        total = sum(size for _, _, size in entries)
+        target = self.max_bytes * 0.9
+        for path, _, size in entries:
+            if total <= target:
+                break
+            try:
+                path.unlink()
+                total -= size
+            except OSError:
+                continue
+        self._total = total
+
+    def clear(self):
+        for path, _, _ in list(self._entries()):
+            try:
+                path.unlink()
+            except OSError:
+                continue
+        self._total = 0
+        return self
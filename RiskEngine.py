@@ -0,0 +1,199 @@
+from dataclasses import replace
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from FeatureGraph import FEATURES_KEY
+from Pojo import ProposedOrder
+from TradingTrigger import TradingTrigger
+
+
+class RiskBatch:
+    """
+    一个tick内所有待提交订单的列式视图，风控检查按列批量读写：
+    qty为可修改列，检查通过把qty向0裁剪来拒绝/削减订单
+    """
+
+    __slots__ = ("orders", "symbols", "qty", "price", "params", "holding", "nav", "env", "exposure")
+
+    def __init__(self,
+                 orders: List[ProposedOrder],
+                 plans: List["RiskPlan"],
+                 env: Dict[str, Any],
+                 exposure: Dict[str, float]):
+        self.orders = orders
+        self.symbols = [o.symbol for o in orders]
+        self.qty = [o.quantity for o in orders]
+        self.price = [o.price for o in orders]
+        self.params = [p.params for p in plans]
+        self.holding = [p.holding_percentage for p in plans]
+        features = env.get(FEATURES_KEY)
+        self.nav = features['nav'] if features is not None else max(float(env.get('nav', 0.0)), 1e-9)
+        self.env = env
+        self.exposure = exposure
+
+    def trim_short(self, i: int, cap_value: float) -> float:
+        """把第i个卖出订单裁剪到不超过cap_value的名义价值，返回实际占用的名义价值"""
+        price = self.price[i]
+        if cap_value <= 0 or price <= 0:
+            self.qty[i] = 0
+            return 0.0
+        shares = min(-self.qty[i], int(cap_value // price))
+        self.qty[i] = -shares
+        return shares * price
+
+
+class RiskPlan:
+    """单个(标的, 策略)编译后的风控计划"""
+
+    __slots__ = ("checks", "params", "holding_percentage")
+
+    def __init__(self, checks: Tuple[str, ...], params: Dict[str, Any], holding_percentage: float):
+        self.checks = checks
+        self.params = params
+        self.holding_percentage = holding_percentage
+
+
+# 风控检查签名: check(batch, indices)，indices为适用该检查的订单下标（按优先级排序）
+RiskCheck = Callable[[RiskBatch, List[int]], None]
+
+
+class RiskEngine:
+    """
+    下单前风控：
+    1. 按config.yaml中每个策略声明的risk列表编译成检查计划
+    2. 一个tick的所有订单一次性按列批量检查
+    3. 缓存每个标的的空头名义敞口，订单提交后增量更新
+    4. 每个实例有自己的检查注册表（内置检查 + 该实例上register的检查），互不影响
+    """
+
+    def __init__(self):
+        self._checks: Dict[str, RiskCheck] = {}
+        self._plans: Dict[Tuple[str, str], RiskPlan] = {}
+        self.exposure: Dict[str, float] = {}  # symbol -> 当前空头名义价值
+        self.last_rejected: List[ProposedOrder] = []
+        self._setup_default_checks()
+
+    def register(self, name: str = None):
+        def decorator(func: RiskCheck):
+            self._checks[name or func.__name__] = func
+            return func
+
+        return decorator
+
+    def register_function(self, name: str, func: RiskCheck):
+        self._checks[name] = func
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._checks
+
+    def _setup_default_checks(self):
+        self.register_function("max_short_ratio", max_short_ratio)
+        self.register_function("holding_percentage", holding_percentage)
+        self.register_function("daily_cap", daily_cap)
+        # 兼容旧配置中的占位名：映射到实际检查
+        self.register_function("risk_test_1", max_short_ratio)
+        self.register_function("risk_test_2", daily_cap)
+
+    def compile(self, triggers: Iterable[TradingTrigger]):
+        """为每个触发器编译风控计划，未注册的风控一次性全部报出"""
+        triggers = list(triggers)
+        missing = sorted({name for t in triggers for name in t.strategy.risk if name not in self._checks})
+        if missing:
+            raise KeyError(f"未注册的风控: {', '.join(missing)}")
+
+        self._plans = {
+            (t.target.name, t.strategy.name): RiskPlan(tuple(t.strategy.risk), t.strategy.params,
+                                                        t.target.holding_percentage)
+            for t in triggers
+        }
+        return self
+
+    def sync_exposure(self, exposure: Dict[str, float]):
+        """用券商/组合的真实持仓覆盖缓存的空头敞口"""
+        self.exposure = dict(exposure)
+        return self
+
+    def snapshot(self) -> Dict[str, Any]:
+        """保存缓存敞口，用于重放前后restore"""
+        return {"exposure": dict(self.exposure), "last_rejected": list(self.last_rejected)}
+
+    def restore(self, state: Dict[str, Any]):
+        self.exposure = dict(state["exposure"])
+        self.last_rejected = state["last_rejected"]
+        return self
+
+    def evaluate(self, orders: List[ProposedOrder], env: Dict[str, Any]) -> List[ProposedOrder]:
+        """批量检查一个tick的订单，返回通过（可能被削减）的订单"""
+        self.last_rejected = []
+        if not orders:
+            return []
+
+        orders = sorted(orders, key=lambda o: o.priority)
+        empty = RiskPlan((), {}, 1.0)
+        plans = [self._plans.get((o.target, o.strategy), empty) for o in orders]
+        batch = RiskBatch(orders, plans, env, self.exposure)
+
+        # 每个检查只跑一次，覆盖所有声明了它的订单
+        indices: Dict[str, List[int]] = {}
+        for i, plan in enumerate(plans):
+            for name in plan.checks:
+                indices.setdefault(name, []).append(i)
+        for name, idx in indices.items():
+            self._checks[name](batch, idx)
+
+        accepted = []
+        for order, qty in zip(orders, batch.qty):
+            if qty == 0:
+                self.last_rejected.append(order)
+            elif qty == order.quantity:
+                accepted.append(order)
+            else:
+                accepted.append(replace(order, quantity=qty))
+        return accepted
+
+    def commit(self, orders: Iterable[ProposedOrder]):
+        """订单提交后更新缓存敞口"""
+        exposure = self.exposure
+        for order in orders:
+            current = exposure.get(order.symbol, 0.0)
+            if order.quantity < 0:
+                exposure[order.symbol] = current + order.notional
+            else:
+                exposure[order.symbol] = max(0.0, current - order.notional)
+        return self
+
+
+def max_short_ratio(batch: RiskBatch, idx: List[int]):
+    """单标的空头名义上限: params.max_short_ratio * NAV"""
+    used: Dict[str, float] = {}
+    for i in idx:
+        if batch.qty[i] >= 0:
+            continue
+        sym = batch.symbols[i]
+        cap = batch.nav * batch.params[i].get('max_short_ratio', 0.50)
+        current = used.get(sym, batch.exposure.get(sym, 0.0))
+        used[sym] = current + batch.trim_short(i, cap - current)
+
+
+def holding_percentage(batch: RiskBatch, idx: List[int]):
+    """标的持仓上限: target.holding_percentage * NAV"""
+    used: Dict[str, float] = {}
+    for i in idx:
+        if batch.qty[i] >= 0:
+            continue
+        sym = batch.symbols[i]
+        cap = batch.nav * batch.holding[i]
+        current = used.get(sym, batch.exposure.get(sym, 0.0))
+        used[sym] = current + batch.trim_short(i, cap - current)
+
+
+def daily_cap(batch: RiskBatch, idx: List[int]):
+    """当日新增做空额度: daily_limit - daily_used，按优先级依次占用"""
+    features = batch.env.get(FEATURES_KEY)
+    if features is not None:
+        remaining = features['remaining_cap']
+    else:
+        remaining = float(batch.env.get('daily_limit', 0.0)) - float(batch.env.get('daily_used', 0.0))
+    for i in idx:
+        if batch.qty[i] >= 0:
+            continue
+        remaining -= batch.trim_short(i, remaining)
@@ -0,0 +1,165 @@
+import json
+import multiprocessing
+import os
+import struct
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Sequence
+
+# 共享内存布局（全部8字节对齐）：
+#   header:  magic(4s) version(I) n_symbols(I) names_len(I) publish_seq(Q) active(Q)   -> 32字节
+#   names:   json编码的标的列表，补齐到8字节
+#   buffer0/buffer1（双缓冲）:
+#       seq_begin(Q) time(d) vix(d) [price(d) preclose(d)] * n_symbols seq_end(Q)
+MAGIC = b"SNAP"
+VERSION = 1
+HEADER = struct.Struct("<4sIIIQQ")
+SEQ_WORD = 2  # header中publish_seq所在的8字节字序号
+ACTIVE_WORD = 3  # header中active所在的8字节字序号
+
+# 本进程创建的共享内存名，挂载时不取消其resource_tracker登记
+_created = set()
+
+
+class SharedSnapshot:
+    """
+    共享内存行情快照：
+    1. 生产者每个tick写一次，先写非活动缓冲区再切换active，读者永远看到完整的一份
+    2. 每个缓冲区首尾各有一个序号（seqlock），读者先读尾再读首，不一致即为撕裂读，重试
+    3. 标的在创建时固定并驻留，每个标的的价格/昨收位置固定，读者按下标直接访问，无锁、无拷贝
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, symbols: List[str], owner: bool):
+        self._shm = shm
+        self.symbols = symbols
+        self.owner = owner
+        self._index = {s: i for i, s in enumerate(symbols)}
+
+        names_len = HEADER.unpack_from(shm.buf, 0)[3]
+        base = (HEADER.size + names_len + 7) // 8  # 第一个缓冲区的起始字序号
+        self._size = 3 + 2 * len(symbols) + 1  # 每个缓冲区的字数
+        self._bases = (base, base + self._size)
+
+        # 同一块内存的两种视图：序号按uint64读写，数值按float64读写
+        self._words = shm.buf.cast("Q")
+        self._doubles = shm.buf.cast("d")
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    @classmethod
+    def create(cls, symbols: Sequence[str], name: Optional[str] = None) -> 'SharedSnapshot':
+        """生产者创建共享内存"""
+        symbols = list(symbols)
+        names = json.dumps(symbols).encode("utf-8")
+        names_len = (len(names) + 7) // 8 * 8
+        size = HEADER.size + names_len + 2 * 8 * (3 + 2 * len(symbols) + 1)
+
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        _created.add(shm._name)
+        shm.buf[:size] = bytes(size)
+        HEADER.pack_into(shm.buf, 0, MAGIC, VERSION, len(symbols), names_len, 0, 0)
+        shm.buf[HEADER.size:HEADER.size + len(names)] = names
+        return cls(shm, symbols, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> 'SharedSnapshot':
+        """读者（工作进程）按名称挂载"""
+        try:
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:  # Python < 3.13
+            shm = shared_memory.SharedMemory(name=name)
+            if os.name != "nt" and multiprocessing.parent_process() is None and shm._name not in _created:
+                # 挂载时会登记到本进程自己的resource_tracker，退出时会unlink生产者的共享内存，取消登记；
+                # 生产者自身及其子进程与生产者共用resource_tracker，取消登记会删掉生产者的登记，保持不变
+                from multiprocessing import resource_tracker
+                resource_tracker.unregister(shm._name, "shared_memory")
+
+        magic, version, n, names_len, _, _ = HEADER.unpack_from(shm.buf, 0)
+        if magic != MAGIC or version != VERSION:
+            shm.close()
+            raise ValueError(f"共享内存 {name} 不是版本 {VERSION} 的行情快照")
+        raw = bytes(shm.buf[HEADER.size:HEADER.size + names_len]).rstrip(b"\0")
+        return cls(shm, json.loads(raw.decode("utf-8")), owner=False)
+
+    def index(self, symbol: str) -> int:
+        """标的在快照中的固定下标"""
+        return self._index[symbol]
+
+    def publish(self,
+                time: float,
+                prices: Dict[str, float],
+                preclose: Optional[Dict[str, float]] = None,
+                vix: float = float("nan")) -> int:
+        """写入一个tick，未出现的标的沿用上一份快照的值，返回序号"""
+        words, doubles = self._words, self._doubles
+        active = words[ACTIVE_WORD]
+        seq = words[SEQ_WORD] + 1
+        src = self._bases[active]
+        dst = self._bases[active ^ 1]
+        size = self._size
+
+        words[dst] = seq  # seq_begin
+        doubles[dst + 1:dst + size - 1] = doubles[src + 1:src + size - 1]
+        doubles[dst + 1] = time
+        doubles[dst + 2] = vix
+
+        index = self._index
+        for symbol, price in prices.items():
+            doubles[dst + 3 + 2 * index[symbol]] = price
+        if preclose:
+            for symbol, close in preclose.items():
+                doubles[dst + 4 + 2 * index[symbol]] = close
+
+        words[dst + size - 1] = seq  # seq_end
+        words[SEQ_WORD] = seq
+        words[ACTIVE_WORD] = active ^ 1
+        return seq
+
+    def _begin(self):
+        base = self._bases[self._words[ACTIVE_WORD]]
+        return base, self._words[base + self._size - 1]
+
+    def _valid(self, base: int, seq: int) -> bool:
+        return seq != 0 and self._words[base] == seq
+
+    def read(self, retries: int = 1000) -> Optional[Dict]:
+        """一致地拷贝整份快照；尚未发布时返回None，持续撕裂读时抛出RuntimeError"""
+        doubles = self._doubles
+        for _ in range(retries):
+            base, seq = self._begin()
+            if seq == 0:
+                return None
+            values = doubles[base + 1:base + self._size - 1].tolist()
+            if self._valid(base, seq):
+                return {
+                    "seq": seq,
+                    "time": values[0],
+                    "vix": values[1],
+                    "prices": dict(zip(self.symbols, values[2::2])),
+                    "preclose": dict(zip(self.symbols, values[3::2])),
+                }
+        raise RuntimeError(f"行情快照连续 {retries} 次撕裂读")
+
+    def price(self, symbol: str, retries: int = 1000) -> float:
+        """零拷贝读取单个标的的最新价格"""
+        offset = 3 + 2 * self._index[symbol]
+        for _ in range(retries):
+            base, seq = self._begin()
+            value = self._doubles[base + offset]
+            if self._valid(base, seq):
+                return value
+        raise RuntimeError(f"行情快照连续 {retries} 次撕裂读")
+
+    @property
+    def seq(self) -> int:
+        """最新发布的序号，读者可据此判断是否有新tick"""
+        return self._words[SEQ_WORD]
+
+    def close(self):
+        self._words.release()
+        self._doubles.release()
+        self._shm.close()
+        if self.owner:
+            self._shm.unlink()
+            _created.discard(self._shm._name)
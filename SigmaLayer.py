@@ -0,0 +1,52 @@
+from typing import Dict, Tuple
+
+
+def effective_volume(base_volume: float, vix_level: float, vix_threshold: float, vix_high_volume: float) -> float:
+    """根据VIX调整单标的target volume（同sample.py中的_effective_volume）"""
+    if vix_level == vix_level and vix_level > vix_threshold:
+        return float(vix_high_volume)
+    return float(base_volume)
+
+
+def layer_target(diff: float, sigma0: float, sigma1: float, sigma2: float, volume: float) -> Tuple[int, float]:
+    """
+    三层分仓：
+    L1: sigma0 ～ sigma1   -> 1/3 * volume
+    L2: sigma1 ～ sigma2   -> 2/3 * volume
+    L3: >= sigma2          -> 1.0 * volume
+    diff低于sigma0时返回 (0, 0.0)
+    """
+    if diff < sigma0:
+        return 0, 0.0
+    if diff < sigma1:
+        return 1, volume / 3.0
+    if diff < sigma2:
+        return 2, volume * 2.0 / 3.0
+    return 3, volume
+
+
+def short_shares(diff: float,
+                 conf: Dict[str, float],
+                 nav: float,
+                 price: float,
+                 current_short_value: float,
+                 remaining_day_cap: float,
+                 volume: float) -> Tuple[int, int]:
+    """
+    σ分层做空的单标的决策步骤（同sample.py中ShortEquityBySigma的单标的部分）
+    返回 (做空股数, 层级)，不交易时股数为0
+    """
+    layer, target_frac = layer_target(diff, conf['sigma0'], conf['sigma1'], conf['sigma2'], volume)
+    if layer == 0 or price <= 0:
+        return 0, layer
+
+    # 分层目标与单标的上限
+    add_value = nav * target_frac - current_short_value
+    remaining_symbol_cap = nav * conf.get('max_short_ratio', 0.50) - current_short_value
+    add_value = min(add_value, remaining_symbol_cap)
+    if add_value <= 0:
+        return 0, layer
+
+    # 再叠加当日新增名义上限
+    shares = min(int(add_value // price), int(max(remaining_day_cap, 0.0) // price))
+    return max(0, shares), layer
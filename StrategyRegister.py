@@ -1,7 +1,10 @@
 import threading
-from typing import Callable, Any, Dict
+import time
+from typing import Callable, Any, Dict, Optional
 
+from LatencyStats import LatencyStats
 from Log import log
+from Metrics import Latency, metrics
 from TradingTrigger import TradingTrigger
 
 
@@ -17,10 +20,15 @@ class StrategyRegister:
                     cls._instance = super().__new__(cls)
         return cls._instance
 
-    def __init__(self, env):
+    def __init__(self, env=None):
         if not StrategyRegister._initialized:
             self.env = env
             self._functions: Dict[str, Callable] = {}
+            # 延迟统计，None表示关闭（调用路径无额外开销）
+            self._stats: Optional[LatencyStats] = None
+            # 函数名 -> 延迟指标句柄，热路径上不再查找指标注册表
+            self._latencies: Dict[str, Latency] = {}
+            self._m_calls = metrics.counter("strategy_calls_total", "策略函数调用次数")
             self._setup_default_functions()
             StrategyRegister._initialized = True
 
@@ -35,10 +43,72 @@ class StrategyRegister:
     def register_function(self, name: str, func: Callable):
         self._functions[name] = func
 
-    def call(self, name: str, *args, **kwargs) -> Any:
-        if name not in self._functions:
+    def __contains__(self, name: str) -> bool:
+        return name in self._functions
+
+    def resolve(self, name: str) -> Callable:
+        """解析函数名对应的函数，供调用方预绑定"""
+        func = self._functions.get(name)
+        if func is None:
             raise KeyError(f"Function '{name}' not found")
-        return self._functions[name](*args, **kwargs)
+        return func
+
+    def call(self, name: str, *args, **kwargs) -> Any:
+        return self.invoke(name, self.resolve(name), *args, **kwargs)
+
+    def invoke(self, name: str, func: Callable, *args, **kwargs) -> Any:
+        """调用已解析的函数（统计开启时计时）"""
+        self._m_calls.inc()
+        if self._stats is None:
+            return func(*args, **kwargs)
+        return self._timed_call(name, func, *args, **kwargs)
+
+    def record_calls(self, count: int):
+        """调用方直接执行预绑定函数时，补记调用次数"""
+        self._m_calls.inc(count)
+        return self
+
+    @property
+    def stats_enabled(self) -> bool:
+        return self._stats is not None
+
+    def _timed_call(self, name: str, func: Callable, *args, **kwargs) -> Any:
+        # 第一个参数是触发器时，额外按(标的, 策略)维度统计
+        key = None
+        if args and isinstance(args[0], TradingTrigger) and args[0].strategy is not None:
+            key = (args[0].target.name, args[0].strategy.name)
+
+        start = time.perf_counter_ns()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter_ns() - start
+            self._stats.record(name, elapsed, key)
+            latency = self._latencies.get(name)
+            if latency is None:
+                latency = self._latencies[name] = metrics.latency("strategy_call_seconds", "策略函数调用耗时",
+                                                                  function=name)
+            latency.observe_ns(elapsed)
+
+    def enable_stats(self, enabled: bool = True):
+        """开启/关闭调用延迟统计"""
+        if not enabled:
+            self._stats = None
+        elif self._stats is None:
+            self._stats = LatencyStats()
+        return self
+
+    def stats_snapshot(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """获取延迟统计快照: 次数、p50/p99/max（微秒）"""
+        if self._stats is None:
+            return {"functions": {}, "strategies": {}}
+        return self._stats.snapshot()
+
+    def reset_stats(self):
+        """清空延迟统计"""
+        if self._stats is not None:
+            self._stats.reset()
+        return self
 
     def __call__(self, name: str, *args, **kwargs):
         return self.call(name, *args, **kwargs)
@@ -52,6 +122,10 @@ class StrategyRegister:
             log.warning(self.env['vix'])
             trigger.log()
 
+        # config.yaml中的策略名，暂时都只做检查输出
+        self.register_function("strategy_test", inspect)
+        self.register_function("strategy_test_2", inspect)
+
         @self.register("minus")
         def add(a: float, b: float) -> float:
             return a - b
@@ -0,0 +1,308 @@
+import math
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from MarketData import BarStore
+
+# 美股常规交易时段（按UTC 14:30开盘，不处理夏令时），每天390根分钟bar
+SESSION_OPEN = (14, 30)
+MINUTES = 390
+TRADING_DAYS = 252
+
+
+@dataclass
+class SymbolSpec:
+    name: str
+    sigma0: float  # 三层σ阈值（百分比，同sample.py中的layer_cfg）
+    sigma1: float
+    sigma2: float
+    leverage: float = -3.0  # 相对底层指数的日内杠杆
+    vol: float = 0.25  # 底层指数年化波动率（VIX为平静均值时）
+    loading: float = 0.8  # 底层对市场因子的载荷，决定标的间相关性
+    price: float = 20.0
+    volume: float = 2e6  # 日均成交量（股）
+    jump_rate: float = 0.5  # 个股跳跃年化次数
+    jump_std: float = 0.03  # 个股跳跃幅度（底层对数收益）
+
+
+@dataclass
+class VixSpec:
+    symbol: str = "VIX"
+    level: float = 16.0  # 初始水平
+    calm: float = 15.0  # 平静状态的均值
+    stress: float = 32.0  # 恐慌状态的均值
+    enter_stress: float = 0.02  # 每日 平静->恐慌 的概率
+    exit_stress: float = 0.10  # 每日 恐慌->平静 的概率
+    kappa: float = 0.15  # 对数OU的日均值回复速度
+    xi: float = 0.07  # 对数OU的日波动
+    gamma: float = 6.0  # 日内对市场因子收益的反向弹性（市场-1% -> VIX约+6%）
+
+
+# 默认标的（σ阈值同sample.py中的layer_cfg），其后按universe补足合成标的
+DEFAULT_SPECS: Tuple[SymbolSpec, ...] = (
+    SymbolSpec("SQQQ", 1.83, 3.72, 7.50, vol=0.22, loading=0.90, price=25.0, volume=8e7),
+    SymbolSpec("SOXS", 3.18, 6.51, 13.20, vol=0.38, loading=0.80, price=30.0, volume=6e7),
+    SymbolSpec("SPXU", 1.59, 3.24, 6.54, vol=0.18, loading=0.95, price=20.0, volume=2e7),
+    SymbolSpec("SBIT", 4.10, 8.16, 16.28, leverage=-2.0, vol=0.55, loading=0.35, price=40.0, volume=1e6),
+    SymbolSpec("YANG", 2.43, 4.86, 9.72, vol=0.30, loading=0.45, price=35.0, volume=3e6),
+    SymbolSpec("LABD", 3.39, 6.72, 13.38, vol=0.40, loading=0.65, price=15.0, volume=2e7),
+    SymbolSpec("TZA", 2.31, 4.59, 9.15, vol=0.25, loading=0.85, price=18.0, volume=3e7),
+    SymbolSpec("TMV", 1.50, 2.94, 5.82, vol=0.16, loading=-0.25, price=30.0, volume=1e6),
+)
+
+
+def universe(count: int) -> List[SymbolSpec]:
+    """count个标的：先用DEFAULT_SPECS，之后循环其参数生成SYN00000这样的合成标的"""
+    specs = list(DEFAULT_SPECS[:count])
+    for i in range(count - len(specs)):
+        base = DEFAULT_SPECS[i % len(DEFAULT_SPECS)]
+        specs.append(SymbolSpec(f"SYN{i:05d}", base.sigma0, base.sigma1, base.sigma2, base.leverage, base.vol,
+                                base.loading, base.price, base.volume, base.jump_rate, base.jump_std))
+    return specs
+
+
+class SyntheticMarket:
+    """
+    向量化的分钟bar生成器（本地压测用，不需要网络）：
+    1. 单因子模型：底层指数为相关的GBM（市场因子 + 个股噪声），再乘以杠杆得到杠杆反向ETF
+    2. 共同跳跃与个股跳跃；VIX为日频两状态（平静/恐慌）马尔可夫 + 对数OU，日内随市场因子反向变动，
+       同时按VIX水平放大所有标的的波动与成交量
+    3. 开盘跳空按gap_rates控制落入L1/L2/L3各σ层的比例，其余跳空低于sigma0；
+       预期的跳空收益在日内均匀回吐，避免价格随时间单边漂移
+    4. 每次生成chunk_days天的 (天, 分钟, 标的) 数组，按记录格式直接写入BarStore
+    """
+
+    def __init__(self,
+                 specs: Sequence[SymbolSpec] = DEFAULT_SPECS,
+                 start: date = date(2024, 1, 2),
+                 seed: int = 0,
+                 gap_rates: Tuple[float, float, float] = (0.05, 0.02, 0.005),  # 每标的每日跳空进入L1/L2/L3的概率
+                 stress_gap_scale: float = 2.0,  # 恐慌状态下gap_rates的放大倍数
+                 gap_std: float = 0.3,  # 未进入σ层时的跳空标准差（sigma0的倍数）
+                 market_jump_rate: float = 3.0,  # 市场共同跳跃年化次数
+                 market_jump: Tuple[float, float] = (-0.02, 0.015),  # 共同跳跃（均值, 标准差）
+                 vix: Optional[VixSpec] = None):
+        if not specs:
+            raise ValueError("至少需要一个标的")
+        if min(gap_rates) < 0 or sum(gap_rates) > 1:
+            raise ValueError(f"gap_rates应为非负且总和不超过1: {gap_rates}")
+        self.specs = list(specs)
+        self.symbols = [s.name for s in self.specs]
+        self.gap_rates = np.asarray(gap_rates, dtype=np.float64)
+        self.stress_gap_scale = stress_gap_scale
+        self.gap_std = gap_std
+        self.market_jump_rate = market_jump_rate
+        self.market_jump = market_jump
+        self.vix = vix or VixSpec()
+        self.rng = np.random.default_rng(seed)
+
+        def column(attr):
+            return np.array([getattr(s, attr) for s in self.specs], dtype=np.float64)
+
+        self._sigma = np.stack([column("sigma0"), column("sigma1"), column("sigma2")])  # (3, N)
+        self._leverage = column("leverage")
+        self._vol = column("vol") / math.sqrt(TRADING_DAYS * MINUTES)  # 底层每分钟波动
+        self._loading = column("loading")
+        self._idio = np.sqrt(1.0 - self._loading ** 2)
+        self._volume = column("volume")
+        self._jump_p = column("jump_rate") / (TRADING_DAYS * MINUTES)
+        self._jump_std = column("jump_std")
+
+        # U形日内成交量分布
+        x = np.linspace(-1.0, 1.0, MINUTES)
+        profile = 1.0 + 2.0 * x ** 2
+        self._profile = profile / profile.sum()
+
+        # 跨批次的状态
+        self.day = start
+        self._close = np.log(column("price"))
+        self._log_vix = math.log(self.vix.level)
+        self._stress = False
+
+        # 预期的跳空对数收益（用于日内回吐），未进入σ层的跳空近似为0
+        bands = self._bands()
+        self._expected_gap = np.zeros(len(self.specs))
+        for k in range(3):
+            lo, hi = bands[k]
+            mid = np.log1p((lo + hi) / 200.0)
+            self._expected_gap += gap_rates[k] * mid
+
+    def _bands(self) -> List[Tuple[np.ndarray, np.ndarray]]:
+        s0, s1, s2 = self._sigma
+        return [(s0, s1), (s1, s2), (s2, s2 * 1.5)]
+
+    def _trading_days(self, count: int) -> List[date]:
+        days = []
+        day = self.day
+        while len(days) < count:
+            if day.weekday() < 5:
+                days.append(day)
+            day += timedelta(days=1)
+        self.day = day
+        return days
+
+    def chunk(self, days: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        生成接下来days个交易日，返回 (标的记录, VIX记录)：
+        标的记录形状为 (标的数, days*390, 6)，VIX记录为 (days*390, 6)，每条记录同BarStore格式
+        """
+        rng = self.rng
+        vix = self.vix
+        n = len(self.specs)
+        trading_days = self._trading_days(days)
+        d = len(trading_days)
+
+        # 时间戳
+        opens = np.array([datetime(t.year, t.month, t.day, *SESSION_OPEN, tzinfo=timezone.utc).timestamp()
+                          for t in trading_days])
+        times = (opens[:, None] + 60.0 * np.arange(MINUTES)).ravel()
+
+        # 市场因子与VIX：逐日推进状态（每批只有days次标量循环）
+        z_market = rng.standard_normal((d, MINUTES))
+        jumps = rng.random((d, MINUTES)) < self.market_jump_rate / (TRADING_DAYS * MINUTES)
+        z_market += jumps * rng.normal(*self.market_jump, size=(d, MINUTES)) \
+            / (vix.calm / 100.0 / math.sqrt(TRADING_DAYS * MINUTES))
+        vix_open = np.empty(d)
+        stress = np.empty(d, dtype=bool)
+        market = np.empty((d, MINUTES))
+        for i in range(d):
+            if self._stress:
+                self._stress = rng.random() >= vix.exit_stress
+            else:
+                self._stress = rng.random() < vix.enter_stress
+            mean = math.log(vix.stress if self._stress else vix.calm)
+            self._log_vix += vix.kappa * (mean - self._log_vix) + vix.xi * rng.standard_normal()
+            stress[i] = self._stress
+            vix_open[i] = math.exp(self._log_vix)
+            # VIX即市场年化隐含波动（百分比）
+            market[i] = z_market[i] * (vix_open[i] / 100.0 / math.sqrt(TRADING_DAYS * MINUTES))
+            self._log_vix -= vix.gamma * market[i].sum()
+        scale = vix_open / vix.calm  # (d,) 波动与成交量放大倍数
+
+        # 标的每分钟对数收益 (d, M, N)：底层 = 载荷*市场因子 + 个股噪声 + 个股跳跃，再乘杠杆
+        vol = self._vol * scale[:, None]  # (d, N)
+        ret = rng.standard_normal((d, MINUTES, n))
+        ret *= self._idio
+        ret += (z_market[:, :, None] * self._loading)
+        ret *= vol[:, None, :]
+        idio_jumps = rng.random((d, MINUTES, n)) < self._jump_p
+        if idio_jumps.any():
+            ret += idio_jumps * rng.standard_normal((d, MINUTES, n)) * self._jump_std
+        ret *= self._leverage
+        ret -= (0.5 * (self._leverage * vol) ** 2 + self._expected_gap / MINUTES)[:, None, :]
+
+        # 开盘跳空（百分比）：按概率落入各σ层，层内均匀；其余低于sigma0
+        rates = np.where(stress[:, None], np.minimum(self.gap_rates * self.stress_gap_scale, 1.0),
+                         self.gap_rates)
+        rates = rates / np.maximum(rates.sum(axis=1, keepdims=True), 1.0)
+        u = rng.random((d, n))
+        edges = np.cumsum(rates, axis=1)  # (d, 3)
+        layer = (u[:, :, None] >= edges[:, None, :]).sum(axis=2)  # 0->L1, 1->L2, 2->L3, 3->不进入
+        sigma0 = self._sigma[0]
+        gap = np.minimum(rng.standard_normal((d, n)) * sigma0 * self.gap_std, sigma0 * 0.95)
+        within = rng.random((d, n))
+        for k, (lo, hi) in enumerate(self._bands()):
+            mask = layer == k
+            gap = np.where(mask, lo + within * (hi - lo), gap)
+        gap = np.log1p(np.maximum(gap, -50.0) / 100.0)
+
+        # 价格路径：跨日累加（跳空 + 当日收益），日内累加分钟收益
+        day_total = gap + ret.sum(axis=1)
+        start = self._close + np.concatenate([np.zeros((1, n)), np.cumsum(day_total, axis=0)[:-1]])
+        first_open = start + gap
+        close = first_open[:, None, :] + np.cumsum(ret, axis=1)
+        self._close = close[-1, -1].copy()
+        open_ = np.concatenate([first_open[:, None, :], close[:, :-1, :]], axis=1)
+        np.exp(close, out=close)
+        np.exp(open_, out=open_)
+
+        wick = np.abs(rng.standard_normal((2, d, MINUTES, n), dtype=np.float32)) \
+            * (0.5 * np.abs(self._leverage) * vol)[None, :, None, :]
+        high = np.maximum(open_, close) * np.exp(wick[0])
+        low = np.minimum(open_, close) * np.exp(-wick[1])
+        del wick
+
+        volume = rng.lognormal(0.0, 0.5, (d, MINUTES, n)).astype(np.float64)
+        volume *= self._profile[None, :, None] * self._volume * scale[:, None, None]
+        np.rint(volume, out=volume)
+
+        rows = d * MINUTES
+        bars = np.empty((n, rows, 6))
+        bars[:, :, 0] = times
+        for field_index, values in enumerate((open_, high, low, close, volume), start=1):
+            bars[:, :, field_index] = values.reshape(rows, n).T
+
+        # VIX分钟bar：日内对数水平随累计市场收益反向变动
+        vix_close = np.log(vix_open)[:, None] - vix.gamma * np.cumsum(market, axis=1)
+        vix_first = np.log(vix_open)[:, None]
+        vix_open_row = np.concatenate([vix_first, vix_close[:, :-1]], axis=1)
+        vix_close = np.exp(vix_close).ravel()
+        vix_open_row = np.exp(vix_open_row).ravel()
+        vix_wick = np.abs(rng.standard_normal((2, rows))) * 0.001
+        vix_bars = np.empty((rows, 6))
+        vix_bars[:, 0] = times
+        vix_bars[:, 1] = vix_open_row
+        vix_bars[:, 2] = np.maximum(vix_open_row, vix_close) * (1.0 + vix_wick[0])
+        vix_bars[:, 3] = np.minimum(vix_open_row, vix_close) * (1.0 - vix_wick[1])
+        vix_bars[:, 4] = vix_close
+        vix_bars[:, 5] = 0.0
+        return bars, vix_bars
+
+    def chunks(self, days: int, chunk_days: Optional[int] = None,
+               memory_mb: float = 512.0) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """分批生成days个交易日，默认按memory_mb估算每批天数"""
+        if chunk_days is None:
+            per_day = len(self.specs) * MINUTES * 8 * 14  # 约14个float64中间数组
+            chunk_days = max(1, int(memory_mb * 2 ** 20 // per_day))
+        remaining = days
+        while remaining > 0:
+            count = min(chunk_days, remaining)
+            yield self.chunk(count)
+            remaining -= count
+
+    def write(self, store: BarStore, days: int, chunk_days: Optional[int] = None, append: bool = False,
+              memory_mb: float = 512.0) -> Dict[str, int]:
+        """
+        生成并写入BarStore，返回各标的写入的记录数
+        append=False时先清空这些标的已有的文件（BarStore只追加，重复生成会打乱时间顺序）
+        """
+        names = self.symbols + [self.vix.symbol]
+        if not append:
+            for name in names:
+                path = store.path(name)
+                if path.exists():
+                    path.unlink()
+        counts = dict.fromkeys(names, 0)
+        for bars, vix_bars in self.chunks(days, chunk_days, memory_mb):
+            for name, rows in zip(self.symbols, bars):
+                counts[name] += store.write_array(name, rows)
+            counts[self.vix.symbol] += store.write_array(self.vix.symbol, vix_bars)
+        return counts
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="生成合成分钟bar到本地BarStore")
+    parser.add_argument("root", nargs="?", default="./data/bars")
+    parser.add_argument("--symbols", type=int, default=len(DEFAULT_SPECS))
+    parser.add_argument("--days", type=int, default=TRADING_DAYS)
+    parser.add_argument("--start", default="2024-01-02")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--gap-rates", default="0.05,0.02,0.005", help="跳空进入L1,L2,L3的每日概率")
+    parser.add_argument("--chunk-days", type=int, default=None)
+    parser.add_argument("--append", action="store_true")
+    args = parser.parse_args()
+
+    market = SyntheticMarket(universe(args.symbols), start=date.fromisoformat(args.start), seed=args.seed,
+                             gap_rates=tuple(float(r) for r in args.gap_rates.split(",")))
+    begin = time.perf_counter()
+    written = market.write(BarStore(args.root), args.days, args.chunk_days, args.append)
+    elapsed = time.perf_counter() - begin
+    total = sum(written.values())
+    print(f"{len(written)} 个标的, {args.days} 个交易日, {total:,} 条bar, "
+          f"耗时 {elapsed:.1f}s ({total / max(elapsed, 1e-9):,.0f} bar/s) -> {args.root}")
@@ -1,11 +1,37 @@
-import json
 import threading
-from typing import Generator, Any, Callable, Dict, Optional, List
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, List
 
-from Log import log, Log
+from Log import log
+from Metrics import metrics
+from FeatureGraph import FEATURES_KEY, FeatureGraph
+from OrderNetting import OrderNetting
+from Pojo import Config, ProposedOrder
+from RiskEngine import RiskEngine
 from StrategyRegister import StrategyRegister
+from TradingScheduler import TradingScheduler
 from TradingTrigger import TradingTrigger
 
+if TYPE_CHECKING:
+    from DecisionJournal import DecisionJournal
+
+
+def _run_bound(trigger: TradingTrigger):
+    return trigger.handler(trigger)
+
+
+def _collect_orders(results: List[Any]) -> List[ProposedOrder]:
+    # 策略函数可以返回None、单个订单或订单列表
+    orders = []
+    for result in results:
+        if result is None:
+            continue
+        if isinstance(result, ProposedOrder):
+            orders.append(result)
+        else:
+            orders.extend(result)
+    return orders
+
 
 class TradingPipeline:
     _instance = None
@@ -21,41 +47,221 @@ class TradingPipeline:
 
     def __init__(self):
         if not TradingPipeline._initialized:
-            self.pipeline: Dict[str, List[TradingTrigger]] = {}
+            self._setup()
             TradingPipeline._initialized = True
 
+    @classmethod
+    def create(cls, features: Optional[FeatureGraph] = None, **labels) -> 'TradingPipeline':
+        """
+        创建独立于单例的pipeline（多组合批量运行用），labels附加到该pipeline的指标上
+        同一条行情流上的多个pipeline可传入同一个features，共享特征只计算一次
+        """
+        instance = object.__new__(cls)
+        instance._setup(features, **labels)
+        return instance
+
+    def _setup(self, features: Optional[FeatureGraph] = None, **labels):
+        self.scheduler = TradingScheduler()
+        # 是否有触发器尚未绑定策略函数
+        self._dirty = False
+
+        # 每tick共享的特征图，execute时挂在env['features']上
+        self.features = features if features is not None else FeatureGraph()
+
+        # 订单轧差 + 下单前风控 + 订单出口
+        self.netting = OrderNetting()
+        self.risk = RiskEngine()
+        self._order_sink: Optional[Callable[[List[ProposedOrder]], Any]] = None
+        self.last_proposed: List[ProposedOrder] = []
+        self.last_orders: List[ProposedOrder] = []
+
+        # 决策日志，None表示不记录
+        self.journal: Optional["DecisionJournal"] = None
+
+        # 指标
+        self._m_ticks = metrics.counter("pipeline_ticks_total", "已处理的tick数", **labels)
+        self._m_executed = metrics.counter("pipeline_triggers_executed_total", "已执行的触发器数", **labels)
+        self._m_skipped = metrics.counter("pipeline_triggers_skipped_total", "因超出时间预算被延后/跳过的触发器数", **labels)
+        self._m_overruns = {
+            kind: metrics.counter("pipeline_overruns_total", "超时事件数", kind=kind, **labels)
+            for kind in ("strategy", "tick")
+        }
+        self._m_latency = metrics.latency("pipeline_execute_seconds", "每个tick的执行耗时", stage="execute", **labels)
+        self._m_risk_latency = metrics.latency("pipeline_execute_seconds", "每个tick的执行耗时", stage="risk", **labels)
+        self._m_orders = metrics.counter("pipeline_orders_sent_total", "风控后提交的订单数", **labels)
+        self._m_rejected = metrics.counter("pipeline_orders_rejected_total", "被风控拒绝的订单数", **labels)
+        self._m_netted = metrics.counter("pipeline_orders_netted_total", "轧差合并掉的订单数", **labels)
+
+    def load(self, config):
+        """按配置为每个标的的每个策略添加触发器，config为ConfigLoader的结果或config.yaml结构的dict"""
+        if isinstance(config, Config):
+            for target in config.targets:
+                for strategy in config.strategies.get(target.name, []):
+                    self.add(TradingTrigger.bind(config.env, target, strategy))
+            return self
+
+        total_holding_weight = 0
+        for target in config['targets']:
+            total_holding_weight += target['holding_weight']
+
+        env = {
+            'total_holding_weight': total_holding_weight
+        }
+        for target in config['targets']:
+            for strategy in target['strategies']:
+                self.add(TradingTrigger.create(env).on(target).when(strategy))
+        return self
+
     def add(self, trigger: TradingTrigger):
-        target_name = trigger.target.name
-        if target_name not in self.pipeline:
-            self.pipeline[target_name] = []
-        # 检查是否已存在相同策略的触发器
-        # existing_strategies = [t.strategy.name for t in self.pipeline[target_name] if t.strategy]
-        # if trigger.strategy and trigger.strategy.name in existing_strategies:
-        #     pass
-        self.pipeline[target_name].append(trigger)
-        #TODO 按照标的的priority排序
-        self.pipeline[target_name] = sorted(self.pipeline[target_name], key=lambda x: x.strategy.priority)
-        #
+        # 全局调度：跨标的按priority排序（同priority保持加入顺序）
+        self.scheduler.push(trigger)
+        self._dirty = True
+
+        return self
+
+    @property
+    def pipeline(self) -> Dict[str, List[TradingTrigger]]:
+        """标的 -> 该标的的触发器（按执行顺序），由调度器生成，不单独维护"""
+        pipeline: Dict[str, List[TradingTrigger]] = {}
+        for trigger in self.scheduler.triggers():
+            pipeline.setdefault(trigger.target.name, []).append(trigger)
+        return pipeline
+
+    def compile(self):
+        """按strategy.name为每个触发器预绑定策略函数，未注册的策略一次性全部报出"""
+        register = StrategyRegister()
+        triggers = self.scheduler.triggers()
 
+        missing = sorted({t.strategy.name for t in triggers if t.strategy.name not in register})
+        if missing:
+            raise KeyError(f"未注册的策略: {', '.join(missing)}")
+
+        for trigger in triggers:
+            trigger.handler = register.resolve(trigger.strategy.name)
+        self.risk.compile(triggers)
+        self._dirty = False
+        return self
+
+    def record(self, journal: Optional["DecisionJournal"]):
+        """每个tick把env、执行的触发器、提出/发出的订单写入决策日志"""
+        self.journal = journal
+        return self
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        保存跨tick的运行状态（调度器、风控敞口、上一个tick的结果），可以pickle写入决策日志
+        特征缓存可由env重建，不在其中
+        """
+        return {
+            "scheduler": self.scheduler.snapshot(),
+            "risk": self.risk.snapshot(),
+            "last": (list(self.last_proposed), list(self.last_orders)),
+        }
+
+    def restore(self, state: Dict[str, Any]):
+        """恢复snapshot保存的运行状态"""
+        self.scheduler.restore(state["scheduler"])
+        self.risk.restore(state["risk"])
+        self.last_proposed, self.last_orders = (list(orders) for orders in state["last"])
+        return self
+
+    @property
+    def last_triggers(self) -> List[tuple]:
+        """上一个tick执行的(标的, 策略)"""
+        return [(t.target.name, t.strategy.name) for t in self.scheduler.executed()]
+
+    def on_orders(self, sink: Callable[[List[ProposedOrder]], Any]):
+        """设置订单出口：每个tick风控通过的订单一次性交给sink提交"""
+        self._order_sink = sink
+        return self
+
+    def schedule(self,
+                 fair: bool = False,
+                 tick_budget: Optional[float] = None,
+                 protect_priority: int = 1,
+                 strategy_budget: Optional[float] = None,
+                 deadlines: Optional[Dict[str, float]] = None,
+                 overrun: str = "defer",
+                 cooldown: int = 1):
+        """配置全局调度器（公平轮转、每个tick的时间预算、每个策略的期限）"""
+        scheduler = TradingScheduler(fair=fair, tick_budget=tick_budget, protect_priority=protect_priority,
+                                     strategy_budget=strategy_budget, deadlines=deadlines,
+                                     overrun=overrun, cooldown=cooldown)
+        for trigger in self.scheduler.triggers():
+            scheduler.push(trigger)
+        self.scheduler = scheduler
         return self
 
     def log(self):
-        for target_name in self.pipeline:
+        for target_name, triggers in self.pipeline.items():
             log.error(target_name)
-            for trigger in self.pipeline[target_name]:
+            for trigger in triggers:
                 log.debug(trigger)
         return self
 
     def sort(self):
-        for target_name in self.pipeline:
-            self.pipeline[target_name] = sorted(self.pipeline[target_name], key=lambda x: x.strategy.priority)
+        """调度器在加入触发器时已按priority排序，保留该方法兼容旧调用"""
         return self
 
     def execute(self, env: Dict):
         # FIXME 线程堵塞情况下, 单例导致env相互覆盖
+        start = time.perf_counter_ns()
+        if self._dirty:
+            self.compile()
+        journal = self.journal
+        if journal is not None and not journal.started:
+            # 决策日志记录起始状态，重放时从这里开始
+            journal.start(self.snapshot(), self._order_sink is not None)
+
+        env[FEATURES_KEY] = self.features.bind(env)
         register = StrategyRegister(env)
-        for target_name in self.pipeline:
-            for trigger in self.pipeline[target_name]:
-                register.call("inspect", trigger)
+        register.env = env
+        if register.stats_enabled:
+            results = self.scheduler.run(lambda trigger: register.invoke(trigger.strategy.name, trigger.handler, trigger))
+        else:
+            results = self.scheduler.run(_run_bound)
+            register.record_calls(self.scheduler.last_executed)
+        scheduler = self.scheduler
+        if scheduler.last_deferred or scheduler.last_skipped:
+            log.warning(f"tick超出时间预算, 延后 {len(scheduler.last_deferred)} 个 / "
+                        f"跳过 {len(scheduler.last_skipped)} 个低优先级触发器")
+        for event in scheduler.last_overruns:
+            self._m_overruns[event.kind].inc()
+            if event.kind == "strategy":
+                log.warning(f"策略超时: {event.target} {event.strategy} 耗时 {event.duration * 1000:.2f}ms "
+                            f"> 期限 {event.budget * 1000:.2f}ms ({event.action})")
+            else:
+                log.warning(f"tick超时: 耗时 {event.duration * 1000:.2f}ms > 预算 {event.budget * 1000:.2f}ms")
+
+        # 策略返回的订单 -> 轧差 -> 风控 -> 提交
+        self.last_proposed = _collect_orders(results)
+        self.last_orders = self._submit(self.last_proposed, env)
+        if self.journal is not None:
+            self.journal.append(env, self.last_triggers, self.last_proposed, self.last_orders)
+
+        self._m_ticks.inc()
+        self._m_executed.inc(self.scheduler.last_executed)
+        self._m_skipped.inc(len(scheduler.last_deferred) + len(scheduler.last_skipped))
+        self._m_latency.observe_ns(time.perf_counter_ns() - start)
+
+        return self
+
+    def _submit(self, orders: List[ProposedOrder], env: Dict) -> List[ProposedOrder]:
+        if not orders:
+            return []
+
+        orders = self.netting.net(orders)
+        self._m_netted.inc(self.netting.last_input - self.netting.last_output)
+        if not orders:
+            return []
+
+        start = time.perf_counter_ns()
+        accepted = self.risk.evaluate(orders, env)
+        self._m_risk_latency.observe_ns(time.perf_counter_ns() - start)
+        self._m_rejected.inc(len(self.risk.last_rejected))
 
-        return self
\ No newline at end of file
+        if accepted and self._order_sink is not None:
+            self._order_sink(accepted)
+            self.risk.commit(accepted)
+            self._m_orders.inc(len(accepted))
+        return accepted
\ No newline at end of file
@@ -0,0 +1,229 @@
+import heapq
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from TradingTrigger import TradingTrigger
+
+OVERRUN_POLICIES = ("defer", "skip")
+
+
+@dataclass
+class Overrun:
+    """超时事件：kind为strategy（单个触发器超过自身期限）或tick（整个tick超过预算）"""
+    kind: str
+    target: str
+    strategy: str
+    priority: int
+    duration: float  # 实际耗时（秒）
+    budget: float  # 期限（秒）
+    action: str  # 处理方式：ran / cooldown / tick
+
+
+class TradingScheduler:
+    """
+    全局优先级调度器，支持：
+    1. 所有标的的触发器共用一个堆，按策略priority跨标的全局排序
+    2. 可选按标的公平轮转（同一优先级内各标的交替执行）
+    3. 每个tick的时间预算：按各触发器的耗时估计（EWMA）提前判断，
+       剩余预算不够时低优先级触发器延后到下一个tick（defer）或本tick直接跳过（skip）
+    4. 每个策略的期限：超过期限记录超时事件，低优先级策略随后冷却cooldown个tick不再执行
+    """
+
+    def __init__(self,
+                 fair: bool = False,  # 同优先级下是否按标的轮转
+                 tick_budget: Optional[float] = None,  # 每个tick的时间预算（秒），None表示不限
+                 protect_priority: int = 1,  # priority不大于该值的触发器永不延后/跳过
+                 strategy_budget: Optional[float] = None,  # 单个策略的默认期限（秒），None表示不限
+                 deadlines: Optional[Dict[str, float]] = None,  # 按策略名覆盖期限
+                 overrun: str = "defer",  # 超出tick预算时：defer延后 / skip跳过
+                 cooldown: int = 1,  # 低优先级策略超过期限后跳过的tick数
+                 history: int = 1024):  # 保留的超时事件数
+        if overrun not in OVERRUN_POLICIES:
+            raise ValueError(f"overrun应为 {OVERRUN_POLICIES} 之一: {overrun}")
+        self.fair = fair
+        self.tick_budget = tick_budget
+        self.protect_priority = protect_priority
+        self.strategy_budget = strategy_budget
+        self.deadlines = dict(deadlines or {})
+        self.overrun = overrun
+        self.cooldown = cooldown
+
+        # 堆元素: (priority, round, seq, trigger)，seq唯一，保证不会比较到trigger本身
+        self._heap: List[Tuple[int, int, int, TradingTrigger]] = []
+        self._seq = 0
+        self._rounds: Dict[Tuple[str, int], int] = {}
+        self._order: Optional[List[Tuple[int, int, int, TradingTrigger]]] = None
+
+        # seq -> 连续被延后的tick数，下一个tick在同优先级内优先执行，避免饿死
+        self._deferred: Dict[int, int] = {}
+
+        # seq -> 耗时估计（秒），seq -> 剩余冷却tick数
+        self._cost: Dict[int, float] = {}
+        self._cooling: Dict[int, int] = {}
+
+        self.last_executed = 0
+        self.last_deferred: List[TradingTrigger] = []
+        self.last_skipped: List[TradingTrigger] = []
+        self.last_overruns: List[Overrun] = []
+        self.last_duration = 0.0
+        self.overruns: Deque[Overrun] = deque(maxlen=history)
+        self._last_plan: List[Tuple[int, int, int, TradingTrigger]] = []
+
+    def __len__(self):
+        return len(self._heap)
+
+    def push(self, trigger: TradingTrigger):
+        """加入触发器"""
+        priority = trigger.strategy.priority
+        key = (trigger.target.name, priority)
+        round_ = self._rounds.get(key, 0)
+        self._rounds[key] = round_ + 1
+
+        heapq.heappush(self._heap, (priority, round_ if self.fair else 0, self._seq, trigger))
+        self._seq += 1
+        self._order = None
+        return self
+
+    def clear(self):
+        """清空调度器"""
+        self._heap = []
+        self._seq = 0
+        self._rounds = {}
+        self._order = None
+        self._deferred = {}
+        self._cost = {}
+        self._cooling = {}
+        return self
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        保存运行状态（耗时估计、延后、冷却、超时记录），用于重放前后restore
+        触发器按seq保存，可以pickle写入决策日志；按同一配置重建的调度器seq相同
+        """
+        seqs = {id(entry[3]): entry[2] for entry in self._heap}
+        return {
+            "deferred": dict(self._deferred),
+            "cost": dict(self._cost),
+            "cooling": dict(self._cooling),
+            "overruns": list(self.overruns),
+            "last": (self.last_executed,
+                     [seqs[id(t)] for t in self.last_deferred],
+                     [seqs[id(t)] for t in self.last_skipped],
+                     list(self.last_overruns),
+                     self.last_duration,
+                     [entry[2] for entry in self._last_plan]),
+        }
+
+    def restore(self, state: Dict[str, Any]):
+        """恢复snapshot保存的运行状态"""
+        entries = {entry[2]: entry for entry in self._heap}
+        self._deferred = dict(state["deferred"])
+        self._cost = dict(state["cost"])
+        self._cooling = dict(state["cooling"])
+        self.overruns.clear()
+        self.overruns.extend(state["overruns"])
+        executed, deferred, skipped, overruns, duration, plan = state["last"]
+        self.last_executed = executed
+        self.last_deferred = [entries[seq][3] for seq in deferred if seq in entries]
+        self.last_skipped = [entries[seq][3] for seq in skipped if seq in entries]
+        self.last_overruns = list(overruns)
+        self.last_duration = duration
+        self._last_plan = [entries[seq] for seq in plan if seq in entries]
+        return self
+
+    def triggers(self) -> List[TradingTrigger]:
+        """按执行顺序返回所有触发器"""
+        return [entry[3] for entry in self._plan()]
+
+    def executed(self) -> List[TradingTrigger]:
+        """上一个tick实际执行的触发器（按执行顺序）"""
+        deferred = self._deferred
+        skipped = {id(t) for t in self.last_skipped}
+        return [entry[3] for entry in self._last_plan if entry[2] not in deferred and id(entry[3]) not in skipped]
+
+    def _plan(self) -> List[Tuple[int, int, int, TradingTrigger]]:
+        # 堆只在触发器变化时整体出队一次，之后每个tick复用
+        if self._order is None:
+            heap = list(self._heap)
+            self._order = [heapq.heappop(heap) for _ in range(len(heap))]
+
+        if not self._deferred:
+            return self._order
+
+        deferred = self._deferred
+        return sorted(self._order, key=lambda e: (e[0], -deferred.get(e[2], 0), e[1], e[2]))
+
+    def deadline(self, trigger: TradingTrigger) -> Optional[float]:
+        """触发器所属策略的期限（秒）"""
+        return self.deadlines.get(trigger.strategy.name, self.strategy_budget)
+
+    def run(self, runner: Callable[[TradingTrigger], Any]) -> List[Any]:
+        """执行一个tick，返回每个已执行触发器的结果"""
+        budget = self.tick_budget
+        protect = self.protect_priority
+        clock = time.perf_counter
+        start = clock()
+
+        results = []
+        deferred: Dict[int, int] = {}
+        self.last_deferred = []
+        self.last_skipped = []
+        self.last_overruns = []
+
+        plan = self._last_plan = self._plan()
+        if budget is None and self.strategy_budget is None and not self.deadlines:
+            # 未配置任何期限：不计时
+            for entry in plan:
+                results.append(runner(entry[3]))
+        else:
+            cost = self._cost
+            cooling = self._cooling
+            for priority, _, seq, trigger in plan:
+                if priority > protect:
+                    if seq in cooling:
+                        # 上次超过期限，冷却中
+                        cooling[seq] -= 1
+                        if cooling[seq] <= 0:
+                            del cooling[seq]
+                        self.last_skipped.append(trigger)
+                        continue
+                    # 已被延后过的触发器不再按耗时估计提前延后，只要预算未用完就执行，避免饿死
+                    expected = cost.get(seq, 0.0) if seq not in self._deferred else 0.0
+                    if budget is not None and clock() - start + expected > budget:
+                        # 剩余预算不够执行该触发器：延后到下一个tick或本tick跳过
+                        if self.overrun == "defer":
+                            deferred[seq] = self._deferred.get(seq, 0) + 1
+                            self.last_deferred.append(trigger)
+                        else:
+                            # 跳过时衰减耗时估计，之后仍有机会重新执行并更新估计
+                            cost[seq] = cost.get(seq, 0.0) * 0.5
+                            self.last_skipped.append(trigger)
+                        continue
+
+                t0 = clock()
+                results.append(runner(trigger))
+                duration = clock() - t0
+                cost[seq] = duration if seq not in cost else cost[seq] * 0.8 + duration * 0.2
+
+                limit = self.deadline(trigger)
+                if limit is not None and duration > limit:
+                    action = "ran"
+                    if priority > protect and self.cooldown > 0:
+                        cooling[seq] = self.cooldown
+                        action = "cooldown"
+                    self._record(Overrun("strategy", trigger.target.name, trigger.strategy.name, priority,
+                                         duration, limit, action))
+
+        self.last_duration = clock() - start
+        if budget is not None and self.last_duration > budget:
+            self._record(Overrun("tick", "", "", 0, self.last_duration, budget, "tick"))
+
+        self._deferred = deferred
+        self.last_executed = len(results)
+        return results
+
+    def _record(self, event: Overrun):
+        self.last_overruns.append(event)
+        self.overruns.append(event)
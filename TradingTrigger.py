@@ -4,6 +4,18 @@ import json
 from Log import log
 from Pojo import *
 
+
+def _batch(data, size: int):
+    batch = []
+    for item in data:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
 class TradingTrigger:
 
 
@@ -15,6 +27,9 @@ class TradingTrigger:
         self.target: Optional[Target] = None
         self.strategy: Optional[Strategy] = None
 
+        # 由TradingPipeline.compile按strategy.name预绑定的策略函数
+        self.handler: Optional[Callable] = None
+
     def __str__(self) -> str:
         ret = f"\n对于标的: {self.target.name} (持仓上限: {self.target.holding_percentage*100}%) 执行 {self.strategy.name}" \
               f" 策略#{self.strategy.priority}" \
@@ -33,6 +48,15 @@ class TradingTrigger:
         instance.env = Env.from_dict(env)
         return instance
 
+    @classmethod
+    def bind(cls, env: Env, target: Target, strategy: Strategy):
+        """由已规范化的模型直接创建触发器（见ConfigLoader）"""
+        instance = cls()
+        instance.env = env
+        instance.target = target
+        instance.strategy = strategy
+        return instance
+
     def on(self, target: dict):
         self.target = Target.from_dict(target)
         self.target.holding_percentage = target['holding_weight']/self.env.total_holding_weight
@@ -75,22 +99,13 @@ class TradingTrigger:
     def execute(self) -> Generator:
         data = self.source
 
+        # 每个算子在创建时绑定上游和参数（生成器表达式/闭包会延迟查找变量，链式使用时全部指向最后一个算子）
         for op_type, op_func in self.operations:
             if op_type == 'filter':
-                data = (item for item in data if op_func(item))
+                data = filter(op_func, data)
             elif op_type == 'transform':
-                data = (op_func(item) for item in data)
+                data = map(op_func, data)
             elif op_type == 'batch':
-                def batcher():
-                    batch = []
-                    for item in data:
-                        batch.append(item)
-                        if len(batch) >= op_func:
-                            yield batch
-                            batch = []
-                    if batch:
-                        yield batch
-
-                data = batcher()
+                data = _batch(data, op_func)
 
         return data
@@ -0,0 +1,245 @@
+import itertools
+from array import array
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from Log import log
+from MarketData import BarStore, to_timestamp
+from ResultCache import ResultCache
+from SigmaLayer import short_shares
+
+DAY = 86400.0
+
+
+class Features:
+    """
+    单个标的的特征数组（只保留决策bar和收盘bar）：
+    时间、价格、相对昨收涨跌幅(%)、交易日序号、是否决策点、是否当日收盘
+    """
+
+    __slots__ = ("times", "prices", "moves", "days", "decision", "close")
+
+    def __init__(self):
+        self.times = array("d")
+        self.prices = array("d")
+        self.moves = array("d")
+        self.days = array("l")
+        self.decision = array("b")
+        self.close = array("b")
+
+    def __len__(self):
+        return len(self.times)
+
+    def index(self, ts: float) -> int:
+        return bisect_left(self.times, ts)
+
+    @classmethod
+    def build(cls, store: BarStore, ticker: str, start=None, end=None, cadence: int = 15) -> 'Features':
+        """一次解码分钟bar，计算整段时间的特征；各窗口只是下标区间，不再重复计算"""
+        data = store.read_array(ticker, start, end)
+        features = cls()
+        n = len(data) // 6
+        preclose = None
+        last_close = None
+        current_day = None
+        pending = None  # 上一条bar，确认是否为当日最后一条后才写入
+
+        def flush(row, is_close):
+            ts, price, move, day, is_decision = row
+            if is_decision or is_close:
+                features.times.append(ts)
+                features.prices.append(price)
+                features.moves.append(move)
+                features.days.append(day)
+                features.decision.append(1 if is_decision else 0)
+                features.close.append(1 if is_close else 0)
+
+        for i in range(n):
+            ts = data[i * 6]
+            close = data[i * 6 + 4]
+            day = int(ts // DAY)
+            if day != current_day:
+                if pending is not None:
+                    flush(pending, True)
+                    pending = None
+                preclose = last_close
+                current_day = day
+            elif pending is not None:
+                flush(pending, False)
+
+            move = (close - preclose) / preclose * 100.0 if preclose else float("nan")
+            is_decision = preclose is not None and int(ts // 60) % cadence == 0
+            pending = (ts, close, move, day, is_decision)
+            last_close = close
+
+        if pending is not None:
+            flush(pending, True)
+        return features
+
+
+def simulate(f: Features, lo: int, hi: int, conf: Dict[str, float], params: Dict[str, Any]) -> float:
+    """在[lo, hi)区间上按σ分层做空 + 收盘10%止盈模拟，返回收益率"""
+    cash = params.get("cash", 1_000_000.0)
+    volume = conf.get("volume", 0.10)
+    daily_limit_ratio = params.get("daily_limit_ratio", 0.30)
+    take_profit = params.get("take_profit", 0.10)
+
+    prices, moves, days, decision, close = f.prices, f.moves, f.days, f.decision, f.close
+    realized = 0.0
+    shares = 0
+    avg = 0.0
+    nav = cash
+    day = None
+    daily_limit = used = 0.0
+
+    for i in range(lo, hi):
+        price = prices[i]
+        if days[i] != day:
+            day = days[i]
+            daily_limit = nav * daily_limit_ratio
+            used = 0.0
+
+        if decision[i]:
+            n, _ = short_shares(moves[i], conf, nav, price, shares * price, daily_limit - used, volume)
+            if n > 0:
+                avg = (avg * shares + price * n) / (shares + n)
+                shares += n
+                used += n * price
+
+        if close[i] and shares and (avg - price) / avg >= take_profit:
+            realized += shares * (avg - price)
+            shares = 0
+            avg = 0.0
+
+        nav = cash + realized + shares * (avg - price)
+
+    return nav / cash - 1.0
+
+
+def grid(sigma0: Sequence[float], sigma1_mult: Sequence[float] = (2.0,), sigma2_mult: Sequence[float] = (4.0,),
+         **fixed) -> List[Dict[str, float]]:
+    """参数网格：sigma1/sigma2按sigma0的倍数给出"""
+    return [
+        dict(fixed, sigma0=s0, sigma1=s0 * m1, sigma2=s0 * m2)
+        for s0, m1, m2 in itertools.product(sigma0, sigma1_mult, sigma2_mult)
+        if m2 > m1 > 1.0
+    ]
+
+
+# 工作进程中的特征数组（通过initializer只传一次）
+_FEATURES: Optional[Features] = None
+
+
+def _init_worker(features: Features):
+    global _FEATURES
+    _FEATURES = features
+
+
+def _evaluate_window(task) -> Dict[str, Any]:
+    window, (train_lo, train_hi, test_lo, test_hi), candidates, params = task
+    f = _FEATURES
+    scores = [simulate(f, train_lo, train_hi, conf, params) for conf in candidates]
+    best = max(range(len(candidates)), key=scores.__getitem__)
+    return {
+        "window": window,
+        "best": candidates[best],
+        "train_return": scores[best],
+        "test_return": simulate(f, test_lo, test_hi, candidates[best], params),
+    }
+
+
+class WalkForward:
+    """
+    滚动窗口前向验证：
+    1. 把历史切成滚动的训练/测试窗口
+    2. 每个窗口在训练段上选出最优参数，在紧随其后的测试段上检验
+    3. 同一(start, end)区间的特征只计算一次，窗口只是下标区间；窗口之间并行
+    """
+
+    def __init__(self,
+                 store: BarStore,
+                 ticker: str,
+                 candidates: List[Dict[str, float]],
+                 train_days: int = 120,
+                 test_days: int = 30,
+                 step_days: Optional[int] = None,  # 默认等于test_days
+                 max_workers: Optional[int] = None,
+                 cache: Optional[ResultCache] = None,  # 窗口结果缓存，重复运行/重叠窗口直接命中
+                 **params):  # 模拟参数：cash, daily_limit_ratio, take_profit
+        self.store = store
+        self.ticker = ticker
+        self.candidates = candidates
+        self.train_days = train_days
+        self.test_days = test_days
+        self.step_days = step_days or test_days
+        self.max_workers = max_workers
+        self.cache = cache
+        self.params = params
+        self.features: Dict[Tuple[Any, Any], Features] = {}  # (start, end) -> 特征
+
+    def windows(self, start: float, end: float) -> List[Tuple[float, float, float, float]]:
+        """(训练开始, 训练结束/测试开始, 测试结束) 的时间戳窗口；最后一个窗口允许差不到一天，测试结束截到end"""
+        windows = []
+        train_start = start
+        while True:
+            train_end = train_start + self.train_days * DAY
+            test_end = train_end + self.test_days * DAY
+            if test_end > end + DAY:
+                break
+            windows.append((train_start, train_end, train_end, min(test_end, end)))
+            train_start += self.step_days * DAY
+        return windows
+
+    def run(self, start=None, end=None) -> List[Dict[str, Any]]:
+        f = self.features.get((start, end))
+        if f is None:
+            f = self.features[(start, end)] = Features.build(self.store, self.ticker, start, end)
+        if not len(f):
+            return []
+
+        lo = to_timestamp(start) if start is not None else f.times[0]
+        hi = to_timestamp(end) if end is not None else f.times[-1]
+        windows = self.windows(lo, hi)
+        results: List[Optional[Dict[str, Any]]] = [None] * len(windows)
+        keys: List[Optional[str]] = [None] * len(windows)
+        tasks = []
+        for i, (a, b, c, d) in enumerate(windows):
+            if self.cache is not None:
+                keys[i] = self._key(a, b, d)
+                results[i] = self.cache.get(keys[i])
+                if results[i] is not None:
+                    results[i] = dict(results[i], window=i)
+                    continue
+            # 测试段截到区间末尾的窗口包含最后一根bar
+            ranges = (f.index(a), f.index(b), f.index(c), f.index(d) if d < hi else len(f))
+            tasks.append((i, ranges, self.candidates, self.params))
+
+        if self.max_workers == 1 or len(tasks) <= 1:
+            _init_worker(f)
+            computed = [_evaluate_window(task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker,
+                                     initargs=(f,)) as pool:
+                computed = list(pool.map(_evaluate_window, tasks))
+
+        for result in computed:
+            i = result["window"]
+            results[i] = result
+            if self.cache is not None:
+                self.cache.put(keys[i], result)
+
+        log.info(f"{self.ticker} 前向验证完成: {len(results)} 个窗口({len(results) - len(computed)} 个命中缓存), "
+                 f"{len(self.candidates)} 组参数")
+        return results
+
+    def _key(self, train_start: float, train_end: float, test_end: float) -> str:
+        """窗口结果键：标的、候选参数、模拟参数、窗口区间与区间内的数据"""
+        config = {
+            "ticker": self.ticker,
+            "candidates": self.candidates,
+            "params": self.params,
+            "train_end": train_end,
+            "bars": self.store.digest(self.ticker, train_start, test_end),
+        }
+        return ResultCache.key(config, train_start, test_end)
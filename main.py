@@ -1,45 +1,53 @@
-import json
-import StrategyRegister
-import yaml
-
+from ConfigLoader import ConfigLoader
 from Log import log
+from MemoryProfiler import MemoryProfiler
+from Metrics import metrics
 from TradingPipeline import TradingPipeline
-from TradingTrigger import TradingTrigger
 
 pipeline = TradingPipeline()
 
 if __name__ == '__main__':
+    # 校验失败时一次性报出所有错误
+    config = ConfigLoader().load('./config.yaml')
 
-    with open('./config.yaml', 'r', encoding='utf-8') as file:
-        config = yaml.safe_load(file)
+    # 日志在读完配置后才真正创建
+    log.configure(**config.environment.get('log', {}))
 
-    target = config['targets']
+    # 指标：本地HTTP端点 + 定期写文件（后台线程，不阻塞交易循环）
+    metrics_cfg = config.environment.get('metrics')
+    if metrics_cfg:
+        if metrics_cfg.get('port'):
+            metrics.serve(metrics_cfg.get('host', '127.0.0.1'), int(metrics_cfg['port']))
+        if metrics_cfg.get('dump_path'):
+            metrics.dump_every(metrics_cfg['dump_path'], float(metrics_cfg.get('dump_interval', 15)))
 
-    total_holding_weight = 0
-    for target in config['targets']:
-        total_holding_weight += target['holding_weight']
+    # 可选：按子系统的内存分析（在加载pipeline之前开启，才能追踪到触发器等的分配）
+    profiler = None
+    memory_cfg = dict(config.environment.get('memory') or {})
+    if memory_cfg.pop('enabled', False):
+        profiler = MemoryProfiler(**memory_cfg).start()
 
-    env = {
-        'total_holding_weight': total_holding_weight
-    }
+    pipeline.load(config)
 
-    for target in config['targets']:
-        target_name = target['name']
-        holding_weight = target['holding_weight'] / total_holding_weight
-        strategies = target['strategies']
-        for strategy in strategies:
-            strategy_name = strategy['name']
-            strategy_param = strategy['params']
-            trigger = (TradingTrigger.create(env)
-                       .on(target)
-                       .when(strategy)
-                       )
-            pipeline.add(trigger)
+    # 每个tick的时间预算与每个策略的期限
+    scheduler_cfg = config.environment.get('scheduler')
+    if scheduler_cfg:
+        pipeline.schedule(**scheduler_cfg)
+
+    # 启动前校验并绑定所有策略，未注册的策略直接失败
+    pipeline.compile()
 
     env = {
         "vix": 30
     }
     pipeline.execute(env)
+
+    if profiler is not None:
+        profiler.sample()
+        log.info(profiler.report())
+
+    if metrics_cfg and metrics_cfg.get('dump_path'):
+        metrics.dump(metrics_cfg['dump_path'])
     # dispatcher = StrategyRegister
 
     # dispatcher
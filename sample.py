@@ -4,6 +4,12 @@ from datetime import *
 from QuantConnect.Statistics import TradeBuilder, FillGroupingMethod, FillMatchingMethod
 from QuantConnect import Chart, Series, SeriesType
 
+from Log import RateLimiter
+from MemoryProfiler import MemoryProfiler
+from Metrics import metrics
+from OptionChainIndex import OptionChainIndex
+from PortfolioAnalytics import PortfolioAnalytics
+
 
 # endregion
 
@@ -28,6 +34,21 @@ class SQQQShortWithCollar(QCAlgorithm):
         self.daily_limit = self.portfolio.total_portfolio_value * self.daily_limit_ratio  # 计算每日额度上限
         self.daily_used = 0.0  # 初始化当日已使用额度
 
+        # === 增量组合分析（净值、回撤、滚动Sharpe/Sortino、空头敞口、额度使用率，每bar O(1)）===
+        self.analytics = PortfolioAnalytics(self.portfolio.total_portfolio_value)
+        self.analytics.set_daily(self.daily_limit, self.daily_used)
+
+        # === 指标（计数器在热路径上只做一次加法，额度在抓取时读取）===
+        self._m_orders = metrics.counter("orders_sent_total", "已发送订单数")
+        self._m_fills = metrics.counter("order_fills_total", "成交事件数")
+        metrics.gauge("daily_used", "当日已使用做空额度").set_function(lambda: self.daily_used)
+        metrics.gauge("daily_limit", "当日做空额度上限").set_function(lambda: self.daily_limit)
+        metrics.gauge("daily_cap_utilization", "当日额度使用率 daily_used/daily_limit").set_function(
+            lambda: self.daily_used / self.daily_limit if self.daily_limit > 0 else 0.0
+        )
+        metrics.gauge("max_drawdown", "最大回撤").set_function(lambda: self.analytics.max_drawdown)
+        metrics.gauge("gross_short_exposure", "空头名义敞口").set_function(lambda: self.analytics.short_value)
+
         # === 多标的 σ 配置 ===
         # 配置不同杠杆ETF的波动率分层参数和仓位限制
         self.layer_cfg = {
@@ -72,6 +93,15 @@ class SQQQShortWithCollar(QCAlgorithm):
             # 'SVIX': {'sigma0': 2.38, 'sigma1': 4.66, 'sigma2': 9.22, 'volume': 0.10}
         }
 
+        # === 热路径调试输出限流：按回测时间，每类每分钟最多20条，被抑制的条数随下一条带出 ===
+        self.debug_limiter = RateLimiter(rate=20, per=60.0, clock=lambda: self.time.timestamp())
+
+        # === 按子系统的内存分析（参数memory_profile=1时开启）：按回测时间每小时采样，增长速度为每回测小时 ===
+        self.memory = None
+        if self.get_parameter("memory_profile") == "1":
+            self.memory = MemoryProfiler(interval=3600.0, budgets={"order_journal": "64 MB", "log": "32 MB"},
+                                         clock=lambda: self.time.timestamp()).start()
+
         # === 交易记录结构 ===
         self.order_log = []  # 列表，记录每笔成交的详细信息
         self.position_tracker = {}  # 字典，跟踪每个标的的当前持仓数量
@@ -97,6 +127,11 @@ class SQQQShortWithCollar(QCAlgorithm):
         self.option_trigger_pct = 3.0  # 标的当日涨幅触发collar策略的百分比（3%）
         self.option_cooldown_days = 1  # collar策略冷却期天数（全局共享）
         self.last_option_date = None  # 记录上次执行collar策略的日期
+        self.collar_cooldown_until = None  # 冷却期结束日期（执行collar时计算一次）
+        self.option_trigger_price = {}  # 字典：Symbol -> 触发collar的价格（每日开盘由昨收计算一次）
+        self.option_index = {t: OptionChainIndex() for t in self.layer_cfg.keys()}  # 字典：ticker -> 期权链索引
+        self.collar_call_delta = 0.50  # 买入认购腿的目标delta（无greeks时退回按执行价选腿）
+        self.collar_put_delta = -0.50  # 卖出认沽腿的目标delta
 
         # === 订阅标的 ===
         self.pool_symbols = {}  # 字典：ticker -> Symbol（股票）
@@ -176,6 +211,7 @@ class SQQQShortWithCollar(QCAlgorithm):
 
                 if c == c and c > 0:  # 检查是否为有效正数（不是NaN）
                     self.preclose[sym] = c  # 保存到preclose字典
+                    self.option_trigger_price[sym] = c * (1.0 + self.option_trigger_pct / 100.0)  # 缓存collar触发价
             except Exception:
                 continue  # 异常时跳过该标的
 
@@ -185,6 +221,7 @@ class SQQQShortWithCollar(QCAlgorithm):
         nav = max(self.portfolio.total_portfolio_value, 1e-9)  # 获取当前净资产，确保大于0
         self.daily_limit = nav * self.daily_limit_ratio  # 重新计算每日额度上限
         self.daily_used = 0.0  # 重置当日已使用额度
+        self.analytics.close_period().set_daily(self.daily_limit, self.daily_used)  # 结束上一日收益期
 
     # ---------- 主循环 ----------
     def on_data(self, data: Slice):
@@ -194,6 +231,10 @@ class SQQQShortWithCollar(QCAlgorithm):
             sec = self.securities.get(sym, None)  # 获取证券对象
             if sec is not None and sec.price and sec.price > 0:  # 检查价格有效
                 self.plot("Trades", f"{t}_Price", sec.price)  # 绘制价格到图表
+                self.analytics.price(sym, sec.price)  # 只调整该标的的市值贡献
+        self.analytics.mark(self.portfolio.total_portfolio_value)  # 更新净值与回撤
+        if self.memory is not None:
+            self.memory.maybe_sample()
 
         # 每15分钟检查一次信号（分钟数能被15整除时）
         if self.time.minute % 15 != 0:
@@ -205,6 +246,80 @@ class SQQQShortWithCollar(QCAlgorithm):
         # Collar期权保护（当前被注释掉了）
         # self.CheckCollarOption(data)
 
+    # ---------- 期权链索引：合约进出universe时增量维护 ----------
+    def on_securities_changed(self, changes: SecurityChanges) -> None:
+        """期权合约加入/移出时更新索引，选腿时不再扫描整条期权链"""
+        for sec in changes.added_securities:
+            if sec.type != SecurityType.OPTION:
+                continue
+            index = self.option_index.get(sec.symbol.underlying.value)
+            if index is not None:
+                sid = sec.symbol.id
+                index.add(sec.symbol, sid.date, float(sid.strike_price), sid.option_right)
+
+        for sec in changes.removed_securities:
+            if sec.type != SecurityType.OPTION:
+                continue
+            index = self.option_index.get(sec.symbol.underlying.value)
+            if index is not None:
+                sid = sec.symbol.id
+                index.remove(sid.date, float(sid.strike_price), sid.option_right)
+
+    # ---------- Collar期权保护 ----------
+    def CheckCollarOption(self, data: Slice):
+        """标的当日涨幅超过option_trigger_pct时，为空头持仓买入认购、卖出认沽"""
+        today = self.time.date()
+        if self.collar_cooldown_until is not None and today < self.collar_cooldown_until:
+            return  # 全局冷却期内
+
+        for t, sym in self.pool_symbols.items():
+            trigger_price = self.option_trigger_price.get(sym)
+            if trigger_price is None:
+                continue
+
+            price = self.securities[sym].price
+            if not price or price < trigger_price:  # 未达到触发涨幅
+                continue
+
+            qty = self.portfolio[sym].quantity
+            contracts = int(abs(qty) // 100) if qty < 0 else 0  # 每张合约对应100股
+            if contracts <= 0:
+                continue
+
+            index = self.option_index.get(t)
+            index.expire(self.time)
+            expiry = index.nearest_expiry(
+                self.time + timedelta(days=30),
+                self.time + timedelta(days=14),
+                self.time + timedelta(days=45)
+            )
+            if expiry is None:
+                continue
+
+            # 只为选中到期日的合约更新delta，再按目标delta二分选腿
+            chain = data.option_chains.get(self.option_symbols.get(t))
+            if chain is not None:
+                for c in chain:
+                    if c.symbol.id.date == expiry and c.greeks is not None and c.greeks.delta != 0:
+                        index.set_delta(c.right, expiry, c.strike, c.greeks.delta)
+
+            call = index.by_delta(OptionRight.CALL, expiry, self.collar_call_delta)
+            put = index.by_delta(OptionRight.PUT, expiry, self.collar_put_delta)
+            if call is None:
+                call = index.nearest_strike(OptionRight.CALL, expiry, price, 1)  # 不低于现价的最近一档认购
+            if put is None:
+                put = index.nearest_strike(OptionRight.PUT, expiry, price, -1)  # 不高于现价的最近一档认沽
+            if call is None or put is None:
+                continue
+
+            self.market_order(call, contracts, tag=f"COLLAR_CALL_{t}")
+            self.market_order(put, -contracts, tag=f"COLLAR_PUT_{t}")
+            self._m_orders.inc(2)
+
+            self.last_option_date = today
+            self.collar_cooldown_until = today + timedelta(days=self.option_cooldown_days)
+            return  # 冷却期全局共享
+
     # ---------- 做空持仓10%止盈 ----------
     def CloseShortEquityProfits10(self):
         """收盘前检查并平仓盈利超过10%的空头头寸"""
@@ -224,6 +339,7 @@ class SQQQShortWithCollar(QCAlgorithm):
             # 空头盈利+10%以上平仓（对于空头，价格上涨亏损，价格下跌盈利）
             if up >= 0.10:  # up为正表示盈利
                 self.market_order(sec.symbol, -qty, tag="COVER_TP10")  # 市价平仓（买入平空）
+                self._m_orders.inc()
                 self.debug(  # 记录调试信息
                     f"[SHORT TP 10%] {sec.symbol.value} up={up:.2%} -> cover {abs(qty)}"
                 )
@@ -323,21 +439,26 @@ class SQQQShortWithCollar(QCAlgorithm):
 
             # 下单做空，带上层级tag
             self.market_order(sym, -shares, tag=f"SHORT_SIGMA_L{layer}")  # 市价卖出做空
+            self._m_orders.inc()
 
             spend_notional = shares * price  # 计算使用的名义价值
             self.daily_used += spend_notional  # 更新当日已使用额度
+            self.analytics.set_daily(self.daily_limit, self.daily_used)
             remaining_day_cap = max(self.daily_limit - self.daily_used, 0.0)  # 重新计算剩余额度
 
-            # 记录详细的调试信息
-            self.debug(
-                f"[SHORT] {t} +{diff:.2f}% -> L{layer} tgt={target_frac:.3f}*NAV "
-                f"| cur_short=${current_short_value:.0f} | add≈${add_value:.0f} "
-                f"| symbol_cap=${max_short_value:.0f} "
-                f"| sell {shares} sh @ ~{price:.2f} "
-                f"| used_day=${self.daily_used:.0f}/${self.daily_limit:.0f} "
-                f"| qty={self.portfolio[sym].quantity} "
-                f"| vix={vix_level:.2f} vol={effective_volume:.2f}"
-            )
+            # 记录详细的调试信息（限流，被抑制时不拼接字符串）
+            suppressed = self.debug_limiter.allow("SHORT")
+            if suppressed >= 0:
+                self.debug(
+                    f"[SHORT] {t} +{diff:.2f}% -> L{layer} tgt={target_frac:.3f}*NAV "
+                    f"| cur_short=${current_short_value:.0f} | add≈${add_value:.0f} "
+                    f"| symbol_cap=${max_short_value:.0f} "
+                    f"| sell {shares} sh @ ~{price:.2f} "
+                    f"| used_day=${self.daily_used:.0f}/${self.daily_limit:.0f} "
+                    f"| qty={self.portfolio[sym].quantity} "
+                    f"| vix={vix_level:.2f} vol={effective_volume:.2f}"
+                    + (f" [此前抑制 {suppressed} 条]" if suppressed else "")
+                )
 
     # ---------- 所有订单回调：记录 + 图上打点 ----------
     def on_order_event(self, order_event: OrderEvent) -> None:
@@ -345,6 +466,7 @@ class SQQQShortWithCollar(QCAlgorithm):
         # 只关心有成交量的事件（fill_quantity不为0）
         if order_event.fill_quantity == 0:
             return
+        self._m_fills.inc()
 
         sym = order_event.symbol  # 交易标的
         fill_qty = int(order_event.fill_quantity)  # 成交数量
@@ -364,6 +486,10 @@ class SQQQShortWithCollar(QCAlgorithm):
         sec = self.securities.get(sym, None)  # 获取证券对象
         asset_type = str(sec.type) if sec is not None else "Unknown"  # 资产类型
 
+        # 增量分析：期权按合约乘数折算名义
+        multiplier = float(sec.symbol_properties.contract_multiplier) if sec is not None else 1.0
+        self.analytics.fill(sym, fill_qty, fill_price, float(order_event.order_fee.value.amount), multiplier)
+
         # ---- 仓位变动前后（自己的tracker）----
         prev_qty = self.position_tracker.get(sym, 0)  # 交易前持仓
         new_qty = prev_qty + fill_qty  # 交易后持仓
@@ -392,13 +518,16 @@ class SQQQShortWithCollar(QCAlgorithm):
             "avg_price_after": avg_price_after  # 交易后平均成本
         })
 
-        # 同时打到日志里一行（方便在线查看）
-        self.debug(
-            f"[ORDER] {self.time} {sym.value} {asset_type} "
-            f"id={oid} tag={tag} dir={direction} "
-            f"fill={fill_qty}@{fill_price:.4f} "
-            f"pos={pos_after} avg={avg_price_after:.4f}"
-        )
+        # 同时打到日志里一行（方便在线查看；限流，完整记录见order_log）
+        suppressed = self.debug_limiter.allow("ORDER")
+        if suppressed >= 0:
+            self.debug(
+                f"[ORDER] {self.time} {sym.value} {asset_type} "
+                f"id={oid} tag={tag} dir={direction} "
+                f"fill={fill_qty}@{fill_price:.4f} "
+                f"pos={pos_after} avg={avg_price_after:.4f}"
+                + (f" [此前抑制 {suppressed} 条]" if suppressed else "")
+            )
 
         # ---- 可视化：在Trades图上标记 ----
         # 1）标的股票：从0->非0视为开仓点，从非0->0视为平仓点
@@ -440,6 +569,21 @@ class SQQQShortWithCollar(QCAlgorithm):
         # 最终净值
         self.debug(f"Final Portfolio Value: ${self.portfolio.total_portfolio_value:,.2f}")
 
+        for key, count in self.debug_limiter.pending():
+            self.debug(f"[限流] {key} 最后一个窗口抑制 {count} 条")
+
+        if self.memory is not None:
+            self.memory.sample()
+            self.debug(self.memory.report())
+
+        # 增量分析结果（运行中随时可读，这里只输出最终值）
+        a = self.analytics.snapshot()
+        self.debug(
+            f"ANALYTICS,max_drawdown={a['max_drawdown']:.4f},sharpe={a['sharpe']:.2f},"
+            f"sortino={a['sortino']:.2f},gross_short={a['gross_short']:.0f},"
+            f"net_short={a['net_short']:.0f},daily_cap_utilization={a['daily_cap_utilization']:.2%}"
+        )
+
         # === 1）订单明细：每一笔fill（含collar期权腿）===
         self.debug(  # 输出CSV格式的标题行
             "ORDER_LOG,time,symbol,asset_type,order_id,tag,"
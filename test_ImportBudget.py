@@ -0,0 +1,19 @@
+import os
+
+import pytest
+
+import ImportBudget
+
+# 导入耗时上限（毫秒），按机器性能通过环境变量调整
+BUDGET_MS = float(os.environ.get("IMPORT_BUDGET_MS", "1000"))
+
+
+@pytest.mark.parametrize("module", list(ImportBudget.MODULES))
+def test_import_budget(module):
+    assert ImportBudget.check({module: ImportBudget.MODULES[module]}, budget_ms=BUDGET_MS) == []
+
+
+def test_check_reports_eager_dependencies():
+    errors = ImportBudget.check({"DecisionJournal": []})
+    assert any("mmap" in e and "pickle" in e for e in errors)
+    assert any("FeatureGraph" in e for e in errors)
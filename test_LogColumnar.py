@@ -0,0 +1,41 @@
+import LogColumnar
+
+FULL = (
+    "2026-01-05 19:58:00.429 | ERROR    | Log | dev | 29496 | 50016 | Utils._log_with_context:336 | test:\n"
+    "{\n"
+    '  "vix": 30.0\n'
+    "} | {'name': 'Log', 'env': 'dev'}\n"
+)
+FALLBACK = "2026-01-05 19:58:01 | WARNING | 回退格式 | 含分隔符\n"
+
+
+def test_parse_full_and_fallback_formats():
+    records = list(LogColumnar.parse((FULL + FALLBACK + FULL).splitlines(keepends=True)))
+    assert len(records) == 3
+
+    full, fallback, _ = records
+    assert full[1] == "ERROR"
+    assert full[4:9] == (29496, 50016, "Utils", "_log_with_context", 336)
+    assert full[9] == 'test:\n{\n  "vix": 30.0\n}'
+    assert full[10] == "{'name': 'Log', 'env': 'dev'}"
+
+    assert fallback[1] == "WARNING"
+    assert fallback[4] == 0
+    assert fallback[9] == "回退格式 | 含分隔符"
+    assert round(fallback[0] - full[0], 3) == 0.571
+
+
+def test_convert_all_keeps_relative_paths(tmp_path):
+    logs = tmp_path / "logs"
+    (logs / "test").mkdir(parents=True)
+    (logs / "dev_all.log").write_text(FULL, encoding="utf-8")
+    (logs / "test" / "dev_all.log").write_text(FULL + FALLBACK, encoding="utf-8")
+
+    out_dir = tmp_path / "columnar"
+    converted = LogColumnar.convert_all(LogColumnar.log_files(str(logs)), str(out_dir), max_workers=1)
+    outputs = {dst: rows for _, dst, rows in converted}
+    assert outputs == {
+        str(out_dir / "dev_all.log.lcol"): 1,
+        str(out_dir / "test" / "dev_all.log.lcol"): 2,
+    }
+    assert LogColumnar.read(str(out_dir / "test" / "dev_all.log.lcol"), ["level"]) == {"level": ["ERROR", "WARNING"]}